@@ -0,0 +1,146 @@
+"""
+Autosave in the background
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import collections
+import queue
+import sys
+import threading
+import time
+import traceback
+
+
+class Autosave:
+    """
+    Saves every few simulation days, the snapshot is taken on the simulation thread
+    between two ticks, it is written to disk on a worker thread
+    """
+    def __init__(self, snapshot: callable, interval: int = 30, history: int = 100) -> None:
+        # takes snapshot and returns function that writes it and returns its bytes
+        self._snapshot = snapshot
+        self.interval = interval
+
+        self._last_day = None
+        self._pending = 0
+        self._delayed = 0
+        self._lock = threading.Lock()
+        self._timings = collections.deque(maxlen=history)
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """
+        true while a save is written
+        """
+        with self._lock:
+            return self._pending > 0
+
+    @property
+    def timings(self) -> list[dict]:
+        """
+        day, seconds of snapshot and write, bytes and error of the last saves
+        """
+        with self._lock:
+            return list(self._timings)
+
+    def stats(self) -> dict:
+        """
+        summary of the last saves
+        """
+        timings = self.timings
+        if len(timings) <= 0:
+            return {"saves": 0, "delayed": self._delayed}
+
+        return {"saves": len(timings),
+                "delayed": self._delayed,
+                "last_day": timings[-1]["day"],
+                "max_snapshot": max(timing["snapshot"] for timing in timings),
+                "mean_snapshot": sum(timing["snapshot"] for timing in timings) / len(timings),
+                "max_write": max(timing["write"] for timing in timings),
+                "mean_write": sum(timing["write"] for timing in timings) / len(timings),
+                "errors": sum(1 for timing in timings if timing["error"] is not None)}
+
+    def reset(self) -> None:
+        """
+        starts the interval again, for example after another village was loaded
+        """
+        self._last_day = None
+
+    def tick(self, today: int) -> bool:
+        """
+        called between two ticks, saves if the interval passed since the last save
+        """
+        if self.interval is None or self.interval <= 0:
+            return False
+
+        if self._last_day is None:
+            self._last_day = today
+            return False
+
+        if today - self._last_day < self.interval:
+            return False
+
+        # the last save is still written, tries again after the next tick
+        if self.busy is True:
+            self._delayed += 1
+            return False
+
+        self.save(today)
+        return True
+
+    def save(self, today: int) -> None:
+        """
+        takes snapshot now and writes it in the background,
+        must be called between two ticks
+        """
+        start = time.perf_counter()
+        write = self._snapshot()
+        snapshot_time = time.perf_counter() - start
+
+        self._last_day = today
+        with self._lock:
+            self._pending += 1
+        self._queue.put((today, snapshot_time, write))
+
+    def close(self) -> None:
+        """
+        writes outstanding saves and stops the worker
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """
+        worker
+        """
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            today, snapshot_time, write = job
+
+            start = time.perf_counter()
+            size = 0
+            error = None
+            try:
+                size = write()
+            except Exception as exception:  # pylint: disable=broad-except
+                # a failed save must neither stop the worker nor block later saves
+                print(f"autosave of day {today} failed", file=sys.stderr)
+                traceback.print_exception(exception)
+                error = f"{type(exception).__name__}: {exception}"
+            finally:
+                write_time = time.perf_counter() - start
+
+                with self._lock:
+                    self._pending -= 1
+                    self._timings.append({"day": today,
+                                          "snapshot": snapshot_time,
+                                          "write": write_time,
+                                          "bytes": size,
+                                          "error": error})
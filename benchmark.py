@@ -0,0 +1,485 @@
+"""
+Benchmark suite
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import argparse
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from buildings import Building
+from population import Engine
+from village import Village
+from villagers import Villager
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# save and load are also reported in MB/s up to a million villagers
+SAVE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+
+# a benchmark is a regression if its median is slower than the baseline by this portion
+DEFAULT_THRESHOLD = 0.10
+
+START_MONEY = 10_000
+
+# houses per round of buying, from the one family home to the big skyscraper
+HOUSING_MIX = (8, 4, 2, 1, 1, 1, 1)
+
+# free capacity kept for growth, open jobs per villager
+HOUSING_RESERVE = 1.2
+JOBS_PER_VILLAGER = 0.3
+
+# house searches per run of find_house
+FIND_HOUSE_COUNT = 10_000
+
+
+def default_shards() -> tuple[int]:
+    """
+    shard counts of the sharded engine, powers of two up to the number of cores
+    """
+    cores = os.cpu_count() or 1
+    shards = [1]
+    while shards[-1] * 2 <= cores:
+        shards.append(shards[-1] * 2)
+    if shards[-1] != cores:
+        shards.append(cores)
+    return tuple(shards)
+
+
+def housed_village(population_count: int,
+                   engine: Engine = Engine.OBJECTS,
+                   seed: int = 1337,
+                   shards: int = None) -> Village:
+    """
+    village with houses and jobs for its population, unlike create_village
+    which builds the same 33 houses for every population
+    """
+    Building.load_buildings()
+
+    # buildings are free, the village starts with the usual money
+    village = Village(str(population_count), float("inf"), set(), set(), day=27, seed=seed,
+                      engine=engine, shards=shards)
+
+    # mostly small homes and a few skyscrapers
+    capacity = 0
+    houses = itertools.cycle([house for house, count in zip(Building.houses, HOUSING_MIX)
+                              for _ in range(count)])
+    while capacity < population_count * HOUSING_RESERVE:
+        house = village.buy_building(next(houses), True)
+        capacity += house.capacity
+
+    jobs = 0
+    businesses = itertools.cycle(Building.businesses)
+    while jobs < population_count * JOBS_PER_VILLAGER:
+        business = village.buy_building(next(businesses), True)
+        jobs += max(business.open_job_count, 1)
+    village._money = START_MONEY
+
+    village._gain_new_families(population_count)
+
+    return village
+
+
+class Timed(NamedTuple):
+    """
+    Function to time, prepare is called before every run outside of the timing
+    and run gets its result, bytes are the bytes every run writes or reads,
+    close is called after all runs
+    """
+    run: callable
+    prepare: callable = None
+    bytes: int = None
+    close: callable = None
+
+
+class Benchmark(NamedTuple):
+    """
+    Benchmark, setup takes population, engine, years and shards
+    and returns the function to time or a Timed
+    """
+    name: str
+    setup: callable
+
+    # larger populations are skipped
+    max_size: int = None
+
+    # populations when none are given
+    sizes: tuple[int] = DEFAULT_SIZES
+
+
+def _setup_create_village(size: int, engine: Engine, _years: int,
+                          shards: int) -> callable:
+    return lambda: Village.create_village(str(size), size, engine=engine, shards=shards)
+
+
+def _setup_housed_village(size: int, engine: Engine, _years: int,
+                          shards: int) -> callable:
+    return lambda: housed_village(size, engine, shards=shards)
+
+
+def _setup_tick_day(size: int, engine: Engine, _years: int,
+                    shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+    return Timed(village._tick_day, close=village.close)
+
+
+def _setup_tick_families(size: int, engine: Engine, _years: int,
+                         shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+
+    # aging, happiness and mortality, the part of a day that is sharded
+    return Timed(village._tick_families, close=village.close)
+
+
+def _setup_tick_month(size: int, engine: Engine, _years: int,
+                      shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+
+    def run() -> None:
+        village._tick_month()
+
+        # stays in the calendar
+        village._month = 1
+
+    return Timed(run, close=village.close)
+
+
+def _setup_gain_new_families(size: int, engine: Engine, _years: int,
+                             shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+
+    # one percent of the population moves in
+    return Timed(lambda: village._gain_new_families(max(size // 100, 1)), close=village.close)
+
+
+def _setup_find_house(size: int, engine: Engine, _years: int,
+                      shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+    capacities = [random.randint(1, 13) for _ in range(FIND_HOUSE_COUNT)]
+
+    def run() -> None:
+        for capacity in capacities:
+            village._find_house(capacity)
+
+    return Timed(run, close=village.close)
+
+
+def _setup_save(size: int, engine: Engine, _years: int,
+                shards: int) -> Timed:
+    village = housed_village(size, engine, shards=shards)
+
+    file = io.BytesIO()
+    village.save(file)
+
+    return Timed(lambda: village.save(io.BytesIO()), bytes=file.tell(), close=village.close)
+
+
+def _setup_load(size: int, engine: Engine, _years: int,
+                shards: int) -> Timed:
+    file = io.BytesIO()
+    village = housed_village(size, engine, shards=shards)
+    village.save(file)
+    village.close()
+    data = file.getvalue()
+
+    return Timed(lambda: Village.load(io.BytesIO(data)), bytes=len(data))
+
+
+def _setup_years(size: int, engine: Engine, years: int,
+                 shards: int) -> Timed:
+    # every run ticks a new village, the same seed builds the same one
+    def prepare() -> Village:
+        return housed_village(size, engine, shards=shards)
+
+    def run(village: Village) -> Village:
+        for _ in range(365 * years):
+            village.tick()
+        return village
+
+    return Timed(run, prepare)
+
+
+BENCHMARKS = (Benchmark("create_village", _setup_create_village),
+              Benchmark("housed_village", _setup_housed_village),
+              Benchmark("tick_day", _setup_tick_day),
+              Benchmark("tick_families", _setup_tick_families),
+              Benchmark("tick_month", _setup_tick_month),
+              Benchmark("gain_new_families", _setup_gain_new_families),
+              Benchmark("find_house", _setup_find_house),
+              Benchmark("save", _setup_save, sizes=SAVE_SIZES),
+              Benchmark("load", _setup_load, sizes=SAVE_SIZES),
+              Benchmark("years", _setup_years, max_size=10_000))
+
+
+def measure(run: callable,
+            repeat: int = DEFAULT_REPEAT,
+            warmup: int = DEFAULT_WARMUP,
+            prepare: callable = None) -> dict:
+    """
+    times run repeat times after warmup runs, returns seconds,
+    prepare is called before every run outside of the timing and run gets its result
+    """
+    def once() -> float:
+        args = () if prepare is None else (prepare(),)
+
+        # garbage of earlier runs is not collected during the measurement
+        gc.collect()
+
+        start = time.perf_counter()
+        result = run(*args)
+        seconds = time.perf_counter() - start
+
+        # villages of a run stop their shard processes outside of the timing
+        if isinstance(result, Village):
+            result.close()
+
+        return seconds
+
+    for _ in range(warmup):
+        once()
+
+    times = [once() for _ in range(repeat)]
+
+    return {"min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.fmean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "max": max(times),
+            "times": times}
+
+
+def measure_memory(size: int,
+                   engine: Engine = Engine.OBJECTS,
+                   seed: int = 1337,
+                   shards: int = None) -> dict:
+    """
+    memory of a housed village traced while it is built, returns bytes per villager
+    """
+    # catalogues and names are shared by all villages
+    Building.load_buildings()
+    Villager.load_names()
+    random.seed(seed)
+
+    gc.collect()
+    tracemalloc.start()
+    village = housed_village(size, engine, seed, shards)
+    gc.collect()
+    memory, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    village.close()
+    return {"bytes": memory,
+            "peak": peak,
+            "population": village.population,
+            "bytes_per_villager": memory / max(village.population, 1)}
+
+
+def run_benchmarks(names: list[str] = None,
+                   sizes: tuple[int] = None,
+                   engines: tuple[Engine] = (Engine.OBJECTS,),
+                   repeat: int = DEFAULT_REPEAT,
+                   warmup: int = DEFAULT_WARMUP,
+                   years: int = 1,
+                   seed: int = 1337,
+                   shards: tuple[int] = None) -> dict:
+    """
+    runs benchmarks, results are keyed by benchmark, engine and population,
+    the sharded engine runs once per shard count, without sizes every benchmark
+    runs its own populations
+    """
+    shards = default_shards() if shards is None else shards
+
+    configurations = []
+    for engine in engines:
+        if engine == Engine.SHARDED:
+            configurations.extend((engine, count, f"sharded-{count}") for count in shards)
+        else:
+            configurations.append((engine, None, engine.name.lower()))
+
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names is not None and benchmark.name not in names:
+            continue
+
+        benchmark_sizes = benchmark.sizes if sizes is None else sizes
+        for (engine, count, label), size in itertools.product(configurations, benchmark_sizes):
+            if benchmark.max_size is not None and size > benchmark.max_size:
+                continue
+
+            # every benchmark sees the same villages
+            random.seed(seed)
+            timed = benchmark.setup(size, engine, years, count)
+            if isinstance(timed, Timed) is False:
+                timed = Timed(timed)
+
+            key = f"{benchmark.name}/{label}/{size}"
+            try:
+                results[key] = measure(timed.run, repeat, warmup, timed.prepare)
+            finally:
+                if timed.close is not None:
+                    timed.close()
+
+            throughput = ""
+            if timed.bytes is not None:
+                results[key]["bytes"] = timed.bytes
+                results[key]["mb_per_second"] = timed.bytes / 1_000_000 / results[key]["median"]
+                throughput = f"{results[key]['mb_per_second']:>12.2f} MB/s"
+            print(f"{key:<40}{results[key]['median'] * 1000:>12.3f} ms{throughput}",
+                  file=sys.stderr)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    compares medians with the baseline, returns the benchmarks of both
+    """
+    comparison = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        ratio = result["median"] / baseline[key]["median"]
+        comparison.append({"benchmark": key,
+                           "baseline": baseline[key]["median"],
+                           "median": result["median"],
+                           "ratio": ratio,
+                           "regression": ratio > 1 + threshold})
+
+    return comparison
+
+
+def _main_memory(args: argparse.Namespace, engines: tuple[Engine]) -> int:
+    """
+    memory part of the command line
+    """
+    shards = default_shards() if args.shards is None else tuple(args.shards)
+
+    sizes = DEFAULT_SIZES if args.sizes is None else args.sizes
+
+    results = {}
+    for engine, size in itertools.product(engines, sizes):
+        if engine == Engine.SHARDED:
+            configurations = [(count, f"sharded-{count}") for count in shards]
+        else:
+            configurations = [(None, engine.name.lower())]
+
+        for count, label in configurations:
+            key = f"memory/{label}/{size}"
+            results[key] = measure_memory(size, engine, args.seed, count)
+            print(f"{key:<40}{results[key]['bytes_per_villager']:>12.1f} bytes/villager",
+                  file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "seed": args.seed,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "memory": results}
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return 0
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    command line, returns 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description="Village Skylines benchmarks")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="benchmarks to run, all by default: "
+                        + ", ".join(benchmark.name for benchmark in BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="populations, by default 1000, 10000 and 100000, "
+                        "save and load also run with 1000000")
+    parser.add_argument("--engine", choices=("objects", "arrays", "sharded", "all"),
+                        default="objects", help="population engine")
+    parser.add_argument("--shards", type=int, nargs="+", default=None,
+                        help="shard counts of the sharded engine, "
+                        "powers of two up to the number of cores by default")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="measured runs of each benchmark")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP,
+                        help="unmeasured runs before the measured ones")
+    parser.add_argument("--years", type=int, default=1,
+                        help="simulated years of the years benchmark")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--memory", action="store_true",
+                        help="measures memory per villager instead of time")
+    parser.add_argument("--output", help="writes results as json")
+    parser.add_argument("--baseline", help="json results to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown of the median that is a regression")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.benchmarks) - {benchmark.name for benchmark in BENCHMARKS}
+    if len(unknown) > 0:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    if args.engine == "all":
+        engines = tuple(Engine)
+    else:
+        engines = (Engine[args.engine.upper()],)
+
+    if args.memory is True:
+        return _main_memory(args, engines)
+
+    results = run_benchmarks(args.benchmarks or None,
+                             None if args.sizes is None else tuple(args.sizes),
+                             engines,
+                             args.repeat,
+                             args.warmup,
+                             args.years,
+                             args.seed,
+                             None if args.shards is None else tuple(args.shards))
+
+    report = {"meta": {"python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "repeat": args.repeat,
+                       "warmup": args.warmup,
+                       "years": args.years,
+                       "seed": args.seed,
+                       "cores": os.cpu_count(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+
+    regressions = 0
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+        report["comparison"] = compare(results, baseline, args.threshold)
+        for entry in report["comparison"]:
+            flag = "REGRESSION" if entry["regression"] is True else ""
+            print(f"{entry['benchmark']:<40}{entry['ratio']:>8.2f}x  {flag}", file=sys.stderr)
+            regressions += entry["regression"] is True
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
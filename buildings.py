@@ -3,23 +3,31 @@ Building class
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+import io
+import itertools
 import json
+import struct
 
-from jobs import Job
+from jobs import Job, override
 from family import Family
 from villagers import Adult
 import constants
+import savegame
 
 
 class Building:
     """
     Building class
     """
+    _kind = savegame.BUILDING
     _initialized = False
     buildings = []
     houses = []
     businesses = []
 
+    # versions are unique over all buildings
+    _versions = itertools.count(1)
+
     def __init__(self,
                  _id: int,
                  name: str,
@@ -32,6 +40,7 @@ class Building:
         self._appeal = appeal
 
         self._id = _id
+        self._version = next(Building._versions)
 
         Building.load_buildings()
 
@@ -56,6 +65,26 @@ class Building:
         """
         self._id = value
 
+    @property
+    def kind(self) -> int:
+        """
+        kind getter, as stored in save games
+        """
+        return self._kind
+
+    @property
+    def version(self) -> int:
+        """
+        version getter, changes with every change of the building
+        """
+        return self._version
+
+    def _changed(self) -> None:
+        """
+        new version after a change
+        """
+        self._version = next(Building._versions)
+
     @property
     def name(self) -> str:
         """
@@ -84,17 +113,50 @@ class Building:
         """
         return self._appeal
 
+    def save(self, file: io.BufferedWriter) -> None:
+        """
+        save building to file
+        """
+        file.write(struct.pack(">BI", self._kind, self._id))
+        savegame.write_str(file, self._name)
+        file.write(struct.pack(">ddd", self._cost, self._running_costs, self._appeal))
+
+    @staticmethod
+    def load(file: io.BufferedReader) -> "Building":
+        """
+        load building, house or business from file
+        """
+        [kind, _id] = struct.unpack(">BI", file.read(5))
+        name = savegame.read_str(file)
+        [cost, running_costs, appeal] = struct.unpack(">ddd", file.read(24))
+
+        match kind:
+            case savegame.HOUSE:
+                return House.load_data(file, _id, name, cost, running_costs, appeal)
+            case savegame.BUSINESS:
+                return Business.load_data(file, _id, name, cost, running_costs, appeal)
+
+        return Building(_id, name, cost, running_costs, appeal)
+
     @staticmethod
-    def load_buildings() -> None:
+    def load_buildings(overrides: dict = None) -> None:
         """
-        load all buildings from file
+        load all buildings from file, overrides by kind and name replace values of the file
+        and load the buildings again
         """
-        if Building._initialized is True:
+        if Building._initialized is True and overrides is None:
             return
 
+        overrides = {} if overrides is None else overrides
+        unknown = set(overrides) - {"buildings", "houses", "businesses"}
+        if len(unknown) > 0:
+            raise KeyError(f"unknown building kinds {', '.join(sorted(unknown))}")
+
         Building._initialized = True
         with open("data/buildings.json", encoding="utf-8") as file:
             data = json.load(file)
+            for kind in ("buildings", "houses", "businesses"):
+                data[kind] = override(data[kind], overrides.get(kind, None))
 
             # initialize general buildings
             Building.buildings = []
@@ -140,6 +202,8 @@ class House(Building):
     """
     House class
     """
+    _kind = savegame.HOUSE
+
     def __init__(self,
                  _id: int,
                  name: str,
@@ -153,6 +217,7 @@ class House(Building):
         self._free_capacity = capacity
 
         self._families = set()
+        self._index = None
 
     def __copy__(self) -> "House":
         return House(_id=self._id,
@@ -176,12 +241,23 @@ class House(Building):
         """
         return self._free_capacity
 
+    @property
+    def families(self) -> set[Family]:
+        """
+        families getter
+        """
+        return self._families
+
     def move_in(self, family: Family) -> None:
         """
         Family move in
         """
         self._families.add(family)
         self._free_capacity -= len(family)
+        self._changed()
+
+        if self._index is not None:
+            self._index.update(self)
 
     def move_out(self, family: Family) -> None:
         """
@@ -189,12 +265,48 @@ class House(Building):
         """
         self._families.remove(family)
         self._free_capacity += len(family)
+        self._changed()
+
+        if self._index is not None:
+            self._index.update(self)
+
+    def set_index(self, index) -> None:
+        """
+        set index that is notified when the free capacity changes
+        """
+        self._index = index
+
+    def save(self, file: io.BufferedWriter) -> None:
+        """
+        save house to file
+        """
+        super().save(file)
+        file.write(struct.pack(">ii", self._capacity, self._free_capacity))
+
+    @classmethod
+    def load_data(cls,
+                  file: io.BufferedReader,
+                  _id: int,
+                  name: str,
+                  cost: float,
+                  running_costs: float,
+                  appeal: float) -> "House":
+        """
+        load house specific data from file
+        """
+        [capacity, free_capacity] = struct.unpack(">ii", file.read(8))
+
+        house = cls(_id, name, cost, running_costs, appeal, capacity)
+        house._free_capacity = free_capacity
+
+        return house
 
     def destroy(self) -> None:
         """
         destroy house and move out all inhabitants
         """
-        for family in self._families:
+        # moving out changes the families of the house
+        for family in list(self._families):
             family.set_house(None)
 
 
@@ -202,6 +314,8 @@ class Business(Building):
     """
     Business class
     """
+    _kind = savegame.BUSINESS
+
     def __init__(self,
                  _id: int,
                  name: str,
@@ -212,7 +326,7 @@ class Business(Building):
                  jobs: {str: int} = None) -> None:
         super().__init__(_id, name, cost, running_costs, appeal)
 
-        self.active = True
+        self._active = True
 
         self._income = income
 
@@ -220,7 +334,10 @@ class Business(Building):
             self._open_jobs = {}
         else:
             self._open_jobs = jobs
-        self._employees = set()
+        # dict keeps the order of hiring, so fired employees queue up in the same order
+        self._employees = {}
+        self._labor_market = None
+        self._tax_portion = constants.INCOME_TAX_PORTION
 
         self._total_income = self._income - self._running_costs
 
@@ -231,7 +348,22 @@ class Business(Building):
                         running_costs=self._running_costs,
                         appeal=self._appeal,
                         income=self._income,
-                        jobs=self._open_jobs)
+                        jobs=dict(self._open_jobs))
+
+    @property
+    def active(self) -> bool:
+        """
+        active getter
+        """
+        return self._active
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        """
+        active setter
+        """
+        self._active = value
+        self._changed()
 
     @property
     def income(self) -> float:
@@ -262,7 +394,14 @@ class Business(Building):
         return sum(self.open_jobs.values())
 
     @property
-    def employees(self) -> set[Adult]:
+    def tax_portion(self) -> float:
+        """
+        portion of the income of employees the village gets as tax
+        """
+        return self._tax_portion
+
+    @property
+    def employees(self) -> dict[Adult, None]:
         """
         employees getter
         """
@@ -277,16 +416,21 @@ class Business(Building):
             self._open_jobs.pop(job_id)
 
         # assign the job to an adult
-        self._employees.add(adult)
+        self._employees[adult] = None
         adult.set_job(job_id, self)
 
+        if self._labor_market is not None:
+            self._labor_market.remove_unemployed(adult)
+            self._labor_market.update_vacancy(self)
+
         # gets income from job
         job = Job.jobs[job_id]
         if job.payed_by_village:
             self._total_income -= job.income
 
         # gets taxes
-        self._total_income += job.income * constants.INCOME_TAX_PORTION
+        self._total_income += job.income * self._tax_portion
+        self._changed()
 
     def try_acquire_job(self, adult: Adult) -> bool:
         """
@@ -306,7 +450,7 @@ class Business(Building):
         """
         loose job        
         """
-        self._employees.remove(adult)
+        del self._employees[adult]
 
         if adult.job_id in self._open_jobs:
             self._open_jobs[adult.job_id] += 1
@@ -317,11 +461,74 @@ class Business(Building):
         if job.payed_by_village:
             self._total_income += job.income
 
-        self._total_income -= job.income * constants.INCOME_TAX_PORTION
+        self._total_income -= job.income * self._tax_portion
+        self._changed()
+
+        if self._labor_market is not None:
+            self._labor_market.update_vacancy(self)
+
+    def save(self, file: io.BufferedWriter) -> None:
+        """
+        save business to file, employees are saved with the adults
+        """
+        super().save(file)
+        file.write(struct.pack(">dd?H",
+                               self._income,
+                               self._total_income,
+                               self.active,
+                               len(self._open_jobs)))
+
+        for job_id, count in self._open_jobs.items():
+            savegame.write_str(file, job_id)
+            file.write(struct.pack(">i", count))
+
+    @classmethod
+    def load_data(cls,
+                  file: io.BufferedReader,
+                  _id: int,
+                  name: str,
+                  cost: float,
+                  running_costs: float,
+                  appeal: float) -> "Business":
+        """
+        load business specific data from file
+        """
+        [income, total_income, active, job_count] = struct.unpack(">dd?H", file.read(19))
+
+        jobs = {}
+        for _ in range(job_count):
+            job_id = savegame.read_str(file)
+            [jobs[job_id]] = struct.unpack(">i", file.read(4))
+
+        business = cls(_id, name, cost, running_costs, appeal, income, jobs)
+        business._total_income = total_income
+        business.active = active
+
+        return business
+
+    def set_labor_market(self, labor_market) -> None:
+        """
+        set labor market that is notified about open positions
+        """
+        self._labor_market = labor_market
+
+    def set_tax_portion(self, tax_portion: float) -> None:
+        """
+        set tax portion of the village, before anybody is employed
+        """
+        self._tax_portion = tax_portion
 
     def destroy(self) -> None:
         """
         destroys the business and removes all jobs
         """
+        labor_market = self._labor_market
+        if labor_market is not None:
+            labor_market.remove_business(self)
+
         for adult in self._employees:
             adult.set_job(None, destroyed_workplace=True)
+
+            # employees are looking for a new job
+            if labor_market is not None:
+                labor_market.add_unemployed(adult)
@@ -0,0 +1,48 @@
+"""
+Changes of the families of a village
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+from typing import TYPE_CHECKING
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from family import Family
+
+
+class ChangeLog:
+    """
+    Families that joined, changed their members, jobs or house, or left a village,
+    filled by the village while a journal follows it
+    """
+    def __init__(self) -> None:
+        # dicts keep the order of the changes
+        self._changed = {}
+        self._left = {}
+
+    def changed(self, family: "Family") -> None:
+        """
+        family joined or changed
+        """
+        self._changed[family] = None
+
+    def left(self, family: "Family") -> None:
+        """
+        family left
+        """
+        self._changed.pop(family, None)
+        self._left[family] = None
+
+    @property
+    def changed_families(self) -> list["Family"]:
+        """
+        families that joined or changed, in the order of their first change
+        """
+        return list(self._changed)
+
+    @property
+    def left_families(self) -> list["Family"]:
+        """
+        families that left
+        """
+        return list(self._left)
@@ -3,6 +3,8 @@ Some Constants
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+from typing import NamedTuple
+
 ADULT_AGE = 6570                # 18 * 365
 SENIOR_AGE = 29200              # 80 * 365
 MAX_AGE = 43800                # 120 * 365
@@ -10,3 +12,15 @@ MAX_AGE = 43800                # 120 * 365
 MIN_HAPPINESS = 15.0
 
 INCOME_TAX_PORTION = 0.021      # 0.14 * 0.15 
+
+# least happiness of families that move in from a neighbour village
+MIGRANT_HAPPINESS = 50.0
+
+
+class Constants(NamedTuple):
+    """
+    Balance constants of one village, the module constants are the defaults
+    """
+    min_happiness: float = MIN_HAPPINESS
+    income_tax_portion: float = INCOME_TAX_PORTION
+    migrant_happiness: float = MIGRANT_HAPPINESS
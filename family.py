@@ -3,39 +3,49 @@ Villager related data classes
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+import math
 import random
-import struct
-import io
+from typing import TYPE_CHECKING
 
 import constants
 from villagers import Villager, Child, Adult, Senior
 
+# includes only needed for typing
+if TYPE_CHECKING:
+    from savegame import StringTable
+
 
 class Family:
     """
     Family class
     """
-    def __init__(self, villagers: set[Villager]):
-        # gets villager
-        self._children = {v for v in villagers if isinstance(v, Child)}
-        self._adults = {v for v in villagers if isinstance(v, Adult)}
-        self._seniors = {v for v in villagers if isinstance(v, Senior)}
+    def __init__(self, villagers: list[Villager]):
+        # gets villager, dicts keep the order of the members, so seniors die in the same order
+        self._children = dict.fromkeys(v for v in villagers if isinstance(v, Child))
+        self._adults = dict.fromkeys(v for v in villagers if isinstance(v, Adult))
+        self._seniors = dict.fromkeys(v for v in villagers if isinstance(v, Senior))
 
         # updates villager in families
-        self._children.update([v for v in villagers if v.age < constants.ADULT_AGE])
-        self._adults.update([v for v in villagers if v.age >= constants.ADULT_AGE \
-                             and v.age < constants.SENIOR_AGE])
-        self._seniors.update([v for v in villagers if v.age >= constants.SENIOR_AGE])
+        self._children.update(dict.fromkeys(v for v in villagers if v.age < constants.ADULT_AGE))
+        self._adults.update(dict.fromkeys(v for v in villagers if v.age >= constants.ADULT_AGE \
+                                          and v.age < constants.SENIOR_AGE))
+        self._seniors.update(dict.fromkeys(v for v in villagers
+                                           if v.age >= constants.SENIOR_AGE))
 
         # calculates the people in the family
         self._len = len(self._children) + len(self._adults) + len(self._seniors)
 
-        # calculates the mean happiness
-        self._mean_happiness = (sum(child.happiness for child in self._children) +
-                                sum(adult.happiness for adult in self._adults) +
-                                sum(senior.happiness for senior in self._seniors)) / len(self)
+        # calculates the mean happiness, kept up to date by tick
+        self._happiness_sum = (sum(child.happiness for child in self._children) +
+                               sum(adult.happiness for adult in self._adults) +
+                               sum(senior.happiness for senior in self._seniors))
+        self._mean_happiness = self._happiness_sum / len(self)
 
         self._house = None
+        self._village = None
+
+        for villager in villagers:
+            villager.set_family(self)
 
     def __len__(self) -> int:
         return self._len
@@ -48,11 +58,18 @@ class Family:
         return self._mean_happiness
 
     @property
-    def unemployed_adults(self) -> set[Adult]:
+    def villagers(self) -> list[Villager]:
+        """
+        villagers getter
+        """
+        return [*self._children, *self._adults, *self._seniors]
+
+    @property
+    def unemployed_adults(self) -> list[Adult]:
         """
         unemployed adults getter
         """
-        return {adult for adult in self._adults if adult.job_id is None}
+        return [adult for adult in self._adults if adult.job_id is None]
 
     @property
     def house(self):
@@ -61,92 +78,200 @@ class Family:
         """
         return self._house
 
+    def set_village(self, village) -> None:
+        """
+        set village the family reports its changes to
+        """
+        # events on the clock of the old village would only keep it from batching days
+        if self._village is not None:
+            for villager in self.villagers:
+                if villager.transition is not None:
+                    self._village.scheduler.cancel(villager.transition)
+                    villager.transition = None
+
+        self._village = village
+        if village is None:
+            return
+
+        for villager in self.villagers:
+            villager.set_clock(village.scheduler)
+            self._schedule_transition(villager)
+
+    def changed(self) -> None:
+        """
+        reports a change of members, jobs or house to the village
+        """
+        if self._village is not None:
+            self._village.family_changed(self)
+
     def tick(self) -> None:
         """
         tick
         """
-        children_to_remove = set()
-        children_to_add = set()
-        seniors_to_remove = set()
-        seniors_to_add = set()
-        adults_to_remove = set()
-        adults_to_add = set()
+        len_before = self._len
+        mean_before = self._mean_happiness
+        happiness_delta = 0.0
+
+        seniors_to_remove = []
 
         # updates attributes for the children
         for child in self._children:
-            child.age += 1
-
             if self._house is None:
-                child.happiness -= 0.05
+                happiness = child.happiness - 0.05
             else:
-                child.happiness += 0.03
+                happiness = child.happiness + 0.03
 
             # clamp happiness
-            child.happiness = max(0.0, min(100.0, child.happiness))
-
-            # lets children grow up
-            if child.age >= constants.ADULT_AGE:
-                children_to_remove.add(child)
-                adults_to_add.add(Adult(child.name, child.age, child.happiness, None))
+            happiness = max(0.0, min(100.0, happiness))
+            happiness_delta += happiness - child.happiness
+            child.happiness = happiness
 
         # updates attributes for the seniors
         for senior in self._seniors:
-            senior.age += 1
-
             if self._house is None:
-                senior.happiness -= 0.05
+                happiness = senior.happiness - 0.05
             else:
-                senior.happiness += 0.02
+                happiness = senior.happiness + 0.02
 
-            # clam< happiness
-            senior.happiness = max(0.0, min(100.0, senior.happiness))
+            # clamp happiness
+            happiness = max(0.0, min(100.0, happiness))
+            happiness_delta += happiness - senior.happiness
+            senior.happiness = happiness
 
             # lets seniors die
             if random.randint(0, constants.MAX_AGE) >= 120 - senior.age:
-                seniors_to_remove.add(senior)
+                seniors_to_remove.append(senior)
                 self._len -= 1
+                happiness_delta -= senior.happiness
                 continue
 
         # updates attributes for the adults
         for adult in self._adults:
-            adult.age += 1
-
             if self._house is None:
-                adult.happiness -= 0.05
+                happiness = adult.happiness - 0.05
             else:
-                adult.happiness += 0.035
+                happiness = adult.happiness + 0.035
 
             if adult.job_id is None:
-                adult.happiness -= 0.03
+                happiness -= 0.03
 
             # clamp happiness
-            adult.happiness = max(0.0, min(100.0, adult.happiness))
+            happiness = max(0.0, min(100.0, happiness))
+            happiness_delta += happiness - adult.happiness
+            adult.happiness = happiness
 
-            # lets adults retire
-            if adult.age >= constants.SENIOR_AGE:
-                adult.set_job(None)
+        # update lists
+        if len(seniors_to_remove) > 0:
+            for senior in seniors_to_remove:
+                del self._seniors[senior]
+            self.changed()
 
-                adults_to_remove.add(adult)
-                seniors_to_add.add(Senior(adult.name, adult.age, adult.happiness))
+        # updates the mean happiness
+        self._happiness_sum += happiness_delta
+        if len(self) > 0:
+            self._mean_happiness = self._happiness_sum / len(self)
 
-        # update lists
-        self._children -= children_to_remove
-        self._children.update(children_to_add)
+        if self._village is not None:
+            self._village.update_aggregates(self._len - len_before,
+                                            self._mean_happiness - mean_before)
+
+    def _schedule_transition(self, villager: Villager) -> None:
+        """
+        schedules the day a villager grows up or retires
+        """
+        scheduler = self._village.scheduler
+        if isinstance(villager, Child):
+            day = math.ceil(villager.birth_day + constants.ADULT_AGE)
+            villager.transition = scheduler.schedule(day, self._grow_up, villager, self._village)
+        elif isinstance(villager, Adult):
+            day = math.ceil(villager.birth_day + constants.SENIOR_AGE)
+            villager.transition = scheduler.schedule(day, self._retire, villager, self._village)
+
+    def _grow_up(self, child: Child, village) -> None:
+        """
+        lets child grow up, called by the scheduler
+        """
+        child.transition = None
+        if self._village is not village or child not in self._children:
+            return
 
-        self._seniors -= seniors_to_remove
-        self._seniors.update(seniors_to_add)
+        del self._children[child]
+        adult = child.grow_up()
+        self._adults[adult] = None
+        self.changed()
 
-        self._adults -= adults_to_remove
-        self._adults.update(adults_to_add)
+        village.labor_market.add_unemployed(adult)
+        self._schedule_transition(adult)
 
-        if len(self) <= 0:
+    def _retire(self, adult: Adult, village) -> None:
+        """
+        lets adult retire, called by the scheduler
+        """
+        adult.transition = None
+        if self._village is not village or adult not in self._adults:
             return
 
-        # calculates the mean happiness
-        self._mean_happiness = ((sum(map(lambda child: child.happiness, self._children)) +
-                                sum(map(lambda adult: adult.happiness, self._adults)) +
-                                sum(map(lambda senior: senior.happiness, self._seniors)))
-                                / len(self))
+        adult.set_job(None)
+        village.labor_market.remove_unemployed(adult)
+
+        del self._adults[adult]
+        self._seniors[adult.retire()] = None
+        self.changed()
+
+    def _daily_drift(self, villager: Villager) -> float:
+        """
+        happiness change per day of a villager, before clamping
+        """
+        if self._house is None:
+            drift = -0.05
+        elif isinstance(villager, Child):
+            drift = 0.03
+        elif isinstance(villager, Senior):
+            drift = 0.02
+        else:
+            drift = 0.035
+
+        if isinstance(villager, Adult) and villager.job_id is None:
+            drift -= 0.03
+
+        return drift
+
+    def batchable_days(self, min_happiness: float) -> int:
+        """
+        number of days until the family may leave or lose a member,
+        these days can be advanced at once
+        """
+        # seniors can die on any day
+        if len(self._seniors) > 0:
+            return 0
+
+        days = constants.MAX_AGE
+
+        # homeless families get unhappier until they leave
+        if self._house is None and len(self) > 0:
+            drift = sum(map(self._daily_drift, self.villagers)) / len(self)
+            days = min(days, math.ceil((self._mean_happiness - min_happiness) / -drift) - 1)
+
+        return max(days, 0)
+
+    def advance(self, days: int) -> None:
+        """
+        advances the family by several days without events
+        """
+        mean_before = self._mean_happiness
+
+        # drift does not change its sign, so clamping once is enough
+        self._happiness_sum = 0.0
+        for villager in self.villagers:
+            villager.happiness = max(0.0, min(100.0, villager.happiness
+                                              + days * self._daily_drift(villager)))
+            self._happiness_sum += villager.happiness
+
+        if len(self) > 0:
+            self._mean_happiness = self._happiness_sum / len(self)
+
+        if self._village is not None:
+            self._village.update_aggregates(0, self._mean_happiness - mean_before)
 
     def set_house(self, house) -> None:
         """
@@ -158,6 +283,8 @@ class Family:
             house.move_in(self)
         self._house = house
 
+        self.changed()
+
     def leave(self) -> None:
         """
         leave city
@@ -167,20 +294,53 @@ class Family:
         for adult in self._adults:
             adult.set_job(None)
 
-    def save(self, file: io.BufferedWriter) -> None:
+    def set_mean_happiness(self, mean_happiness: float) -> None:
         """
-        save family to file
+        mean happiness setter
         """
-        file.write(struct.pack(">III",
-                               len(self._children,
-                               len(self._adults,
-                               len(self._seniors)))))
+        if self._village is not None:
+            self._village.update_aggregates(0, mean_happiness - self._mean_happiness)
+        self._mean_happiness = mean_happiness
 
-        for child in self._children:
-            child.save(file)
+    def restore_house(self, house) -> None:
+        """
+        sets house of a loaded family, the free capacity of the house is already loaded
+        """
+        self._house = house
+        house.families.add(self)
 
-        for adult in self._adults:
-            adult.save(file)
+    def record(self) -> tuple:
+        """
+        family record for saving
+        """
+        return (self._mean_happiness,
+                -1 if self._house is None else self._house.id,
+                len(self._children),
+                len(self._adults),
+                len(self._seniors))
 
-        for senior in self._seniors:
-            senior.save(file)
+    def villager_records(self, strings: "StringTable") -> list[tuple]:
+        """
+        records of all members, children first, then adults and seniors
+        """
+        return [villager.record(strings) for villager in self.villagers]
+
+    @staticmethod
+    def villagers_from_records(record: tuple,
+                               villager_records: list[tuple],
+                               strings: list[str],
+                               businesses: dict) -> list[Villager]:
+        """
+        load members of a family from records
+        """
+        _, _, child_count, adult_count, _ = record
+
+        villagers = [Child.from_record(villager_record, strings)
+                     for villager_record in villager_records[:child_count]]
+        villagers.extend(Adult.from_record(villager_record, strings, businesses)
+                         for villager_record in villager_records[child_count:
+                                                                 child_count + adult_count])
+        villagers.extend(Senior.from_record(villager_record, strings)
+                         for villager_record in villager_records[child_count + adult_count:])
+
+        return villagers
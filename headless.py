@@ -0,0 +1,145 @@
+"""
+Village Skylines without ui, for servers without display
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from journal import Journal
+from population import Engine
+from tick_profiler import TickProfiler
+from village import Village
+
+
+def load_village(path: str) -> Village:
+    """
+    loads save game with its journal
+    """
+    if Journal.exists(path):
+        journal = Journal(path)
+        village = journal.load()
+        journal.close()
+
+        # nothing is appended to the journal, so no changes are logged
+        village.change_log = None
+        return village
+    return Village.open(path)
+
+
+def village_stats(village: Village) -> dict:
+    """
+    stats of one line of output
+    """
+    return {"today": village.scheduler.today,
+            "date": village.get_date_str(),
+            "money": village.money,
+            "population": village.population,
+            "families": len(village.families),
+            "mean_happiness": village.mean_happiness,
+            "appeal": village.appeal,
+            "houses": len(village.houses),
+            "businesses": len(village.businesses),
+            "unemployed": village.labor_market.unemployed_count}
+
+
+def simulate(village: Village,
+             days: int,
+             output,
+             monthly: bool = False,
+             batch: bool = False) -> None:
+    """
+    simulates days as fast as possible and writes stats as json lines,
+    every day or at the start of every month
+    """
+    def write() -> None:
+        output.write(json.dumps(village_stats(village)) + "\n")
+        output.flush()
+
+    write()
+    while days > 0:
+        if monthly is False:
+            step = 1
+        else:
+            step = min(days, village.days_to_next_month)
+
+        if batch is True:
+            village.advance(step)
+        else:
+            for _ in range(step):
+                village.tick()
+
+        days -= step
+        write()
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    command line
+    """
+    parser = argparse.ArgumentParser(description="Village Skylines without ui")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--name", default="Frankfurt", help="name of a new village")
+    source.add_argument("--load", metavar="PATH", help="save game to continue")
+    parser.add_argument("--population", type=int, default=200,
+                        help="population of a new village")
+    parser.add_argument("--seed", type=int, default=1337, help="seed of a new village")
+    parser.add_argument("--engine", choices=("objects", "arrays", "sharded"), default="objects",
+                        help="population engine of a new village")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="processes of the sharded engine, all cores by default")
+    parser.add_argument("--days", type=int, default=365, help="days to simulate")
+    parser.add_argument("--monthly", action="store_true",
+                        help="writes stats every month instead of every day")
+    parser.add_argument("--batch", action="store_true",
+                        help="advances days without events at once")
+    parser.add_argument("--output", metavar="PATH", help="json lines file, stdout by default")
+    parser.add_argument("--save", metavar="PATH", help="saves the village at the end")
+    parser.add_argument("--profile", metavar="PATH", help="writes tick phase timings as json")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.load is not None:
+        village = load_village(args.load)
+    else:
+        village = Village.create_village(args.name,
+                                         args.population,
+                                         engine=Engine[args.engine.upper()],
+                                         seed=args.seed,
+                                         shards=args.shards)
+
+    if args.profile is not None:
+        village.profiler = TickProfiler()
+
+    output = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8")
+    try:
+        simulate(village, args.days, output, args.monthly, args.batch)
+    except BrokenPipeError:
+        # reader of stdout quit, for example head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.save is not None:
+        temp_path = args.save + ".tmp"
+        with open(temp_path, "wb") as file:
+            village.save(file)
+        os.replace(temp_path, args.save)
+        Journal.discard(args.save)
+
+    if args.profile is not None:
+        village.profiler.dump(args.profile)
+
+    village.close()
+
+    print(f"simulated {args.days} days in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Free capacity index for houses
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import bisect
+from enum import Enum
+from typing import TYPE_CHECKING
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from buildings import House
+
+# free capacity of unused leaves
+EMPTY = float("-inf")
+
+
+class FitPolicy(Enum):
+    """
+    House search policy enum
+    """
+    FIRST_FIT = 0
+    BEST_FIT = 1
+
+
+class HouseIndex:
+    """
+    Finds a house with enough free capacity in logarithmic time
+
+    first fit uses a max segment tree over the houses in order of purchase,
+    best fit uses buckets of houses with the same free capacity
+    """
+    def __init__(self, policy: FitPolicy = FitPolicy.FIRST_FIT) -> None:
+        self.policy = policy
+
+        # first fit
+        self._slots = {}
+        self._houses = []
+        self._tree = [EMPTY] * 2
+
+        # best fit
+        self._buckets = {}
+        self._capacities = []
+        self._free_capacities = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, house: "House") -> bool:
+        return house in self._slots
+
+    def add(self, house: "House") -> None:
+        """
+        adds house to index
+        """
+        if house in self._slots:
+            return
+
+        # grow tree
+        if len(self._houses) >= len(self._tree) // 2:
+            self._rebuild(len(self._tree))
+
+        self._slots[house] = len(self._houses)
+        self._houses.append(house)
+        self._set_tree(self._slots[house], house.free_capacity)
+
+        self._add_bucket(house, house.free_capacity)
+
+        house.set_index(self)
+
+    def remove(self, house: "House") -> None:
+        """
+        removes house from index
+        """
+        if house not in self._slots:
+            return
+
+        slot = self._slots.pop(house)
+        self._houses[slot] = None
+        self._set_tree(slot, EMPTY)
+
+        self._remove_bucket(house)
+
+        house.set_index(None)
+
+    def update(self, house: "House") -> None:
+        """
+        updates free capacity of house
+        """
+        if house not in self._slots:
+            return
+
+        self._set_tree(self._slots[house], house.free_capacity)
+
+        self._remove_bucket(house)
+        self._add_bucket(house, house.free_capacity)
+
+    def find(self, capacity: int) -> "House":
+        """
+        find house with enough capacity else return None
+        """
+        if self.policy == FitPolicy.BEST_FIT:
+            return self._find_best_fit(capacity)
+        return self._find_first_fit(capacity)
+
+    def _find_first_fit(self, capacity: int) -> "House":
+        """
+        first house in order of purchase with enough free capacity
+        """
+        if self._tree[1] < capacity:
+            return None
+
+        # walks down to the leftmost leaf with enough free capacity
+        node = 1
+        leaves = len(self._tree) // 2
+        while node < leaves:
+            node *= 2
+            if self._tree[node] < capacity:
+                node += 1
+
+        return self._houses[node - leaves]
+
+    def _find_best_fit(self, capacity: int) -> "House":
+        """
+        house with the least free capacity that is still enough
+        """
+        i = bisect.bisect_left(self._capacities, capacity)
+        if i >= len(self._capacities):
+            return None
+
+        return next(iter(self._buckets[self._capacities[i]]))
+
+    def _set_tree(self, slot: int, value: int) -> None:
+        """
+        sets leaf and updates the maxima above it
+        """
+        node = slot + len(self._tree) // 2
+        self._tree[node] = value
+
+        node //= 2
+        while node >= 1:
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+            node //= 2
+
+    def _rebuild(self, leaves: int) -> None:
+        """
+        rebuilds the segment tree with a number of leaves
+        """
+        self._tree = [EMPTY] * (2 * leaves)
+        for slot, house in enumerate(self._houses):
+            if house is not None:
+                self._tree[leaves + slot] = house.free_capacity
+
+        for node in range(leaves - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def _add_bucket(self, house: "House", free_capacity: int) -> None:
+        """
+        adds house to bucket of its free capacity
+        """
+        bucket = self._buckets.get(free_capacity, None)
+        if bucket is None:
+            bucket = self._buckets[free_capacity] = {}
+            bisect.insort(self._capacities, free_capacity)
+
+        bucket[house] = None
+        self._free_capacities[house] = free_capacity
+
+    def _remove_bucket(self, house: "House") -> None:
+        """
+        removes house from bucket of its last known free capacity
+        """
+        free_capacity = self._free_capacities.pop(house)
+
+        bucket = self._buckets[free_capacity]
+        bucket.pop(house)
+        if len(bucket) <= 0:
+            self._buckets.pop(free_capacity)
+            self._capacities.pop(bisect.bisect_left(self._capacities, free_capacity))
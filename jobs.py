@@ -6,6 +6,20 @@ __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 import json
 
 
+def override(entries: list[dict], overrides: dict) -> list[dict]:
+    """
+    replaces values of catalogue entries by their name
+    """
+    if overrides is None:
+        return entries
+
+    unknown = set(overrides) - {entry.get("name", None) for entry in entries}
+    if len(unknown) > 0:
+        raise KeyError(f"unknown catalogue entries {', '.join(sorted(unknown))}")
+
+    return [dict(entry, **overrides.get(entry.get("name", None), {})) for entry in entries]
+
+
 class Job:
     """
     Job class
@@ -39,18 +53,20 @@ class Job:
         return self._payed_by_village
 
     @staticmethod
-    def load_jobs() -> None:
+    def load_jobs(overrides: dict = None) -> None:
         """
-        load all jobs from file
+        load all jobs from file, overrides by name replace values of the file
+        and load the jobs again
         """
-        if Job._initialized is True:
+        if Job._initialized is True and overrides is None:
             return
 
         Job._initialized = True
         with open("data/jobs.json", encoding="utf-8") as file:
-            data = json.load(file)
+            data = override(json.load(file), overrides)
 
             # initialize jobs
+            Job.jobs.clear()
             for job in data:
                 Job.jobs[job["name"]] = Job(name=job.get("name", "unknown job"),
                                              income=job.get("income", 0.0),
@@ -0,0 +1,590 @@
+"""
+Incremental save games
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import io
+import os
+import struct
+import threading
+import zlib
+from typing import NamedTuple
+
+import savegame
+from buildings import Building
+from change_log import ChangeLog
+from population import ADULT, CHILD, SENIOR, HOMELESS_DRIFT, HOUSED_DRIFT, UNEMPLOYED_DRIFT
+from save_reader import SaveReader
+from village import Village
+
+JOURNAL_MAGIC = b"VSJ"
+JOURNAL_VERSION = 2
+
+# frames are appended to the journal, a torn frame at the end is ignored
+FRAME = b"FRAM"
+FRAME_HEADER = struct.Struct(">4sII")       # tag, bytes of payload, crc32 of payload
+BUILDING_KEY = struct.Struct(">BI")         # kind and id of a destroyed building
+
+
+def journal_paths(path: str) -> (str, str):
+    """
+    paths of the journal and of the journal being compacted of a save game
+    """
+    return (path[:-4] + ".vsj", path[:-4] + ".vsc")
+
+
+def _split_block(family_records: list[tuple], villager_records: list[tuple]):
+    """
+    yields every family record with the records of its members
+    """
+    start = 0
+    for record in family_records:
+        end = start + record[2] + record[3] + record[4]
+        yield (record, villager_records[start:end])
+        start = end
+
+
+def _snapshot_records(snapshot: savegame.Snapshot):
+    """
+    yields strings, record and member records of every family of a snapshot
+    """
+    for strings, family_records, villager_records in snapshot.blocks:
+        for record, members in _split_block(family_records, villager_records):
+            yield (strings.strings, record, members)
+
+
+def _record_block(entries: list[tuple]) -> (savegame.StringTable, list[tuple], list[tuple]):
+    """
+    block of families from records that each have their own strings
+    """
+    table = savegame.StringTable()
+    family_records = []
+    villager_records = []
+    for strings, record, members in entries:
+        family_records.append(record)
+        villager_records.extend((table.add(strings[name]),
+                                 age,
+                                 happiness,
+                                 -1 if job < 0 else table.index(strings[job]),
+                                 workplace_id)
+                                for name, age, happiness, job, workplace_id in members)
+
+    return (table, family_records, villager_records)
+
+
+def _advance_family(record: tuple, members: list[tuple], days: int) -> (tuple, list[tuple]):
+    """
+    record and member records of a family days after they were saved,
+    a family that did not change its members, jobs or house drifts the same every day,
+    so clamping once is enough
+    """
+    _, house_id, child_count, adult_count, _ = record
+
+    advanced = []
+    for i, (name, age, happiness, job, workplace_id) in enumerate(members):
+        if i < child_count:
+            stage = CHILD
+        elif i < child_count + adult_count:
+            stage = ADULT
+        else:
+            stage = SENIOR
+
+        drift = HOMELESS_DRIFT if house_id < 0 else HOUSED_DRIFT[stage]
+        if stage == ADULT and job < 0:
+            drift += UNEMPLOYED_DRIFT
+
+        advanced.append((name,
+                         age + days,
+                         max(0.0, min(100.0, happiness + days * drift)),
+                         job,
+                         workplace_id))
+
+    if len(advanced) > 0:
+        record = (sum(member[2] for member in advanced) / len(advanced), *record[1:])
+
+    return (record, advanced)
+
+
+class Changes(NamedTuple):
+    """
+    Changes of a village since the frame before, taken between two ticks,
+    the frame is built from them later on any thread
+    """
+    # header and random state
+    state: bytes
+
+    # kind and id of destroyed buildings, changed and new buildings as saved
+    destroyed: list[tuple]
+    buildings: list[bytes]
+
+    # families that left, families that joined or changed and their records
+    left: list
+    changed: list
+    block: tuple
+
+
+class Journal:
+    """
+    Incremental save game: a base save game and a journal of frames appended to it,
+    every frame holds money, date and random state, and only the buildings and families
+    that were built, changed or left since the frame before,
+    happiness of unchanged families follows from their drift
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._journal_path, self._compacting_path = journal_paths(path)
+
+        # families are known by ids that stay the same over all frames
+        self._ids = {}
+        self._next_id = 0
+
+        # versions of the buildings at the frame before, only used between two ticks
+        self._building_versions = {}
+
+        # the journal is written on the autosave worker, but closed from anywhere
+        self._lock = threading.Lock()
+        self._file = None
+        self._compaction = None
+
+    @property
+    def path(self) -> str:
+        """
+        path getter
+        """
+        return self._path
+
+    @property
+    def size(self) -> int:
+        """
+        bytes of the journal not yet folded into the base
+        """
+        size = 0
+        for path in (self._journal_path, self._compacting_path):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    @property
+    def base_size(self) -> int:
+        """
+        bytes of the base save game
+        """
+        return os.path.getsize(self._path)
+
+    @property
+    def compacting(self) -> bool:
+        """
+        true while a compaction runs in the background
+        """
+        return self._compaction is not None and self._compaction.is_alive()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        true if the save game has a journal
+        """
+        return any(os.path.exists(journal_path) for journal_path in journal_paths(path))
+
+    @staticmethod
+    def preview(path: str) -> dict:
+        """
+        preview stats of the last frame, of the base save game if there are no frames
+        """
+        # frames of the journal follow the frames of the journal being compacted
+        journal_path, compacting_path = journal_paths(path)
+        for frames_path in (journal_path, compacting_path):
+            data = None
+            for data, _ in Journal._read_frames(frames_path):
+                pass
+
+            if data is not None:
+                return savegame.read_header(io.BytesIO(data), preview_only=True)
+
+        with open(path, "rb") as file:
+            return savegame.read_header(file, preview_only=True)
+
+    @staticmethod
+    def discard(path: str) -> None:
+        """
+        removes the journal of a save game, for example when it is overwritten whole
+        """
+        for journal_path in journal_paths(path):
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+
+    def close(self) -> None:
+        """
+        closes the journal, waits for a running compaction
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        """
+        close
+        """
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def start(self, village: Village) -> None:
+        """
+        writes a new base save game and starts an empty journal
+        """
+        snapshot = village.snapshot()
+        self.follow(village)
+        self.write_base(snapshot)
+
+    def follow(self, village: Village) -> None:
+        """
+        starts logging the changes of the village,
+        called between two ticks right after the snapshot of the base was taken
+        """
+        village.change_log = ChangeLog()
+        self._building_versions = {(building.kind, building.id): building.version
+                                   for building in village.all_buildings}
+
+    def write_base(self, snapshot: savegame.Snapshot) -> None:
+        """
+        writes snapshot as new base save game and starts an empty journal
+        """
+        with self._lock:
+            self._close()
+
+            temp_path = self._path + ".tmp"
+            with open(temp_path, "wb") as file:
+                snapshot.write(file)
+            os.replace(temp_path, self._path)
+
+            Journal.discard(self._path)
+
+            self._ids = {family: i for i, family in enumerate(snapshot.families)}
+            self._next_id = len(snapshot.families)
+
+            self._open()
+
+    def _open(self) -> None:
+        """
+        opens the journal for appending
+        """
+        self._file = open(self._journal_path, "ab")
+        if self._file.tell() <= 0:
+            self._file.write(JOURNAL_MAGIC + struct.pack(">H", JOURNAL_VERSION))
+            self._file.flush()
+
+    def flush(self, village: Village) -> int:
+        """
+        appends the changes since the last flush as one frame, returns its bytes
+        """
+        return self.append(self.frame(self.changes(village)))
+
+    def changes(self, village: Village) -> Changes:
+        """
+        takes the changes of a followed village since the frame before,
+        only consistent between two ticks
+        """
+        log = village.change_log
+        if log is None:
+            raise ValueError("the journal does not follow the village")
+        village.change_log = ChangeLog()
+
+        state = io.BytesIO()
+        village.save_header(state)
+
+        # buildings with a new version were changed or built
+        versions = {}
+        buildings = []
+        for building in village.all_buildings:
+            key = (building.kind, building.id)
+            versions[key] = building.version
+            if self._building_versions.get(key, None) != building.version:
+                file = io.BytesIO()
+                building.save(file)
+                buildings.append(file.getvalue())
+        destroyed = [key for key in self._building_versions if key not in versions]
+        self._building_versions = versions
+
+        changed = log.changed_families
+        strings = savegame.StringTable()
+        family_records = []
+        villager_records = []
+        for family in changed:
+            family_records.append(family.record())
+            villager_records.extend(family.villager_records(strings))
+
+        return Changes(state.getvalue(), destroyed, buildings, log.left_families, changed,
+                       (strings, family_records, villager_records))
+
+    def frame(self, changes: Changes) -> bytes:
+        """
+        frame of the changes since the frame before
+        """
+        # families that joined and left between two frames are not known
+        left_ids = [self._ids.pop(family) for family in changes.left if family in self._ids]
+
+        changed_ids = []
+        for family in changes.changed:
+            if family not in self._ids:
+                self._ids[family] = self._next_id
+                self._next_id += 1
+            changed_ids.append(self._ids[family])
+
+        payload = io.BytesIO()
+        payload.write(changes.state)
+
+        payload.write(struct.pack(">I", len(changes.destroyed)))
+        payload.write(b"".join(BUILDING_KEY.pack(*key) for key in changes.destroyed))
+        savegame.write_section(payload, savegame.BUILDINGS_SECTION, len(changes.buildings))
+        payload.write(b"".join(changes.buildings))
+
+        payload.write(struct.pack(f">I{len(left_ids)}I", len(left_ids), *left_ids))
+        payload.write(struct.pack(f">I{len(changed_ids)}I", len(changed_ids), *changed_ids))
+        savegame.write_record_block(payload, *changes.block)
+
+        return payload.getvalue()
+
+    def append(self, data: bytes) -> int:
+        """
+        appends frame to the journal, returns its bytes,
+        nothing is appended to a closed journal
+        """
+        with self._lock:
+            if self._file is None:
+                return 0
+
+            self._file.write(FRAME_HEADER.pack(FRAME, len(data), zlib.crc32(data)))
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+        return FRAME_HEADER.size + len(data)
+
+    def load(self) -> Village:
+        """
+        loads village from base and journal, later frames are appended to the journal
+        """
+        self.close()
+
+        header, random_state, buildings, records = self._replay(self._compacting_path,
+                                                                self._journal_path)
+
+        ids = list(records)
+        village, families = Village.restore(header,
+                                            random_state,
+                                            buildings,
+                                            [(strings, [record], villager_records)
+                                             for strings, record, villager_records
+                                             in records.values()])
+
+        self._ids = dict(zip(families, ids))
+        self._next_id = max(ids, default=-1) + 1
+        self.follow(village)
+
+        # a compaction that was cut off is done again
+        if os.path.exists(self._compacting_path):
+            self._compaction = threading.Thread(target=self._fold, daemon=True)
+            self._compaction.start()
+
+        Journal._truncate(self._journal_path)
+        self._open()
+
+        return village
+
+    def compact(self) -> threading.Thread:
+        """
+        folds the journal into a new base save game in a background thread,
+        frames flushed meanwhile go to a new journal
+        """
+        with self._lock:
+            if self.compacting is True or self._file is None:
+                return self._compaction
+
+            # the journal of a compaction that was cut off is folded first
+            if os.path.exists(self._compacting_path) is False:
+                self._file.close()
+                os.replace(self._journal_path, self._compacting_path)
+                self._open()
+
+            self._compaction = threading.Thread(target=self._fold, daemon=True)
+            self._compaction.start()
+            return self._compaction
+
+    def _fold(self) -> None:
+        """
+        compaction
+        """
+        header, random_state, buildings, records = self._replay(self._compacting_path)
+
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "wb") as file:
+            Journal._write_base(file, header, random_state, buildings, records)
+        os.replace(temp_path, self._path)
+
+        # frames of the folded journal are all in the base now, replaying them again is harmless
+        os.remove(self._compacting_path)
+
+    def _replay(self, *paths: str) -> (dict, tuple, list[Building], dict):
+        """
+        reads base and the frames of the journals in paths,
+        returns header, random state, buildings and records of the families by id
+        """
+        with SaveReader(self._path) as reader:
+            header = reader.header
+            random_state = reader.random_state
+            buildings = {(building.kind, building.id): building for building in reader.buildings}
+
+            # records keep the day they were saved on, unchanged families are not saved again
+            records = {}
+            ids = iter(reader.family_ids())
+            for i in range(reader.block_count):
+                strings, family_records, villager_records = reader.family_block(i)
+                for record, members in _split_block(family_records, villager_records):
+                    records[next(ids)] = (strings, record, members, header["today"])
+
+        for path in paths:
+            for data, _ in Journal._read_frames(path):
+                file = io.BytesIO(data)
+
+                # state is stored whole in every frame
+                header = savegame.read_header(file)
+                savegame.read_section(file, savegame.RANDOM_SECTION)
+                random_state = savegame.read_random_state(file)
+
+                # buildings that were destroyed, changed or built
+                [count] = struct.unpack(">I", file.read(4))
+                for _ in range(count):
+                    buildings.pop(BUILDING_KEY.unpack(file.read(BUILDING_KEY.size)), None)
+                for _ in range(savegame.read_section(file, savegame.BUILDINGS_SECTION)):
+                    building = Building.load(file)
+                    buildings[(building.kind, building.id)] = building
+
+                # families that left
+                [count] = struct.unpack(">I", file.read(4))
+                for family_id in struct.unpack(f">{count}I", file.read(4 * count)):
+                    records.pop(family_id, None)
+
+                # families that joined or changed
+                [count] = struct.unpack(">I", file.read(4))
+                changed_ids = struct.unpack(f">{count}I", file.read(4 * count))
+                strings, family_records, villager_records = savegame.read_family_block(file)
+                for family_id, (record, members) in zip(changed_ids,
+                                                         _split_block(family_records,
+                                                                      villager_records)):
+                    records[family_id] = (strings, record, members, header["today"])
+
+        # ages and happiness follow the clock since the day a family was saved
+        today = header["today"]
+        for family_id, (strings, record, members, day) in records.items():
+            if day != today:
+                record, members = _advance_family(record, members, today - day)
+            records[family_id] = (strings, record, members)
+
+        return (header, random_state, list(buildings.values()), records)
+
+    @staticmethod
+    def _read_frames(path: str):
+        """
+        yields the payload of every complete frame of a journal and the offset of its end
+        """
+        if os.path.exists(path) is False:
+            return
+
+        with open(path, "rb") as file:
+            magic = file.read(3)
+
+            # cut off before its first frame, for example by a crash
+            if JOURNAL_MAGIC.startswith(magic) is True and len(magic) < 3:
+                return
+
+            if magic != JOURNAL_MAGIC:
+                raise ValueError("not a village skylines journal")
+
+            version = file.read(2)
+            if len(version) < 2:
+                return
+
+            [version] = struct.unpack(">H", version)
+            if version != JOURNAL_VERSION:
+                raise ValueError(f"unsupported journal version {version}")
+
+            while True:
+                frame_header = file.read(FRAME_HEADER.size)
+                if len(frame_header) < FRAME_HEADER.size:
+                    return
+
+                tag, length, checksum = FRAME_HEADER.unpack(frame_header)
+                data = file.read(length)
+                if tag != FRAME or len(data) < length or zlib.crc32(data) != checksum:
+                    return
+
+                yield data, file.tell()
+
+    @staticmethod
+    def _truncate(path: str) -> None:
+        """
+        cuts off a torn end of a journal, frames appended later follow the last complete one
+        """
+        if os.path.exists(path) is False:
+            return
+
+        # a torn header is written again
+        end = 0
+        size = os.path.getsize(path)
+        if size >= len(JOURNAL_MAGIC) + 2:
+            end = len(JOURNAL_MAGIC) + 2
+        for _, end in Journal._read_frames(path):
+            pass
+
+        if size > end:
+            os.truncate(path, end)
+
+    @staticmethod
+    def _write_base(file: io.BufferedWriter,
+                    header: dict,
+                    random_state: (tuple, dict),
+                    buildings: list[Building],
+                    records: dict) -> None:
+        """
+        writes save game from records, with the ids of the families
+        """
+        savegame.write_header(file,
+                              header["name"],
+                              header["money"],
+                              (header["day"], header["month"], header["year"]),
+                              (header["population"], header["happiness"], header["appeal"]),
+                              header["engine"],
+                              header["today"],
+                              header["happiness_total"],
+                              header["balance"])
+
+        index = [(savegame.RANDOM_SECTION, file.tell(), 1)]
+        savegame.write_section(file, savegame.RANDOM_SECTION, 1)
+        savegame.write_random_state(file, random_state)
+
+        index.append((savegame.BUILDINGS_SECTION, file.tell(), len(buildings)))
+        savegame.write_section(file, savegame.BUILDINGS_SECTION, len(buildings))
+        for building in buildings:
+            building.save(file)
+
+        # families, their strings are collected again per block
+        ids = list(records)
+        index.append((savegame.FAMILIES_SECTION, file.tell(), len(ids)))
+        savegame.write_section(file, savegame.FAMILIES_SECTION, len(ids))
+        for i in range(0, len(ids), savegame.BLOCK_SIZE):
+            block = ids[i:i + savegame.BLOCK_SIZE]
+            index.append((savegame.BLOCK_ENTRY, file.tell(), len(block)))
+            savegame.write_record_block(file, *_record_block([records[family_id]
+                                                              for family_id in block]))
+
+        savegame.write_section(file, savegame.END_SECTION, 0)
+
+        # ids after the end, loading in one pass does not need them
+        index.append((savegame.FAMILY_IDS_SECTION, file.tell(), len(ids)))
+        savegame.write_section(file, savegame.FAMILY_IDS_SECTION, len(ids))
+        file.write(struct.pack(f">{len(ids)}I", *ids))
+
+        savegame.write_index(file, index)
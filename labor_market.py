@@ -0,0 +1,113 @@
+"""
+Labor market of a village
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import heapq
+import itertools
+from typing import TYPE_CHECKING
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from buildings import Business
+    from villagers import Adult
+
+
+class LaborMarket:
+    """
+    Registry of unemployed adults and businesses with open positions
+    """
+    def __init__(self) -> None:
+        # unemployed adults in order of registration
+        self._unemployed = {}
+
+        # businesses with open positions, ordered like the village businesses
+        self._order = {}
+        self._counter = itertools.count()
+        self._vacancies = set()
+        self._heap = []
+
+    @property
+    def unemployed_count(self) -> int:
+        """
+        unemployed count getter
+        """
+        return len(self._unemployed)
+
+    @property
+    def vacancy_count(self) -> int:
+        """
+        count of businesses with open positions
+        """
+        return len(self._vacancies)
+
+    def add_unemployed(self, adult: "Adult") -> None:
+        """
+        registers unemployed adult
+        """
+        self._unemployed[adult] = None
+
+    def remove_unemployed(self, adult: "Adult") -> None:
+        """
+        unregisters adult, if registered
+        """
+        self._unemployed.pop(adult, None)
+
+    def add_business(self, business: "Business") -> None:
+        """
+        registers business
+        """
+        self._order[business] = next(self._counter)
+        business.set_labor_market(self)
+        self.update_vacancy(business)
+
+    def remove_business(self, business: "Business") -> None:
+        """
+        unregisters business
+        """
+        self._order.pop(business, None)
+        self._vacancies.discard(business)
+        business.set_labor_market(None)
+
+    def update_vacancy(self, business: "Business") -> None:
+        """
+        updates index after the open jobs of a business changed
+        """
+        if business not in self._order:
+            return
+
+        if len(business.open_jobs) <= 0:
+            self._vacancies.discard(business)
+        elif business not in self._vacancies:
+            self._vacancies.add(business)
+            heapq.heappush(self._heap, (self._order[business], id(business), business))
+
+    def _next_vacancy(self) -> "Business":
+        """
+        first business with open positions, drops stale heap entries
+        """
+        while self._heap:
+            order, _, business = self._heap[0]
+            if business in self._vacancies and self._order.get(business, None) == order:
+                return business
+            heapq.heappop(self._heap)
+        return None
+
+    def hire(self) -> int:
+        """
+        fills open positions with unemployed adults, returns number of hires
+        """
+        hires = 0
+        while self._unemployed:
+            business = self._next_vacancy()
+            if business is None:
+                break
+
+            adult = next(iter(self._unemployed))
+            if business.try_acquire_job(adult) is False:
+                self._vacancies.discard(business)
+                continue
+
+            hires += 1
+
+        return hires
@@ -0,0 +1,158 @@
+"""
+Commands from the ui to the game thread
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import queue
+import sys
+import traceback
+from typing import TYPE_CHECKING
+
+from buildings import Building
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from managers.game_manager import GameManager
+    from village import Village
+    from journal import Journal
+
+
+def succeeded(callback: callable) -> callable:
+    """
+    wraps callback so that it is skipped if its command raised an exception
+    """
+    def call(result) -> None:
+        if isinstance(result, Exception) is False:
+            callback(result)
+
+    return call
+
+
+class Command:
+    """
+    Command executed by the game thread between two ticks,
+    its result is passed to the callback on the ui thread,
+    the result of a failed command is its exception
+    """
+    def __init__(self, callback: callable = None) -> None:
+        self.callback = callback
+
+    def execute(self, game_manager: "GameManager"):
+        """
+        executes command, returns its result
+        """
+        raise NotImplementedError
+
+
+class BuyBuilding(Command):
+    """
+    Buys building from the shop, result is the new building or None
+    """
+    def __init__(self, building: Building, callback: callable = None) -> None:
+        Command.__init__(self, callback)
+        self.building = building
+
+    def execute(self, game_manager: "GameManager") -> Building:
+        return game_manager.village.buy_building(self.building)
+
+
+class DestroyBuilding(Command):
+    """
+    Destroys building of the village
+    """
+    def __init__(self, building_type: str, building_id: int, callback: callable = None) -> None:
+        Command.__init__(self, callback)
+        self.building_type = building_type
+        self.building_id = building_id
+
+    def execute(self, game_manager: "GameManager") -> None:
+        game_manager.village.destroy_building(self.building_type, self.building_id)
+
+
+class SetSpeed(Command):
+    """
+    Sets ticks per second, result is the speed
+    """
+    def __init__(self, speed: int, callback: callable = None) -> None:
+        Command.__init__(self, callback)
+        self.speed = speed
+
+    def execute(self, game_manager: "GameManager") -> int:
+        game_manager.update_rate = 1 / self.speed
+        return self.speed
+
+
+class TogglePause(Command):
+    """
+    Pauses or continues the game, result is true if the game runs
+    """
+    def execute(self, game_manager: "GameManager") -> bool:
+        game_manager.toggle()
+        return game_manager.running
+
+
+class SetVillage(Command):
+    """
+    Replaces the village, for example with a loaded one
+    """
+    def __init__(self,
+                 village: "Village",
+                 journal: "Journal" = None,
+                 callback: callable = None) -> None:
+        Command.__init__(self, callback)
+        self.village = village
+        self.journal = journal
+
+    def execute(self, game_manager: "GameManager") -> None:
+        game_manager.set_village(self.village, self.journal)
+
+
+class CommandQueue:
+    """
+    Bounded queue of commands, drained by the game thread between two ticks
+    """
+    def __init__(self, maxsize: int = 64, dispatch: callable = None) -> None:
+        self._queue = queue.Queue(maxsize=maxsize)
+
+        # calls callbacks on the ui thread
+        self._dispatch = dispatch
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, command: Command) -> bool:
+        """
+        adds command, returns false if the queue is full
+        """
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            return False
+        return True
+
+    def drain(self, game_manager: "GameManager") -> int:
+        """
+        executes all queued commands, returns their number
+        """
+        count = 0
+        while True:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+
+            # a failing command must not end the game thread
+            try:
+                result = command.execute(game_manager)
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"{type(command).__name__} failed", file=sys.stderr)
+                traceback.print_exception(error)
+                result = error
+            count += 1
+
+            if command.callback is None:
+                continue
+            if self._dispatch is None:
+                command.callback(result)
+            else:
+                self._dispatch(command.callback, result)
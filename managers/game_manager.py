@@ -3,49 +3,222 @@ Game Manager
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+import os
 import threading
 import time
 
 from village import Village
+from journal import Journal
+from autosave import Autosave
+from village_stats import VillageStats
+from managers.commands import Command, CommandQueue
+
+
+# most ticks done at once after falling behind, older ticks are dropped
+MAX_CATCH_UP = 5
+
+# seconds over which the achieved ticks per second are measured
+TPS_WINDOW = 1.0
 
 
 class GameManager(threading.Thread):
     """
-    Game Manager
+    Game Manager, ticks the village with a fixed timestep
     """
     def __init__(self,
                  main_manager,
                  village: Village,
-                 update_rate: float = 1 / 1) -> None:
+                 update_rate: float = 1 / 1,
+                 incremental_save: bool = False,
+                 autosave_interval: int = 30,
+                 dispatch: callable = None) -> None:
         threading.Thread.__init__(self)
         self.__stop = False
 
         self._main_manager = main_manager
         self._village = village
         self._running = False
-        self.update_rate = update_rate
+
+        # stats for the ui, replaced as a whole after ticks
+        self._stats = VillageStats.of(village)
+
+        # the game thread sleeps on the condition until the next tick or a signal
+        self._condition = threading.Condition()
+        self._update_rate = update_rate
+        self._next_tick = 0.0
+
+        # achieved ticks per second
+        self._ticks_per_second = 0.0
+        self._window_start = time.perf_counter()
+        self._window_ticks = 0
+        self._dropped_ticks = 0
+
+        # changes from the ui are only made between two ticks,
+        # dispatch calls the result callbacks on the ui thread
+        self._commands = CommandQueue(dispatch=dispatch)
+
+        # incremental saves only append the changes to a journal
+        self._incremental_save = incremental_save
+        self._journal = None
+
+        # saves are taken between two ticks and written in the background
+        self._autosave = Autosave(self._snapshot, autosave_interval)
+        self._save_requested = False
+
+    @property
+    def autosave(self) -> Autosave:
+        """
+        autosave getter
+        """
+        return self._autosave
+
+    @property
+    def village(self) -> Village:
+        """
+        village getter, only to be used on the game thread
+        """
+        return self._village
+
+    @property
+    def stats(self) -> VillageStats:
+        """
+        stats of the village after the last ticks
+        """
+        return self._stats
+
+    def publish_stats(self) -> None:
+        """
+        publishes new stats of the village, must be called between two ticks
+        """
+        # unchanged village, the ui keeps the same stats
+        if self._stats.version == self._village.version:
+            return
+
+        self._stats = VillageStats.of(self._village, self._stats)
+
+    @property
+    def running(self) -> bool:
+        """
+        true while the game is not paused
+        """
+        return self._running
+
+    @property
+    def update_rate(self) -> float:
+        """
+        seconds per tick
+        """
+        return self._update_rate
+
+    @update_rate.setter
+    def update_rate(self, value: float) -> None:
+        """
+        update rate setter, the next tick follows the new rate
+        """
+        with self._condition:
+            self._update_rate = value
+            self._next_tick = time.perf_counter() + value
+            self._condition.notify_all()
+
+    @property
+    def target_ticks_per_second(self) -> float:
+        """
+        ticks per second the game should run at, 0 while paused,
+        infinite without an update rate
+        """
+        if self._running is False:
+            return 0.0
+        if self._update_rate <= 0:
+            return float("inf")
+        return 1 / self._update_rate
+
+    @property
+    def ticks_per_second(self) -> float:
+        """
+        ticks per second achieved over the last second
+        """
+        if self._running is False:
+            return 0.0
+        return self._ticks_per_second
+
+    @property
+    def dropped_ticks(self) -> int:
+        """
+        ticks dropped because the game fell too far behind
+        """
+        return self._dropped_ticks
 
     def run(self) -> None:
         """
         run
         """
-        last = 0.0
-        while not self.__stop:
-            while self._running:
-                elapsed = time.time() - last
-                if elapsed < self.update_rate:
+        while True:
+            with self._condition:
+                # sleeps while paused until something is signaled
+                while self.__stop is False and self._running is False \
+                        and self._save_requested is False and len(self._commands) <= 0:
+                    self._condition.wait()
+
+                if self.__stop is True:
+                    break
+
+                # sleeps until the next tick, signals wake up early
+                delay = self._next_tick - time.perf_counter()
+                if self._running is True and self._save_requested is False \
+                        and len(self._commands) <= 0 and delay > 0:
+                    self._condition.wait(delay)
                     continue
 
-                self._tick()
+            self._run_commands()
+            self._save_if_requested()
+
+            if self._running is True:
+                self._catch_up()
 
-                last = time.time()
+        # write outstanding saves
+        self._save_if_requested()
+        self._autosave.close()
+        if self._journal is not None:
+            self._journal.close()
+
+    def _catch_up(self) -> None:
+        """
+        does all ticks that are due, at most MAX_CATCH_UP at once
+        """
+        now = time.perf_counter()
+
+        ticks = 0
+        while self._next_tick <= now and ticks < MAX_CATCH_UP and self._running is True:
+            self._tick()
+            self._next_tick += self._update_rate
+            ticks += 1
+
+        if ticks > 0:
+            self.publish_stats()
+
+        # too far behind, the missing ticks are dropped,
+        # without an update rate the game runs as fast as it can and drops nothing
+        if self._next_tick <= now:
+            if self._update_rate > 0:
+                self._dropped_ticks += int((now - self._next_tick) / self._update_rate) + 1
+            self._next_tick = now + self._update_rate
+
+        # achieved ticks per second
+        self._window_ticks += ticks
+        elapsed = now - self._window_start
+        if elapsed >= TPS_WINDOW:
+            self._ticks_per_second = self._window_ticks / elapsed
+            self._window_start = now
+            self._window_ticks = 0
 
     def quit(self) -> None:
         """
         quit
         """
-        self._running = False
-        self.__stop = True
+        with self._condition:
+            self._running = False
+            self.__stop = True
+            self._condition.notify_all()
         print("quitting game thread")
 
     def _tick(self) -> None:
@@ -54,28 +227,147 @@ class GameManager(threading.Thread):
         """
         self._village.tick()
 
+        self._run_commands()
+        self._save_if_requested()
+        self._autosave.tick(self._village.scheduler.today)
+
+    def submit(self, command: Command) -> bool:
+        """
+        queues command for the game thread, returns false if the queue is full
+        """
+        with self._condition:
+            submitted = self._commands.submit(command)
+            self._condition.notify_all()
+        return submitted
+
+    def _run_commands(self) -> None:
+        """
+        executes queued commands between two ticks
+        """
+        if self._commands.drain(self) > 0:
+            self.publish_stats()
+
+    def _save_if_requested(self) -> None:
+        """
+        saves between two ticks, if a save was requested
+        """
+        if self._save_requested is True:
+            self._save_requested = False
+            self._autosave.save(self._village.scheduler.today)
+
     def pause(self) -> None:
         """
         pause the game
         """
-        self._running = False
+        self._set_running(False)
 
     def continue_(self) -> None:
         """
         continue the game
         """
-        self._running = True
+        self._set_running(True)
 
     def toggle(self) -> None:
         """
         toggle running the game
         """
-        self._running = not self._running
+        self._set_running(not self._running)
+
+    def _set_running(self, running: bool) -> None:
+        """
+        pauses or continues and wakes up the game thread,
+        time spent paused is not caught up
+        """
+        with self._condition:
+            if running is True and self._running is False:
+                self._next_tick = time.perf_counter() + self._update_rate
+                self._window_start = time.perf_counter()
+                self._window_ticks = 0
+
+            self._running = running
+            self._condition.notify_all()
+
+    def set_village(self, village: Village, journal: Journal = None) -> None:
+        """
+        sets village, with the journal it was loaded from
+        """
+        if self._journal is not None and self._journal is not journal:
+            self._journal.close()
+
+        # the old village is not ticked anymore
+        if self._village is not None and self._village is not village:
+            self._village.close()
+
+        # changes are only logged for a journal
+        if journal is None:
+            village.change_log = None
+
+        self._village = village
+        self._journal = journal
+        self._autosave.reset()
+        self.publish_stats()
 
     def save(self) -> None:
         """
-        saves the current game
+        saves the current game between the next two ticks
         """
-        with open(f"saves/{self._village.name}.vss", "wb") as file:
-            self._village.save(file)
-        print(f"saved game to saves/{self._village.name}.vss!")
+        if self.is_alive() is False:
+            self._autosave.save(self._village.scheduler.today)
+            return
+
+        with self._condition:
+            self._save_requested = True
+            self._condition.notify_all()
+
+    def _snapshot(self) -> callable:
+        """
+        takes snapshot of the village, returns function that writes it
+        """
+        path = f"saves/{self._village.name}.vss"
+
+        if self._incremental_save is False:
+            if self._journal is not None:
+                self.set_village(self._village)
+            snapshot = self._village.snapshot()
+
+            def write() -> int:
+                temp_path = path + ".tmp"
+                with open(temp_path, "wb") as file:
+                    snapshot.write(file)
+                    size = file.tell()
+                os.replace(temp_path, path)
+
+                Journal.discard(path)
+                print(f"saved game to {path}!")
+                return size
+
+            return write
+
+        # first save of a new journal is its base
+        if self._journal is None or self._journal.path != path:
+            self.set_village(self._village, Journal(path))
+            journal = self._journal
+            snapshot = self._village.snapshot()
+            journal.follow(self._village)
+
+            def write_base() -> int:
+                journal.write_base(snapshot)
+                print(f"saved game to {path}!")
+                return journal.base_size
+
+            return write_base
+
+        journal = self._journal
+        changes = journal.changes(self._village)
+
+        def write_frame() -> int:
+            size = journal.append(journal.frame(changes))
+
+            # fold the journal into a new base once it outgrows the base
+            if journal.size > journal.base_size:
+                journal.compact()
+
+            print(f"saved {size} bytes of changes to the journal of {path}!")
+            return size
+
+        return write_frame
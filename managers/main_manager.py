@@ -10,6 +10,9 @@ import managers.game_manager
 import managers.states
 
 from village import Village
+from journal import Journal
+from village_stats import VillageStats
+from managers.commands import Command, SetSpeed, TogglePause, SetVillage, succeeded
 
 
 class MainManager:
@@ -23,7 +26,10 @@ class MainManager:
 
         # set up managers
         self._ui_manager = managers.ui_manager.UIManager(main_manager=self, village=village)
-        self._game_manager = managers.game_manager.GameManager(main_manager=self, village=village)
+        self._game_manager = managers.game_manager.GameManager(main_manager=self,
+                                                                village=village,
+                                                                incremental_save=True,
+                                                                dispatch=self._ui_manager.call_soon)
 
         # subscribe to events
         self._ui_manager.subscribe_key_pressed(self.on_key_pressed)
@@ -54,6 +60,7 @@ class MainManager:
         # pause game
         if state == managers.states.State.INGAME:
             self._game_manager.pause()
+            self._ui_manager.set_paused(True)
             self.change_game_speed(1)
 
     def on_key_pressed(self, key: str) -> None:
@@ -68,7 +75,8 @@ class MainManager:
 
                 # speed manager
                 case "space":
-                    self._game_manager.toggle()
+                    self.submit(TogglePause(callback=succeeded(lambda running:
+                                            self._ui_manager.set_paused(running is False))))
                 case "1":
                     self.change_game_speed(1)
                 case "2":
@@ -82,6 +90,19 @@ class MainManager:
                 case "0":
                     self.change_game_speed(10000000)
 
+    @property
+    def village_stats(self) -> VillageStats:
+        """
+        stats of the village after the last ticks
+        """
+        return self._game_manager.stats
+
+    def submit(self, command: Command) -> bool:
+        """
+        queues command for the game thread, returns false if the queue is full
+        """
+        return self._game_manager.submit(command)
+
     def save_game(self) -> None:
         """
         save game to path
@@ -92,23 +113,30 @@ class MainManager:
         """
         load game from path
         """
-        with open(path, "rb") as file:
-            village = Village.load(file)
-            self._game_manager._village = village
+        journal = None
+        if Journal.exists(path):
+            journal = Journal(path)
+            village = journal.load()
+        else:
+            # only header and buildings are read here, the game thread loads the families
+            village = Village.open(path)
+
+        def loaded(_) -> None:
             self._ui_manager._village = village
-
             self.change_state(managers.states.State.INGAME)
 
+        self.submit(SetVillage(village, journal, callback=succeeded(loaded)))
+
     def delete_game(self, path: str) -> None:
         """
         delete save game
         """
         if path[-4:] == ".vss":
             os.remove(path)
+            Journal.discard(path)
 
     def change_game_speed(self, speed: int) -> None:
         """
         change game speed
         """
-        self._game_manager.update_rate = 1 / speed
-        self._ui_manager.set_game_speed(speed)
+        self.submit(SetSpeed(speed, callback=succeeded(self._ui_manager.set_game_speed)))
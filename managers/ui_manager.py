@@ -3,6 +3,8 @@ UI Manager
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+import collections
+import queue
 import time
 import tkinter as tk
 
@@ -11,6 +13,16 @@ from village import Village
 import ui.frames
 from managers.states import State
 
+# seconds between refreshes while the window is hidden, the game is paused or not shown
+IDLE_RATE = 1 / 4
+
+# milliseconds between checks for calls from other threads
+POLL_INTERVAL = 50
+
+# share of the time between two refreshes the refresh itself may take,
+# slower refreshes are spaced out to leave time to the game thread
+FRAME_BUDGET = 0.5
+
 
 class UIManager(tk.Tk):
     """
@@ -29,6 +41,16 @@ class UIManager(tk.Tk):
         self._village = village
         self._running = True
         self._update_rate = update_rate
+        self._paused = True
+
+        # refreshes are scheduled by the tk main loop
+        self._after_id = None
+        self._frame_times = collections.deque(maxlen=60)
+        self._refresh_rate = update_rate
+
+        # calls from other threads, made on the tk thread
+        self._calls = queue.SimpleQueue()
+        self._poll_id = None
 
         self._current_state = State.ERROR
 
@@ -83,26 +105,33 @@ class UIManager(tk.Tk):
         """
         sets game speed to display
         """
-        self._current_frame.set_speed(speed)
+        self._frames[ui.frames.GameFrame].set_speed(speed)
 
-    def run(self) -> None:
+    def set_paused(self, paused: bool) -> None:
         """
-        main ui loop
+        sets whether the game is paused, refreshes back off while it is
         """
-        last = 0.0
-        while self._running:
-            self.update()
+        self._paused = paused
 
-            elapsed = time.time() - last
-            if elapsed < self._update_rate:
-                continue
-
-            self._tick()
+    @property
+    def frame_stats(self) -> dict:
+        """
+        mean and max seconds of the last refreshes and seconds between refreshes
+        """
+        if len(self._frame_times) <= 0:
+            return {"mean": 0.0, "max": 0.0, "rate": self._refresh_rate}
 
-            last = time.time()
+        return {"mean": sum(self._frame_times) / len(self._frame_times),
+                "max": max(self._frame_times),
+                "rate": self._refresh_rate}
 
-        # quit
-        self.destroy()
+    def run(self) -> None:
+        """
+        main ui loop
+        """
+        self._after_id = self.after(0, self._frame)
+        self._poll_id = self.after(POLL_INTERVAL, self._poll_calls)
+        self.mainloop()
 
     def quit(self) -> None:
         """
@@ -111,6 +140,65 @@ class UIManager(tk.Tk):
         self._running = False
         print("quitting ui thread")
 
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+
+        self.destroy()
+
+    def call_soon(self, func: callable, *args) -> None:
+        """
+        calls function on the tk thread, can be called from any thread
+        """
+        self._calls.put((func, args))
+
+    def _poll_calls(self) -> None:
+        """
+        makes calls from other threads
+        """
+        while True:
+            try:
+                func, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+
+        if self._running is True:
+            self._poll_id = self.after(POLL_INTERVAL, self._poll_calls)
+
+    def _frame(self) -> None:
+        """
+        refreshes the current frame and schedules the next refresh
+        """
+        if self._running is False:
+            return
+
+        start = time.perf_counter()
+        self._tick()
+        frame_time = time.perf_counter() - start
+        self._frame_times.append(frame_time)
+
+        self._refresh_rate = self._next_rate(frame_time)
+        delay = max(self._refresh_rate - frame_time, 0.001)
+        self._after_id = self.after(int(delay * 1000), self._frame)
+
+    def _next_rate(self, frame_time: float) -> float:
+        """
+        seconds until the next refresh
+        """
+        rate = self._update_rate
+
+        # nothing changes or nothing is seen
+        if self._paused is True or self._current_state != State.INGAME \
+                or self.state() in ("withdrawn", "iconic"):
+            rate = max(rate, IDLE_RATE)
+
+        # refresh takes more than its budget
+        return max(rate, frame_time / FRAME_BUDGET)
+
     def _tick(self) -> None:
         """
         tick
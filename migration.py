@@ -0,0 +1,60 @@
+"""
+Families moving between the villages of a region
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import io
+from typing import TYPE_CHECKING
+
+import savegame
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from family import Family
+
+
+class MigrationBatch:
+    """
+    Families that left a village, encoded like a family block of a save game,
+    they take neither house nor jobs with them
+    """
+    def __init__(self) -> None:
+        self._strings = savegame.StringTable()
+        self._family_records = []
+        self._villager_records = []
+
+    def __len__(self) -> int:
+        return len(self._family_records)
+
+    def add(self, family: "Family") -> None:
+        """
+        adds family, before it leaves its village
+        """
+        mean_happiness, _, child_count, adult_count, senior_count = family.record()
+        self._family_records.append((mean_happiness, -1, child_count, adult_count, senior_count))
+
+        self._villager_records.extend((name, age, happiness, -1, -1) for name, age, happiness, _, _
+                                      in family.villager_records(self._strings))
+
+    def encode(self) -> bytes:
+        """
+        all families as one buffer
+        """
+        file = io.BytesIO()
+        savegame.write_record_block(file, self._strings, self._family_records,
+                                    self._villager_records)
+        return file.getvalue()
+
+    @staticmethod
+    def family_count(data: bytes) -> int:
+        """
+        number of families of an encoded batch
+        """
+        return savegame.BLOCK_HEADER.unpack_from(data)[0]
+
+    @staticmethod
+    def decode(data: bytes) -> (list[str], list[tuple], list[tuple]):
+        """
+        strings, family records and villager records of an encoded batch
+        """
+        return savegame.read_family_block(io.BytesIO(data))
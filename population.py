@@ -0,0 +1,705 @@
+"""
+Struct-of-arrays population engine
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+from enum import Enum
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import constants
+import savegame
+from jobs import Job
+from family import Family
+from villagers import Villager, Adult, Senior
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from buildings import Business
+
+# life stages as stored in the stage column
+DEAD = -1
+CHILD = 0
+ADULT = 1
+SENIOR = 2
+
+# happiness drift per day for housed villagers, indexed by stage
+HOUSED_DRIFT = (0.03, 0.035, 0.02)
+HOMELESS_DRIFT = -0.05
+UNEMPLOYED_DRIFT = -0.03
+
+
+class Engine(Enum):
+    """
+    Population engine enum
+    """
+    OBJECTS = 0
+    ARRAYS = 1
+    SHARDED = 2
+
+
+def tick_rows(age: "np.ndarray",
+              happiness: "np.ndarray",
+              stage: "np.ndarray",
+              job: "np.ndarray",
+              housed: "np.ndarray",
+              housed_drift: "np.ndarray",
+              rng: "np.random.Generator") -> ("np.ndarray", "np.ndarray", "np.ndarray"):
+    """
+    ages rows by one day in place, housed is the housed flag of the family of every row,
+    returns the indices of the rows that died, grew up and retired
+    """
+    alive = stage != DEAD
+    children = stage == CHILD
+    adults = stage == ADULT
+    seniors = stage == SENIOR
+
+    age[alive] += 1
+
+    # happiness drift
+    delta = np.where(housed, housed_drift[stage], HOMELESS_DRIFT)
+    delta[adults & (job < 0)] += UNEMPLOYED_DRIFT
+    happiness[alive] = np.clip(happiness[alive] + delta[alive], 0.0, 100.0)
+
+    # lets seniors die
+    senior_rows = np.flatnonzero(seniors)
+    draws = rng.integers(0, constants.MAX_AGE, size=len(senior_rows), endpoint=True)
+    dead_rows = senior_rows[draws >= 120 - age[senior_rows]]
+
+    # lets children grow up and adults retire
+    grown_rows = np.flatnonzero(children & (age >= constants.ADULT_AGE))
+    retired_rows = np.flatnonzero(adults & (age >= constants.SENIOR_AGE))
+    stage[grown_rows] = ADULT
+    stage[retired_rows] = SENIOR
+
+    return dead_rows, grown_rows, retired_rows
+
+
+class Population:
+    """
+    Stores all villagers of a village in contiguous arrays
+    """
+    def __init__(self, capacity: int = 1024, seed: int = 1337) -> None:
+        if np is None:
+            raise ImportError("the array population engine requires numpy")
+
+        Job.load_jobs()
+
+        self.rng = np.random.default_rng(seed)
+
+        # villager columns
+        self._size = 0
+        self.age = self._column("age", capacity, np.float64, 0.0)
+        self.happiness = self._column("happiness", capacity, np.float64, 0.0)
+        self.family = self._column("family", capacity, np.int32, 0)
+        self.stage = self._column("stage", capacity, np.int8, DEAD)
+        self.job = self._column("job", capacity, np.int16, -1)
+        self.names = [None] * capacity
+        self._free_rows = []
+
+        # python side objects, only created when needed
+        self._views = [None] * capacity
+        self._workplaces = {}
+        self.labor_market = None
+
+        # family columns
+        self._family_count = 0
+        self.housed = self._column("housed", 64, np.bool_, False)
+        self.families = [None] * 64
+        self._free_families = []
+
+        # job id <-> job index
+        self.job_names = list(Job.jobs)
+        self._job_index = {name: i for i, name in enumerate(self.job_names)}
+
+        self._housed_drift = np.array(HOUSED_DRIFT + (0.0,), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size - len(self._free_rows)
+
+    def _column(self, name: str, length: int, dtype, fill) -> "np.ndarray":
+        """
+        allocates column filled with fill
+        """
+        # pylint: disable=unused-argument
+        return np.full(length, fill, dtype=dtype)
+
+    def _resize(self, name: str, column: "np.ndarray", length: int, fill) -> "np.ndarray":
+        """
+        returns column with length rows, the existing rows are kept
+        """
+        resized = self._column(name, length, column.dtype, fill)
+        resized[:len(column)] = column
+        return resized
+
+    def _grow(self) -> None:
+        """
+        doubles the capacity of the villager columns
+        """
+        capacity = len(self.age) * 2
+        self.age = self._resize("age", self.age, capacity, 0.0)
+        self.happiness = self._resize("happiness", self.happiness, capacity, 0.0)
+        self.family = self._resize("family", self.family, capacity, 0)
+        self.stage = self._resize("stage", self.stage, capacity, DEAD)
+        self.job = self._resize("job", self.job, capacity, -1)
+
+        self.names.extend([None] * (capacity - len(self.names)))
+        self._views.extend([None] * (capacity - len(self._views)))
+
+    def add_villager(self,
+                     name: str,
+                     age: float,
+                     happiness: float,
+                     stage: int,
+                     family_id: int) -> int:
+        """
+        adds villager and returns its row
+        """
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self._size >= len(self.age):
+                self._grow()
+            row = self._size
+            self._size += 1
+
+        self.names[row] = name
+        self.age[row] = age
+        self.happiness[row] = happiness
+        self.stage[row] = stage
+        self.family[row] = family_id
+        self.job[row] = -1
+
+        return row
+
+    def remove_villager(self, row: int) -> None:
+        """
+        frees row of villager
+        """
+        self.stage[row] = DEAD
+        self.job[row] = -1
+        self.names[row] = None
+        self._views[row] = None
+        self._workplaces.pop(row, None)
+        self._free_rows.append(row)
+
+    def add_family(self, family: "PopulationFamily") -> int:
+        """
+        registers family and returns its id
+        """
+        if self._free_families:
+            family_id = self._free_families.pop()
+        else:
+            if self._family_count >= len(self.families):
+                self.housed = self._resize("housed", self.housed, len(self.housed) * 2, False)
+                self.families.extend([None] * len(self.families))
+            family_id = self._family_count
+            self._family_count += 1
+
+        self.families[family_id] = family
+        self.housed[family_id] = False
+
+        return family_id
+
+    def remove_family(self, family_id: int) -> None:
+        """
+        frees id of family
+        """
+        self.families[family_id] = None
+        self.housed[family_id] = False
+        self._free_families.append(family_id)
+
+    def view(self, row: int) -> "VillagerView":
+        """
+        returns the object view of a villager
+        """
+        view = self._views[row]
+        if view is None:
+            view = VillagerView(self, row)
+            self._views[row] = view
+        return view
+
+    def set_job(self, row: int, job_id: str, workplace: "Business") -> None:
+        """
+        sets job of villager
+        """
+        if job_id is None:
+            self.job[row] = -1
+            self._workplaces.pop(row, None)
+        else:
+            self.job[row] = self._job_index[job_id]
+            self._workplaces[row] = workplace
+
+        self.families[self.family[row]].changed()
+
+    def workplace(self, row: int) -> "Business":
+        """
+        workplace of villager
+        """
+        return self._workplaces.get(row, None)
+
+    def tick(self) -> None:
+        """
+        ages all villagers by one day
+        """
+        size = self._size
+        self._apply_tick(*tick_rows(self.age[:size],
+                                    self.happiness[:size],
+                                    self.stage[:size],
+                                    self.job[:size],
+                                    self.housed[self.family[:size]],
+                                    self._housed_drift,
+                                    self.rng))
+
+    def _apply_tick(self,
+                    dead_rows: "np.ndarray",
+                    grown_rows: "np.ndarray",
+                    retired_rows: "np.ndarray") -> None:
+        """
+        updates jobs, labor market and families after the rows were ticked
+        """
+        for row in retired_rows.tolist():
+            if self.job[row] >= 0:
+                self.view(row).set_job(None)
+            elif self.labor_market is not None:
+                self.labor_market.remove_unemployed(self.view(row))
+
+        if self.labor_market is not None:
+            for row in grown_rows.tolist():
+                self.labor_market.add_unemployed(self.view(row))
+
+        for row in np.concatenate((grown_rows, retired_rows)).tolist():
+            self.families[self.family[row]].changed()
+
+        for row in dead_rows.tolist():
+            self.families[self.family[row]].remove_row(row)
+            self.remove_villager(row)
+
+    def random_state(self) -> dict:
+        """
+        state of the random generator, saved with the village
+        """
+        return self.rng.bit_generator.state
+
+    def set_random_state(self, state: dict) -> None:
+        """
+        restores state of the random generator
+        """
+        self.rng.bit_generator.state = state
+
+    def close(self) -> None:
+        """
+        releases resources, the array engine has none
+        """
+
+    def _daily_drift(self) -> "np.ndarray":
+        """
+        happiness change per day of every row, before clamping
+        """
+        size = self._size
+        stage = self.stage[:size]
+
+        housed = self.housed[self.family[:size]]
+        drift = np.where(housed, self._housed_drift[stage], HOMELESS_DRIFT)
+        drift[(stage == ADULT) & (self.job[:size] < 0)] += UNEMPLOYED_DRIFT
+        drift[stage == DEAD] = 0.0
+
+        return drift
+
+    def batchable_days(self, min_happiness: float) -> int:
+        """
+        number of days until the next event of any villager,
+        these days can be advanced at once
+        """
+        size = self._size
+        stage = self.stage[:size]
+        age = self.age[:size]
+
+        # seniors can die on any day
+        if np.any(stage == SENIOR):
+            return 0
+
+        days = constants.MAX_AGE
+        children = stage == CHILD
+        if np.any(children):
+            days = min(days, np.ceil(constants.ADULT_AGE - age[children]).min() - 1)
+        adults = stage == ADULT
+        if np.any(adults):
+            days = min(days, np.ceil(constants.SENIOR_AGE - age[adults]).min() - 1)
+
+        # homeless families get unhappier until they leave
+        sizes, sums = self.family_stats()
+        drifts = np.bincount(self.family[:size], weights=self._daily_drift(),
+                             minlength=self._family_count)
+        homeless = (sizes > 0) & ~self.housed[:self._family_count]
+        if np.any(homeless):
+            means = sums[homeless] / sizes[homeless]
+            drifts = drifts[homeless] / sizes[homeless]
+            days = min(days, np.ceil((means - min_happiness) / -drifts).min() - 1)
+
+        return int(max(days, 0))
+
+    def advance(self, days: int) -> None:
+        """
+        advances all villagers by several days without events
+        """
+        size = self._size
+        alive = self.stage[:size] != DEAD
+
+        # drift does not change its sign, so clamping once is enough
+        happiness = self.happiness[:size]
+        happiness[alive] = np.clip(happiness[alive] + days * self._daily_drift()[alive],
+                                   0.0, 100.0)
+        self.age[:size][alive] += days
+
+    def family_stats(self) -> ("np.ndarray", "np.ndarray"):
+        """
+        returns size and happiness sum of every family id
+        """
+        size = self._size
+        alive = self.stage[:size] != DEAD
+        family = self.family[:size][alive]
+
+        sizes = np.bincount(family, minlength=self._family_count)
+        sums = np.bincount(family, weights=self.happiness[:size][alive],
+                           minlength=self._family_count)
+        return sizes, sums
+
+    def families_to_remove(self, min_happiness: float) -> list["PopulationFamily"]:
+        """
+        returns families that are unhappy or empty
+        """
+        sizes, sums = self.family_stats()
+        means = np.divide(sums, sizes, out=np.zeros_like(sums), where=sizes > 0)
+
+        families_to_remove = []
+        for family_id, family in enumerate(self.families[:self._family_count]):
+            if family is None:
+                continue
+
+            if sizes[family_id] > 0:
+                family.set_mean_happiness(float(means[family_id]))
+
+            if family.mean_happiness <= min_happiness or sizes[family_id] <= 0:
+                families_to_remove.append(family)
+
+        return families_to_remove
+
+
+class PopulationSnapshot:
+    """
+    Copy of the population columns, taken between two ticks,
+    the records of the families are only built when they are written
+    """
+    def __init__(self, population: Population, families: list["PopulationFamily"]) -> None:
+        size = population._size
+        self._age = population.age[:size].copy()
+        self._happiness = population.happiness[:size].copy()
+        self._stage = population.stage[:size].copy()
+        self._job = population.job[:size].copy()
+        self._names = population.names[:size]
+        self._job_names = population.job_names
+        self._workplace_ids = {row: workplace.id
+                               for row, workplace in population._workplaces.items()}
+
+        self._families = [(family.mean_happiness,
+                           -1 if family.house is None else family.house.id,
+                           list(family._rows)) for family in families]
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def blocks(self, block_size: int):
+        """
+        yields strings, family records and villager records of every block
+        """
+        age = self._age.tolist()
+        happiness = self._happiness.tolist()
+        stage = self._stage.tolist()
+        job = self._job.tolist()
+
+        for i in range(0, len(self._families), block_size):
+            strings = savegame.StringTable()
+            family_records = []
+            villager_records = []
+            for mean_happiness, house_id, rows in self._families[i:i + block_size]:
+                # children first, then adults and seniors
+                rows = sorted(rows, key=stage.__getitem__)
+                stages = [stage[row] for row in rows]
+                family_records.append((mean_happiness,
+                                       house_id,
+                                       stages.count(CHILD),
+                                       stages.count(ADULT),
+                                       stages.count(SENIOR)))
+
+                for row in rows:
+                    job_index = -1 if job[row] < 0 else strings.index(self._job_names[job[row]])
+                    villager_records.append((strings.add(self._names[row]),
+                                             age[row],
+                                             happiness[row],
+                                             job_index,
+                                             self._workplace_ids.get(row, -1)))
+
+            yield (strings, family_records, villager_records)
+
+
+class VillagerView:
+    """
+    Thin object view on one villager row
+    """
+    __slots__ = ("_population", "_row")
+
+    def __init__(self, population: Population, row: int) -> None:
+        self._population = population
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        """
+        row getter
+        """
+        return self._row
+
+    @property
+    def name(self) -> str:
+        """
+        name getter
+        """
+        return self._population.names[self._row]
+
+    @property
+    def age(self) -> float:
+        """
+        age getter
+        """
+        return float(self._population.age[self._row])
+
+    @age.setter
+    def age(self, value: float) -> None:
+        """
+        age setter
+        """
+        self._population.age[self._row] = value
+
+    @property
+    def happiness(self) -> float:
+        """
+        happiness getter
+        """
+        return float(self._population.happiness[self._row])
+
+    @happiness.setter
+    def happiness(self, value: float) -> None:
+        """
+        happiness setter
+        """
+        self._population.happiness[self._row] = value
+
+    @property
+    def stage(self) -> int:
+        """
+        life stage getter
+        """
+        return int(self._population.stage[self._row])
+
+    @property
+    def job_id(self) -> str:
+        """
+        job getter
+        """
+        job = self._population.job[self._row]
+        if job < 0:
+            return None
+        return self._population.job_names[job]
+
+    @property
+    def income_from_tax(self) -> float:
+        """
+        get income from job
+        """
+        if self.job_id is None:
+            return 0.0
+        return Job.jobs[self.job_id].income * self._population.workplace(self._row).tax_portion
+
+    def set_job(self,
+                job_id: str,
+                workplace: "Business" = None,
+                destroyed_workplace: bool = False) -> None:
+        """
+        job setter
+        """
+        if job_id is None:
+            current_workplace = self._population.workplace(self._row)
+            if destroyed_workplace is False and current_workplace is not None:
+                current_workplace.loose_job(self)
+
+        self._population.set_job(self._row, job_id, workplace)
+
+    def record(self, strings: "savegame.StringTable") -> tuple:
+        """
+        villager record for saving
+        """
+        population = self._population
+        row = self._row
+
+        job = -1
+        workplace_id = -1
+        if population.job[row] >= 0:
+            job = strings.index(self.job_id)
+            workplace_id = population.workplace(row).id
+
+        return (strings.add(population.names[row]),
+                float(population.age[row]),
+                float(population.happiness[row]),
+                job,
+                workplace_id)
+
+
+class PopulationFamily(Family):
+    """
+    Family view on rows of a population
+    """
+    # pylint: disable=super-init-not-called
+    def __init__(self, population: Population, villagers: list[Villager]) -> None:
+        self._population = population
+        self._id = population.add_family(self)
+
+        self._house = None
+        self._village = None
+
+        self._rows = []
+        for villager in villagers:
+            if isinstance(villager, Senior):
+                stage = SENIOR
+            elif isinstance(villager, Adult):
+                stage = ADULT
+            else:
+                stage = CHILD
+            row = population.add_villager(villager.name,
+                                          villager.age,
+                                          villager.happiness,
+                                          stage,
+                                          self._id)
+            self._rows.append(row)
+
+            # loaded adults hand their job over to the view
+            if stage == ADULT and villager.job_id is not None:
+                view = population.view(row)
+                villager.workplace.employees.pop(villager, None)
+                villager.workplace.employees[view] = None
+                population.set_job(row, villager.job_id, villager.workplace)
+
+        self._mean_happiness = sum(villager.happiness for villager in villagers) / len(self)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def id(self) -> int:
+        """
+        id getter
+        """
+        return self._id
+
+    @property
+    def villagers(self) -> list[VillagerView]:
+        """
+        villagers getter
+        """
+        return [self._population.view(row) for row in self._rows]
+
+    @property
+    def unemployed_adults(self) -> list[VillagerView]:
+        """
+        unemployed adults getter
+        """
+        stage = self._population.stage
+        job = self._population.job
+        return [self._population.view(row) for row in self._rows
+                if stage[row] == ADULT and job[row] < 0]
+
+    def _rows_of(self, stage: int) -> list[int]:
+        """
+        rows of family members in stage
+        """
+        return [row for row in self._rows if self._population.stage[row] == stage]
+
+    def set_village(self, village) -> None:
+        """
+        set village the family reports its changes to,
+        growing up and retiring are checked by the population each day
+        """
+        self._village = village
+
+    def remove_row(self, row: int) -> None:
+        """
+        removes dead member
+        """
+        self._rows.remove(row)
+
+        if self._village is not None:
+            self._village.update_aggregates(-1, 0.0)
+        self.changed()
+
+
+    def tick(self) -> None:
+        """
+        families are ticked all at once by the population
+        """
+
+    def advance(self, days: int) -> None:
+        """
+        families are advanced all at once by the population
+        """
+
+    def set_house(self, house) -> None:
+        """
+        set house and if null homeless
+        """
+        super().set_house(house)
+        self._population.housed[self._id] = house is not None
+
+    def leave(self) -> None:
+        """
+        leave city
+        """
+        self.set_house(None)
+
+        for row in self._rows_of(ADULT):
+            if self._population.job[row] >= 0:
+                self._population.view(row).set_job(None)
+
+        for row in self._rows:
+            self._population.remove_villager(row)
+        self._rows = []
+
+        self._population.remove_family(self._id)
+
+    def restore_house(self, house) -> None:
+        """
+        sets house of a loaded family, the free capacity of the house is already loaded
+        """
+        super().restore_house(house)
+        self._population.housed[self._id] = True
+
+    def record(self) -> tuple:
+        """
+        family record for saving
+        """
+        stage = self._population.stage[self._rows]
+        return (self._mean_happiness,
+                -1 if self._house is None else self._house.id,
+                int((stage == CHILD).sum()),
+                int((stage == ADULT).sum()),
+                int((stage == SENIOR).sum()))
+
+    def villager_records(self, strings: "savegame.StringTable") -> list[tuple]:
+        """
+        records of all members, children first, then adults and seniors
+        """
+        rows = self._rows_of(CHILD) + self._rows_of(ADULT) + self._rows_of(SENIOR)
+        return [self._population.view(row).record(strings) for row in rows]
@@ -0,0 +1,146 @@
+"""
+Cached previews of save games
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import json
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import Journal, journal_paths
+
+INDEX_FILE = ".previews.json"
+
+
+class PreviewIndex:
+    """
+    Caches the header stats of every save game keyed by path, and size and mtime
+    of the save game and its journals, only changed save games are read again,
+    off the calling thread
+    """
+    def __init__(self, directory: str = "saves", workers: int = 4) -> None:
+        self._directory = directory
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._workers = workers
+
+        self._lock = threading.Lock()
+        self._entries = self._load_index()
+
+    def _load_index(self) -> dict:
+        """
+        loads cached previews from the index file
+        """
+        try:
+            with open(self._index_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        """
+        writes cached previews atomically to the index file
+        """
+        with self._lock:
+            data = json.dumps(self._entries)
+
+        temp_path = self._index_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(temp_path, self._index_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def read_preview(path: str) -> dict:
+        """
+        reads preview stats from the header of a save game or the last frame of its journal
+        """
+        return Journal.preview(path)
+
+    @staticmethod
+    def _stats(path: str) -> list:
+        """
+        size and mtime of the save game and its journals, None for missing journals
+        """
+        stats = [os.stat(path)]
+        for journal_path in journal_paths(path):
+            try:
+                stats.append(os.stat(journal_path))
+            except FileNotFoundError:
+                stats.append(None)
+
+        return [None if stat is None else [stat.st_size, stat.st_mtime] for stat in stats]
+
+    def scan(self, callback: callable) -> threading.Thread:
+        """
+        scans the save games in a background thread,
+        callback is called with path, preview and mtime for each save game as it is known
+        """
+        thread = threading.Thread(target=self._scan, args=(callback,), daemon=True)
+        thread.start()
+        return thread
+
+    def _scan(self, callback: callable) -> None:
+        """
+        scan
+        """
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+
+        paths = set()
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            for name in names:
+                if name[-4:] != ".vss":
+                    continue
+
+                path = os.path.join(self._directory, name)
+                paths.add(path)
+
+                try:
+                    stats = PreviewIndex._stats(path)
+                except OSError:
+                    continue
+
+                with self._lock:
+                    entry = self._entries.get(path, None)
+
+                # unchanged save games come from the cache, frames change the journal only
+                mtime = max(stat[1] for stat in stats if stat is not None)
+                if entry is not None and entry.get("stats", None) == stats:
+                    callback(path, entry["preview"], mtime)
+                    continue
+
+                executor.submit(self._read, path, stats, mtime, callback)
+
+        # forget deleted save games
+        with self._lock:
+            for path in set(self._entries) - paths:
+                self._entries.pop(path)
+
+        self._save_index()
+
+    def _read(self, path: str, stats: list, mtime: float, callback: callable) -> None:
+        """
+        reads preview of a changed save game
+        """
+        try:
+            preview = PreviewIndex.read_preview(path)
+        except (OSError, ValueError, struct.error):
+            return
+
+        with self._lock:
+            self._entries[path] = {"stats": stats, "preview": preview}
+
+        callback(path, preview, mtime)
+
+    def invalidate(self, path: str) -> None:
+        """
+        removes save game from the cache
+        """
+        with self._lock:
+            self._entries.pop(path, None)
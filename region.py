@@ -0,0 +1,375 @@
+"""
+Region of villages that tick in worker processes and exchange migrating families
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import traceback
+import weakref
+from enum import Enum
+
+from buildings import Building
+from headless import village_stats
+from migration import MigrationBatch
+from population import Engine
+from village import Village
+
+
+class Exchange(Enum):
+    """
+    Boundary at which migrating families reach their new village
+    """
+    DAY = 0
+    MONTH = 1
+
+
+def ring(count: int) -> dict[int, list[int]]:
+    """
+    neighbours of villages in a ring, every village borders the one before and after it
+    """
+    if count <= 1:
+        return {i: [] for i in range(count)}
+    return {i: sorted({(i - 1) % count, (i + 1) % count} - {i}) for i in range(count)}
+
+
+def _worker_stats(village: Village) -> dict:
+    """
+    stats of a village as reported to the region
+    """
+    return dict(village_stats(village), days_to_next_month=village.days_to_next_month)
+
+
+def _worker_main(connection, saves: dict[int, bytes]) -> None:
+    """
+    main loop of a worker process, owns the villages of its saves
+    """
+    villages = {}
+    states = {}
+    try:
+        for index, data in saves.items():
+            villages[index] = Village.load(io.BytesIO(data))
+            villages[index].emigrants = MigrationBatch()
+
+            # every village keeps its own random numbers, no matter which villages share a worker
+            states[index] = random.getstate()
+        connection.send(("stats", {index: _worker_stats(village)
+                                   for index, village in villages.items()}))
+
+        while True:
+            message = connection.recv()
+            if message[0] == "stop":
+                break
+
+            if message[0] == "save":
+                files = {}
+                for index, village in villages.items():
+                    file = io.BytesIO()
+                    random.setstate(states[index])
+                    village.save(file)
+                    files[index] = file.getvalue()
+                connection.send(("saves", files))
+                continue
+
+            _, days, arrivals = message
+            results = {}
+            for index, village in villages.items():
+                random.setstate(states[index])
+
+                for data in arrivals.get(index, []):
+                    village.immigrate(data)
+                for _ in range(days):
+                    village.tick()
+
+                states[index] = random.getstate()
+                results[index] = (village.emigrants.encode(), _worker_stats(village))
+                village.emigrants = MigrationBatch()
+            connection.send(("advanced", results))
+    except Exception:  # pylint: disable=broad-except
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        for village in villages.values():
+            village.close()
+        connection.close()
+
+
+def _shutdown(connections: list, processes: list) -> None:
+    """
+    stops worker processes
+    """
+    for connection in connections:
+        try:
+            connection.send(("stop",))
+            connection.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    for process in processes:
+        process.join(timeout=5.0)
+        if process.is_alive():
+            process.terminate()
+
+
+class Region:
+    """
+    Villages spread over worker processes, families that leave a village move
+    to the neighbour with the best appeal if it is better than their own village,
+    otherwise they vanish, emigrants are exchanged in batches at every boundary
+    """
+    def __init__(self,
+                 villages: list[Village],
+                 neighbours: dict[int, list[int]] = None,
+                 workers: int = None,
+                 exchange: Exchange = Exchange.DAY) -> None:
+        self._neighbours = ring(len(villages)) if neighbours is None else neighbours
+        self._exchange = exchange
+
+        workers = os.cpu_count() if workers is None else workers
+        workers = max(min(workers, len(villages)), 1)
+
+        # villages are sent as save games and dealt to the workers in turn
+        saves = [{} for _ in range(workers)]
+        for index, village in enumerate(villages):
+            file = io.BytesIO()
+            village.save(file)
+            saves[index % workers][index] = file.getvalue()
+
+        self._connections = []
+        self._processes = []
+        for worker_saves in saves:
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker_main,
+                                              args=(worker_connection, worker_saves))
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self._finalizer = weakref.finalize(self, _shutdown, self._connections, self._processes)
+
+        self._stats = [None] * len(villages)
+        for results in self._receive("stats"):
+            for index, stats in results.items():
+                self._stats[index] = stats
+
+        # emigrants waiting for the next boundary, by target village
+        self._arrivals = {}
+        self._migrated = 0
+        self._vanished = 0
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    @property
+    def workers(self) -> int:
+        """
+        number of worker processes
+        """
+        return len(self._processes)
+
+    @property
+    def stats(self) -> list[dict]:
+        """
+        stats of every village at the last boundary
+        """
+        return self._stats
+
+    @property
+    def migrated(self) -> int:
+        """
+        number of families that moved to a neighbour
+        """
+        return self._migrated
+
+    @property
+    def vanished(self) -> int:
+        """
+        number of families that left without a better neighbour
+        """
+        return self._vanished
+
+    def _receive(self, kind: str) -> list:
+        """
+        answers of all workers
+        """
+        answers = []
+        for connection in self._connections:
+            answer, value = connection.recv()
+            if answer == "error":
+                self.close()
+                raise RuntimeError(f"region worker failed:\n{value}")
+            if answer != kind:
+                raise RuntimeError(f"region worker sent {answer} instead of {kind}")
+            answers.append(value)
+        return answers
+
+    def _destination(self, index: int) -> int:
+        """
+        neighbour with the best appeal, None if no neighbour is better
+        """
+        best = None
+        best_appeal = self._stats[index]["appeal"]
+        for neighbour in self._neighbours.get(index, []):
+            if self._stats[neighbour]["appeal"] > best_appeal:
+                best = neighbour
+                best_appeal = self._stats[neighbour]["appeal"]
+        return best
+
+    def _step(self, days: int) -> None:
+        """
+        advances all villages to the next boundary and routes their emigrants
+        """
+        arrivals = self._arrivals
+        self._arrivals = {}
+        for i, connection in enumerate(self._connections):
+            connection.send(("advance", days, {index: batches
+                                               for index, batches in arrivals.items()
+                                               if index % len(self._connections) == i}))
+
+        emigrants = {}
+        for results in self._receive("advanced"):
+            for index, (data, stats) in results.items():
+                self._stats[index] = stats
+                emigrants[index] = data
+
+        # routed after all stats are known, so every village sees the same appeals
+        for index, data in emigrants.items():
+            count = MigrationBatch.family_count(data)
+            if count <= 0:
+                continue
+
+            destination = self._destination(index)
+            if destination is None:
+                self._vanished += count
+            else:
+                self._arrivals.setdefault(destination, []).append(data)
+                self._migrated += count
+
+    def advance(self, days: int) -> None:
+        """
+        advances all villages by days
+        """
+        while days > 0:
+            if self._exchange == Exchange.DAY:
+                step = 1
+            else:
+                step = min(days, min(stats["days_to_next_month"] for stats in self._stats))
+
+            self._step(step)
+            days -= step
+
+    def save(self) -> list[bytes]:
+        """
+        save games of all villages, migrants on their way are not included
+        """
+        for connection in self._connections:
+            connection.send(("save",))
+
+        saves = [None] * len(self)
+        for files in self._receive("saves"):
+            for index, data in files.items():
+                saves[index] = data
+        return saves
+
+    def close(self) -> None:
+        """
+        stops the worker processes
+        """
+        self._finalizer()
+
+
+def create_region(village_count: int,
+                  population_count: int,
+                  engine: Engine = Engine.OBJECTS,
+                  seed: int = 1337,
+                  workers: int = None,
+                  exchange: Exchange = Exchange.DAY) -> Region:
+    """
+    creates region of standard villages in a ring, every village has its own seed
+    and one of the attractions, so neighbours differ in appeal
+    """
+    villages = []
+    for i in range(village_count):
+        village = Village.create_village(f"Village {i}", population_count, engine=engine,
+                                         seed=seed + i)
+        village.buy_building(Building.buildings[i % len(Building.buildings)], True)
+        villages.append(village)
+
+    return Region(villages, workers=workers, exchange=exchange)
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    command line, throughput of a region in village days per second for every worker count
+    """
+    parser = argparse.ArgumentParser(description="Village Skylines region benchmark")
+    parser.add_argument("--villages", type=int, default=24, help="villages of the region")
+    parser.add_argument("--population", type=int, default=200, help="population of each village")
+    parser.add_argument("--engine", choices=("objects", "arrays"), default="objects",
+                        help="population engine")
+    parser.add_argument("--days", type=int, default=365, help="days to simulate")
+    parser.add_argument("--exchange", choices=("day", "month"), default="day",
+                        help="boundary at which migrants are exchanged")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="worker counts, powers of two up to the number of cores by default")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--output", help="writes results as json")
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers
+    if worker_counts is None:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+            worker_counts.append(worker_counts[-1] * 2)
+
+    results = {}
+    for workers in worker_counts:
+        region = create_region(args.villages, args.population, Engine[args.engine.upper()],
+                               args.seed, workers, Exchange[args.exchange.upper()])
+
+        start = time.perf_counter()
+        region.advance(args.days)
+        seconds = time.perf_counter() - start
+
+        results[str(region.workers)] = {"seconds": seconds,
+                                        "village_days_per_second":
+                                            len(region) * args.days / seconds,
+                                        "migrated": region.migrated,
+                                        "vanished": region.vanished,
+                                        "population": sum(stats["population"]
+                                                          for stats in region.stats)}
+        region.close()
+
+        print(f"{region.workers:>4} workers"
+              f"{results[str(region.workers)]['village_days_per_second']:>12.1f} village days/s",
+              file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(),
+                       "cores": os.cpu_count(),
+                       "villages": args.villages,
+                       "population": args.population,
+                       "engine": args.engine,
+                       "days": args.days,
+                       "exchange": args.exchange,
+                       "seed": args.seed},
+              "results": results}
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Memory mapped save game reader
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import mmap
+import struct
+
+import savegame
+from buildings import Building
+
+
+class SaveReader:
+    """
+    Random access reader on a save game, decodes sections only when they are accessed
+    """
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        # offsets of sections and family blocks
+        self._sections = {}
+        self._blocks = []
+        for tag, offset, count in savegame.read_index(self._buffer):
+            if tag == savegame.BLOCK_ENTRY:
+                self._blocks.append((offset, count))
+            else:
+                self._sections[tag] = (offset, count)
+
+        self._header = None
+
+    def __enter__(self) -> "SaveReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        closes memory map and file
+        """
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _seek(self, tag: bytes) -> int:
+        """
+        moves to the start of a section and returns its number of records
+        """
+        offset, _ = self._sections[tag]
+        self._mmap.seek(offset)
+        return savegame.read_section(self._mmap, tag)
+
+    @property
+    def header(self) -> dict:
+        """
+        header getter
+        """
+        if self._header is None:
+            self._mmap.seek(0)
+            self._header = savegame.read_header(self._mmap)
+        return self._header
+
+    @property
+    def random_state(self) -> (tuple, dict):
+        """
+        random state getter
+        """
+        self._seek(savegame.RANDOM_SECTION)
+        return savegame.read_random_state(self._mmap)
+
+    @property
+    def buildings(self) -> list[Building]:
+        """
+        buildings getter
+        """
+        count = self._seek(savegame.BUILDINGS_SECTION)
+        return [Building.load(self._mmap) for _ in range(count)]
+
+    @property
+    def family_count(self) -> int:
+        """
+        family count getter
+        """
+        return self._sections[savegame.FAMILIES_SECTION][1]
+
+    @property
+    def block_count(self) -> int:
+        """
+        block count getter
+        """
+        return len(self._blocks)
+
+    def family_ids(self) -> list[int]:
+        """
+        ids of the families in file order, their position if the save game has none
+        """
+        if savegame.FAMILY_IDS_SECTION not in self._sections:
+            return list(range(self.family_count))
+
+        count = self._seek(savegame.FAMILY_IDS_SECTION)
+        return list(struct.unpack(f">{count}I", self._mmap.read(4 * count)))
+
+    def family_block(self, i: int) -> (list[str], list[tuple], list[tuple]):
+        """
+        decodes strings, family records and villager records of a block
+        """
+        return savegame.decode_family_block(self._buffer, self._blocks[i][0])
+
+    def family_records(self) -> list[tuple]:
+        """
+        decodes the family records of all blocks, skipping the villagers
+        """
+        records = []
+        for offset, _ in self._blocks:
+            records.extend(savegame.decode_family_records(self._buffer, offset))
+        return records
+
+    def stats(self) -> dict:
+        """
+        aggregate stats without loading any villager
+        """
+        header = self.header
+        records = self.family_records()
+
+        return {"name": header["name"],
+                "money": header["money"],
+                "population": header["population"],
+                "families": len(records),
+                "homeless_families": sum(1 for record in records if record[1] < 0),
+                "children": sum(record[2] for record in records),
+                "adults": sum(record[3] for record in records),
+                "seniors": sum(record[4] for record in records),
+                "mean_happiness": (header["happiness_total"] / len(records)
+                                   if len(records) > 0 else 0.0)}
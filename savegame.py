@@ -0,0 +1,388 @@
+"""
+Save game format helpers
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import io
+import itertools
+import json
+import random
+import struct
+
+MAGIC = b"VSS"
+VERSION = 5
+
+# section tags
+RANDOM_SECTION = b"RAND"
+BUILDINGS_SECTION = b"BLDG"
+FAMILIES_SECTION = b"FAML"
+END_SECTION = b"END."
+BLOCK_ENTRY = b"BLCK"
+
+# ids of the families in file order, only written when a journal is compacted
+FAMILY_IDS_SECTION = b"FIDS"
+
+# index of section offsets at the end of the file, found through the trailer
+INDEX_MAGIC = b"VSSI"
+INDEX_ENTRY = struct.Struct(">4sQI")        # tag, offset, number of records
+TRAILER = struct.Struct(">Q4s")             # offset of index, magic
+
+# records of the families section, stored in blocks
+BLOCK_SIZE = 4096
+BLOCK_HEADER = struct.Struct(">III")         # families, villagers, bytes of strings
+FAMILY_RECORD = struct.Struct(">diHHH")      # mean happiness, house id, stage counts
+VILLAGER_RECORD = struct.Struct(">Iddhi")    # name, age, happiness, job, workplace id
+
+# kinds of buildings
+BUILDING = 0
+HOUSE = 1
+BUSINESS = 2
+
+
+def write_str(file: io.BufferedWriter, value: str) -> None:
+    """
+    writes utf-8 string with length prefix
+    """
+    data = value.encode("utf-8")
+    file.write(struct.pack(">H", len(data)) + data)
+
+
+def read_str(file: io.BufferedReader) -> str:
+    """
+    reads utf-8 string with length prefix
+    """
+    [length] = struct.unpack(">H", file.read(2))
+    return file.read(length).decode("utf-8")
+
+
+class StringTable:
+    """
+    Strings of one block, villager records refer to them by index
+    """
+    def __init__(self) -> None:
+        self._indices = {}
+        self.strings = []
+
+    def add(self, value: str) -> int:
+        """
+        adds string that is probably unique, like a name, returns its index
+        """
+        self.strings.append(value)
+        return len(self.strings) - 1
+
+    def index(self, value: str) -> int:
+        """
+        index of string that repeats, like a job, adds it if needed
+        """
+        index = self._indices.get(value, None)
+        if index is None:
+            index = self._indices[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def encode(self) -> bytes:
+        """
+        all strings as one buffer, count and byte lengths come first,
+        so strings may contain any character
+        """
+        data = [value.encode("utf-8") for value in self.strings]
+        return struct.pack(f">I{len(data)}I", len(data), *map(len, data)) + b"".join(data)
+
+    @staticmethod
+    def decode(data: bytes) -> list[str]:
+        """
+        strings from one buffer
+        """
+        [count] = struct.unpack_from(">I", data)
+        lengths = struct.unpack_from(f">{count}I", data, 4)
+        offsets = list(itertools.accumulate(lengths, initial=4 + 4 * count))
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+
+def write_record_block(file: io.BufferedWriter,
+                       strings: StringTable,
+                       family_records: list[tuple],
+                       villager_records: list[tuple]) -> None:
+    """
+    writes block of families from records
+    """
+    string_data = strings.encode()
+    file.write(BLOCK_HEADER.pack(len(family_records), len(villager_records), len(string_data)))
+    file.write(string_data)
+    file.write(b"".join([FAMILY_RECORD.pack(*record) for record in family_records]))
+    file.write(b"".join([VILLAGER_RECORD.pack(*record) for record in villager_records]))
+
+
+def decode_family_block(buffer, offset: int) -> (list[str], list[tuple], list[tuple]):
+    """
+    decodes block of families at offset of a buffer
+    """
+    family_count, villager_count, string_length = BLOCK_HEADER.unpack_from(buffer, offset)
+    offset += BLOCK_HEADER.size
+
+    strings = StringTable.decode(bytes(buffer[offset:offset + string_length]))
+    offset += string_length
+
+    end = offset + family_count * FAMILY_RECORD.size
+    family_records = list(FAMILY_RECORD.iter_unpack(buffer[offset:end]))
+
+    villager_records = list(VILLAGER_RECORD.iter_unpack(
+        buffer[end:end + villager_count * VILLAGER_RECORD.size]))
+
+    return (strings, family_records, villager_records)
+
+
+def decode_family_records(buffer, offset: int) -> list[tuple]:
+    """
+    decodes only the family records of the block at offset of a buffer
+    """
+    family_count, _, string_length = BLOCK_HEADER.unpack_from(buffer, offset)
+    offset += BLOCK_HEADER.size + string_length
+
+    return list(FAMILY_RECORD.iter_unpack(buffer[offset:offset
+                                                 + family_count * FAMILY_RECORD.size]))
+
+
+def read_family_block(file: io.BufferedReader) -> (list[str], list[tuple], list[tuple]):
+    """
+    reads block of families, returns strings, family records and villager records
+    """
+    family_count, villager_count, string_length = BLOCK_HEADER.unpack(
+        file.read(BLOCK_HEADER.size))
+
+    strings = StringTable.decode(file.read(string_length))
+    family_records = list(FAMILY_RECORD.iter_unpack(file.read(family_count
+                                                              * FAMILY_RECORD.size)))
+    villager_records = list(VILLAGER_RECORD.iter_unpack(file.read(villager_count
+                                                                  * VILLAGER_RECORD.size)))
+
+    return (strings, family_records, villager_records)
+
+
+class Snapshot:
+    """
+    Everything saved of a village, taken between two ticks,
+    it can be written later on any thread while the village goes on
+    """
+    def __init__(self, state: bytes, index: list[tuple], families: list, blocks) -> None:
+        # header, random state and buildings, already written to memory
+        self._state = state
+        self._index = index
+
+        # families only tell which block records belong to which family
+        self._families = families
+        self._blocks = blocks
+
+    @property
+    def state(self) -> bytes:
+        """
+        header, random state and buildings
+        """
+        return self._state
+
+    @property
+    def families(self) -> list:
+        """
+        families in the order of their records
+        """
+        return self._families
+
+    @property
+    def blocks(self) -> list[tuple]:
+        """
+        blocks of strings, family records and villager records, built when first needed
+        """
+        if isinstance(self._blocks, list) is False:
+            self._blocks = list(self._blocks)
+        return self._blocks
+
+    def write(self, file: io.BufferedWriter) -> None:
+        """
+        writes snapshot as save game
+        """
+        start = file.tell()
+        file.write(self._state)
+        index = [(tag, start + offset, count) for tag, offset, count in self._index]
+
+        index.append((FAMILIES_SECTION, file.tell(), len(self._families)))
+        write_section(file, FAMILIES_SECTION, len(self._families))
+        for strings, family_records, villager_records in self.blocks:
+            index.append((BLOCK_ENTRY, file.tell(), len(family_records)))
+            write_record_block(file, strings, family_records, villager_records)
+
+        write_section(file, END_SECTION, 0)
+
+        write_index(file, index)
+
+
+def write_section(file: io.BufferedWriter, tag: bytes, count: int) -> None:
+    """
+    writes section tag and number of records
+    """
+    file.write(tag + struct.pack(">I", count))
+
+
+def read_section(file: io.BufferedReader, tag: bytes) -> int:
+    """
+    reads section tag and returns number of records
+    """
+    found = file.read(4)
+    if found != tag:
+        raise ValueError(f"expected section {tag!r}, found {found!r}")
+
+    [count] = struct.unpack(">I", file.read(4))
+    return count
+
+
+def write_index(file: io.BufferedWriter, entries: list[tuple]) -> None:
+    """
+    writes index of section offsets and the trailer pointing to it
+    """
+    offset = file.tell()
+
+    file.write(struct.pack(">I", len(entries)))
+    file.write(b"".join([INDEX_ENTRY.pack(*entry) for entry in entries]))
+    file.write(TRAILER.pack(offset, INDEX_MAGIC))
+
+
+def read_index(buffer) -> list[tuple]:
+    """
+    reads index of section offsets through the trailer at the end of a buffer
+    """
+    offset, magic = TRAILER.unpack_from(buffer, len(buffer) - TRAILER.size)
+    if magic != INDEX_MAGIC:
+        raise ValueError("save game has no index")
+
+    [count] = struct.unpack_from(">I", buffer, offset)
+    offset += 4
+
+    return list(INDEX_ENTRY.iter_unpack(buffer[offset:offset + count * INDEX_ENTRY.size]))
+
+
+def write_version(file: io.BufferedWriter) -> None:
+    """
+    writes magic and format version
+    """
+    file.write(MAGIC + struct.pack(">H", VERSION))
+
+
+def read_version(file: io.BufferedReader) -> int:
+    """
+    reads magic and format version
+    """
+    if file.read(3) != MAGIC:
+        raise ValueError("not a village skylines save game")
+
+    [version] = struct.unpack(">H", file.read(2))
+    if version != VERSION:
+        raise ValueError(f"unsupported save game version {version}")
+
+    return version
+
+
+def write_header(file: io.BufferedWriter,
+                 name: str,
+                 money: float,
+                 date: (int, int, int),
+                 preview: (int, float, float),
+                 engine: int,
+                 today: int,
+                 happiness_total: float,
+                 balance: (float, float, float)) -> None:
+    """
+    writes version, preview stats and the exact state needed before the sections
+    """
+    write_version(file)
+
+    # name
+    write_str(file, name)
+
+    # money
+    file.write(struct.pack(">d", money))
+
+    # date
+    file.write(struct.pack(">BBI", *date))
+
+    # preview stats
+    file.write(struct.pack(">Iff", *preview))
+
+    # engine, clock and exact happiness total
+    file.write(struct.pack(">Bqd", engine, today, happiness_total))
+
+    # balance constants of the village
+    file.write(struct.pack(">ddd", *balance))
+
+
+def read_header(file: io.BufferedReader, preview_only: bool = False) -> dict:
+    """
+    reads header written by write_header
+    """
+    read_version(file)
+
+    name = read_str(file)
+    [money] = struct.unpack(">d", file.read(8))
+    [day, month, year] = struct.unpack(">BBI", file.read(6))
+    [population, happiness, appeal] = struct.unpack(">Iff", file.read(12))
+
+    header = {"name": name,
+              "money": money,
+              "day": day,
+              "month": month,
+              "year": year,
+              "population": population,
+              "happiness": happiness,
+              "appeal": appeal}
+
+    if preview_only is False:
+        [header["engine"], header["today"], header["happiness_total"]] = \
+            struct.unpack(">Bqd", file.read(17))
+        header["balance"] = struct.unpack(">ddd", file.read(24))
+
+    return header
+
+
+def get_random_state(generator_state: dict = None) -> (tuple, dict):
+    """
+    state of the random module with the state of the generators of a population engine
+    """
+    return (random.getstate(), generator_state)
+
+
+def write_random_state(file: io.BufferedWriter, state: (tuple, dict)) -> None:
+    """
+    writes state of the random module and of the generators of a population engine
+    """
+    (version, random_state, gauss_next), generator_state = state
+    file.write(struct.pack(f">BH{len(random_state)}I", version, len(random_state), *random_state))
+    file.write(struct.pack(">?d", gauss_next is not None, gauss_next or 0.0))
+
+    # numpy generators store their state as dictionary of ints, sharded engines one per shard
+    if generator_state is None:
+        write_str(file, "")
+    else:
+        write_str(file, json.dumps(generator_state))
+
+
+def read_random_state(file: io.BufferedReader) -> (tuple, dict):
+    """
+    reads state of the random module and of an optional numpy generator
+    """
+    [version, length] = struct.unpack(">BH", file.read(3))
+    state = struct.unpack(f">{length}I", file.read(4 * length))
+    [has_gauss, gauss_next] = struct.unpack(">?d", file.read(9))
+
+    generator_state = read_str(file)
+
+    return ((version, state, gauss_next if has_gauss else None),
+            None if generator_state == "" else json.loads(generator_state))
+
+
+def set_random_state(state: (tuple, dict), population=None) -> None:
+    """
+    restores state of the random module and of the generators of an optional population engine
+    """
+    random_state, generator_state = state
+
+    random.setstate(random_state)
+    if population is not None and generator_state is not None:
+        population.set_random_state(generator_state)
@@ -0,0 +1,86 @@
+"""
+Event scheduler keyed by simulation day
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import heapq
+import itertools
+
+
+class EventScheduler:
+    """
+    Priority queue of events that fire on a simulation day,
+    also serves as clock of the village
+    """
+    def __init__(self, today: int = 0) -> None:
+        self.today = today
+
+        # events are lists of day, counter, callback and args, cancelled ones have no callback
+        self._events = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._events) - self._cancelled
+
+    @property
+    def next_day(self) -> int:
+        """
+        day of the next event, None if there is none
+        """
+        self._drop_cancelled()
+        if len(self._events) <= 0:
+            return None
+        return self._events[0][0]
+
+    def schedule(self, day: int, callback: callable, *args) -> list:
+        """
+        schedules callback to be called on day, returns the event to cancel it
+        """
+        event = [day, next(self._counter), callback, args]
+        heapq.heappush(self._events, event)
+        return event
+
+    def cancel(self, event: list) -> None:
+        """
+        cancels event that did not fire yet, it stays in the queue until it is due
+        or until most events are cancelled
+        """
+        if event[2] is None:
+            return
+
+        event[2] = None
+        event[3] = ()
+        self._cancelled += 1
+
+        if self._cancelled * 2 > len(self._events):
+            self._events = [event for event in self._events if event[2] is not None]
+            heapq.heapify(self._events)
+            self._cancelled = 0
+
+    def _drop_cancelled(self) -> None:
+        """
+        removes cancelled events from the front of the queue
+        """
+        while self._events and self._events[0][2] is None:
+            heapq.heappop(self._events)
+            self._cancelled -= 1
+
+    def run_due(self) -> int:
+        """
+        calls all events that are due today or earlier, returns number of events
+        """
+        count = 0
+        self._drop_cancelled()
+        while self._events and self._events[0][0] <= self.today:
+            event = heapq.heappop(self._events)
+            _, _, callback, args = event
+
+            # fired events can not be cancelled anymore
+            event[2] = None
+            event[3] = ()
+            callback(*args)
+            count += 1
+            self._drop_cancelled()
+
+        return count
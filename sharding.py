@@ -0,0 +1,272 @@
+"""
+Population engine that ticks its rows in several processes
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import multiprocessing
+import os
+import weakref
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from population import Population, tick_rows
+
+# columns that live in shared memory, the shards read and write them
+SHARED_COLUMNS = ("age", "happiness", "family", "stage", "job", "housed")
+
+
+def _attach(layout: dict) -> (dict, dict):
+    """
+    attaches to the shared memory blocks of a layout, returns blocks and columns
+    """
+    blocks = {}
+    columns = {}
+    for name, (block_name, dtype, length) in layout.items():
+        blocks[name] = shared_memory.SharedMemory(block_name)
+        columns[name] = np.ndarray(length, dtype=dtype, buffer=blocks[name].buf)
+    return blocks, columns
+
+
+def _detach(blocks: dict, columns: dict) -> None:
+    """
+    detaches from shared memory blocks, the columns must not be used afterwards
+    """
+    columns.clear()
+    for block in blocks.values():
+        block.close()
+    blocks.clear()
+
+
+def _shard_main(connection, seed: "np.random.SeedSequence", housed_drift: "np.ndarray") -> None:
+    """
+    main loop of a shard process, ticks the rows it is sent
+    and answers with the rows that died, grew up and retired
+    """
+    rng = np.random.default_rng(seed)
+    blocks = {}
+    columns = {}
+
+    while True:
+        message = connection.recv()
+        if message[0] == "stop":
+            break
+
+        # the generator is saved and restored with the village
+        if message[0] == "state":
+            if len(message) > 1:
+                rng.bit_generator.state = message[1]
+            else:
+                connection.send(rng.bit_generator.state)
+            continue
+
+        _, start, stop, layout = message
+        if layout is not None:
+            # the parent grew its columns
+            _detach(blocks, columns)
+            blocks, columns = _attach(layout)
+
+        rows = slice(start, stop)
+        dead_rows, grown_rows, retired_rows = tick_rows(columns["age"][rows],
+                                                        columns["happiness"][rows],
+                                                        columns["stage"][rows],
+                                                        columns["job"][rows],
+                                                        columns["housed"][columns["family"][rows]],
+                                                        housed_drift,
+                                                        rng)
+
+        # only the few changed rows are sent back
+        counts = np.array([len(dead_rows), len(grown_rows)], dtype=np.int64)
+        connection.send_bytes(np.concatenate((counts, dead_rows, grown_rows, retired_rows))
+                              .astype(np.int64).tobytes())
+
+    _detach(blocks, columns)
+    connection.close()
+
+
+def _shutdown(connections: list, processes: list, blocks: dict, stale: list) -> None:
+    """
+    stops shard processes and frees shared memory
+    """
+    for connection in connections:
+        try:
+            connection.send(("stop",))
+            connection.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    for process in processes:
+        process.join(timeout=1.0)
+        if process.is_alive():
+            process.terminate()
+
+    for block in list(blocks.values()) + stale:
+        try:
+            block.close()
+        except BufferError:
+            # a column is still in use, the memory is freed with it
+            pass
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+    blocks.clear()
+    stale.clear()
+
+
+class ShardedPopulation(Population):
+    """
+    Population whose columns live in shared memory, aging, happiness and mortality
+    of contiguous row ranges are ticked by shard processes in parallel,
+    everything across families stays in the village process
+    """
+    def __init__(self, shards: int = None, capacity: int = 1024, seed: int = 1337) -> None:
+        if np is None:
+            raise ImportError("the sharded population engine requires numpy")
+
+        # shared memory blocks of the columns, grown columns leave stale blocks
+        self._blocks = {}
+        self._stale = []
+        self._layout_version = 0
+        self._sent_layout_version = -1
+
+        Population.__init__(self, capacity, seed)
+
+        shards = os.cpu_count() if shards is None else shards
+        if shards < 1:
+            raise ValueError("a sharded population needs at least one shard")
+
+        # every shard draws its own random numbers
+        self._connections = []
+        self._processes = []
+        for shard_seed in np.random.SeedSequence(seed).spawn(shards):
+            connection, shard_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_main,
+                                              args=(shard_connection,
+                                                    shard_seed,
+                                                    self._housed_drift),
+                                              daemon=True)
+            process.start()
+            shard_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self._finalizer = weakref.finalize(self, _shutdown, self._connections, self._processes,
+                                           self._blocks, self._stale)
+
+    @property
+    def shards(self) -> int:
+        """
+        number of shard processes
+        """
+        return len(self._processes)
+
+    def _column(self, name: str, length: int, dtype, fill) -> "np.ndarray":
+        """
+        allocates column in shared memory
+        """
+        if name not in SHARED_COLUMNS:
+            return Population._column(self, name, length, dtype, fill)
+
+        dtype = np.dtype(dtype)
+        block = shared_memory.SharedMemory(create=True, size=max(length * dtype.itemsize, 1))
+        column = np.ndarray(length, dtype=dtype, buffer=block.buf)
+        column.fill(fill)
+
+        # the old block is freed once the old column is no longer used
+        old_block = self._blocks.get(name, None)
+        if old_block is not None:
+            old_block.unlink()
+            self._stale.append(old_block)
+        self._blocks[name] = block
+        self._layout_version += 1
+
+        return column
+
+    def _layout(self) -> dict:
+        """
+        names, types and lengths of the shared columns for the shards
+        """
+        return {name: (self._blocks[name].name, getattr(self, name).dtype, len(getattr(self, name)))
+                for name in SHARED_COLUMNS}
+
+    def _close_stale(self) -> None:
+        """
+        closes blocks of columns that were replaced
+        """
+        stale = []
+        for block in self._stale:
+            try:
+                block.close()
+            except BufferError:
+                stale.append(block)
+        self._stale[:] = stale
+
+    def tick(self) -> None:
+        """
+        ages all villagers by one day, every shard ticks its range of rows
+        """
+        layout = None
+        if self._sent_layout_version != self._layout_version:
+            self._close_stale()
+            layout = self._layout()
+            self._sent_layout_version = self._layout_version
+
+        bounds = np.linspace(0, self._size, len(self._connections) + 1).astype(np.int64)
+        for connection, start, stop in zip(self._connections, bounds[:-1], bounds[1:]):
+            connection.send(("tick", int(start), int(stop), layout))
+
+        dead_rows = []
+        grown_rows = []
+        retired_rows = []
+        for connection, start in zip(self._connections, bounds[:-1]):
+            message = np.frombuffer(connection.recv_bytes(), dtype=np.int64)
+            dead_count, grown_count = message[:2]
+            rows = message[2:] + start
+            dead_rows.append(rows[:dead_count])
+            grown_rows.append(rows[dead_count:dead_count + grown_count])
+            retired_rows.append(rows[dead_count + grown_count:])
+
+        self._apply_tick(np.concatenate(dead_rows),
+                         np.concatenate(grown_rows),
+                         np.concatenate(retired_rows))
+
+    @staticmethod
+    def shards_of(state: dict) -> int:
+        """
+        number of shards of a saved random state, None if it is not of a sharded population
+        """
+        if isinstance(state, dict) and "shards" in state:
+            return len(state["shards"])
+        return None
+
+    def random_state(self) -> dict:
+        """
+        states of the generator of the village process and of the generators of all shards
+        """
+        for connection in self._connections:
+            connection.send(("state",))
+
+        return {"generator": Population.random_state(self),
+                "shards": [connection.recv() for connection in self._connections]}
+
+    def set_random_state(self, state: dict) -> None:
+        """
+        restores states of all generators, the population needs as many shards as were saved
+        """
+        if ShardedPopulation.shards_of(state) != self.shards:
+            raise ValueError(f"random state of {ShardedPopulation.shards_of(state)} shards "
+                             f"does not fit {self.shards} shards")
+
+        Population.set_random_state(self, state["generator"])
+        for connection, shard_state in zip(self._connections, state["shards"]):
+            connection.send(("state", shard_state))
+
+    def close(self) -> None:
+        """
+        stops the shard processes and frees the shared memory
+        """
+        self._finalizer()
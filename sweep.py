@@ -0,0 +1,309 @@
+"""
+Scenario sweeps over seeds and balance constants in worker processes
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from buildings import Building
+from constants import Constants
+from headless import village_stats
+from jobs import Job
+from population import Engine
+from village import Village
+
+# values of a scenario that are not given by the spec
+SCENARIO_DEFAULTS = {"seed": 1337,
+                     "population": 200,
+                     "engine": "objects",
+                     "days": 365,
+                     "sample": 30,
+                     "timeout": None,
+                     "balance": {},
+                     "catalogue": {}}
+
+# columns of the time series
+SERIES_COLUMNS = ("today", "population", "families", "money", "mean_happiness", "unemployed")
+
+# seconds a worker gets after its timeout to return the samples so far before it is killed
+KILL_GRACE = 1.0
+
+
+def expand_scenarios(spec: dict) -> list[dict]:
+    """
+    scenarios of a spec, its grid gives every combination of the listed values,
+    the other keys of the spec are defaults of all scenarios
+    """
+    defaults = dict(SCENARIO_DEFAULTS)
+    defaults.update({key: value for key, value in spec.items()
+                     if key not in ("grid", "scenarios")})
+
+    scenarios = [dict(defaults, **scenario) for scenario in spec.get("scenarios", [])]
+
+    grid = spec.get("grid", {})
+    if len(grid) > 0:
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            scenarios.append(dict(defaults, **dict(zip(keys, values))))
+
+    for i, scenario in enumerate(scenarios):
+        scenario.setdefault("name", f"scenario-{i}")
+
+    return scenarios
+
+
+def _series_row(village: Village) -> list:
+    """
+    one row of the time series
+    """
+    return [village.scheduler.today,
+            village.population,
+            len(village.families),
+            village.money,
+            village.mean_happiness,
+            village.labor_market.unemployed_count]
+
+
+def run_scenario(scenario: dict) -> dict:
+    """
+    simulates one scenario, runs in a worker process,
+    errors and timeouts are part of the result
+    """
+    start = time.perf_counter()
+    result = {"scenario": scenario, "error": None, "timed_out": False}
+
+    village = None
+    try:
+        # catalogues are loaded again, workers run several scenarios
+        catalogue = dict(scenario["catalogue"])
+        Job.load_jobs(catalogue.pop("jobs", {}))
+        Building.load_buildings(catalogue)
+
+        village = Village.create_village(scenario["name"],
+                                         scenario["population"],
+                                         engine=Engine[scenario["engine"].upper()],
+                                         seed=scenario["seed"],
+                                         balance=Constants(**scenario["balance"]))
+
+        # the timeout is checked between two samples, the sweep kills workers that miss it
+        deadline = None
+        if scenario["timeout"] is not None:
+            deadline = start + scenario["timeout"]
+
+        rows = [_series_row(village)]
+        days = scenario["days"]
+        while days > 0:
+            step = min(days, scenario["sample"])
+            village.advance(step)
+            days -= step
+            rows.append(_series_row(village))
+
+            if deadline is not None and time.perf_counter() > deadline:
+                result["timed_out"] = True
+                break
+
+        populations = [row[1] for row in rows]
+        result["summary"] = dict(village_stats(village),
+                                 min_population=min(populations),
+                                 max_population=max(populations))
+        result["series"] = {"columns": SERIES_COLUMNS, "rows": rows}
+    except Exception:  # pylint: disable=broad-except
+        result["error"] = traceback.format_exc()
+    finally:
+        # sharded villages stop their shard processes
+        if village is not None:
+            village.close()
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _failed(scenario: dict, error: str) -> dict:
+    """
+    result of a scenario without a result of its worker
+    """
+    return {"scenario": scenario, "error": error, "timed_out": False, "seconds": 0.0}
+
+
+def _killed(scenario: dict, seconds: float) -> dict:
+    """
+    result of a scenario whose worker was killed after its timeout, without samples
+    """
+    return {"scenario": scenario, "error": None, "timed_out": True, "seconds": seconds}
+
+
+def _kill(executor: ProcessPoolExecutor) -> None:
+    """
+    stops executor without waiting for the scenario it runs
+    """
+    # the executor can not terminate its workers before python 3.14
+    for process in list(executor._processes.values()):  # pylint: disable=protected-access
+        process.terminate()
+    executor.shutdown(cancel_futures=True)
+
+
+def _run_isolated(scenarios: list[dict],
+                  indices: list[int],
+                  results: list[dict],
+                  workers: int = None,
+                  progress: callable = None) -> None:
+    """
+    runs every scenario in a process of its own, a dying worker only fails its scenario,
+    a worker that misses the timeout of its scenario is killed
+    """
+    workers = os.cpu_count() if workers is None else workers
+    indices = list(indices)
+    running = {}
+
+    while len(indices) > 0 or len(running) > 0:
+        while len(indices) > 0 and len(running) < workers:
+            i = indices.pop(0)
+            executor = ProcessPoolExecutor(max_workers=1)
+
+            start = time.perf_counter()
+            deadline = None
+            if scenarios[i]["timeout"] is not None:
+                deadline = start + scenarios[i]["timeout"] + KILL_GRACE
+            running[executor.submit(run_scenario, scenarios[i])] = (i, executor, start, deadline)
+
+        deadlines = [deadline for _, _, _, deadline in running.values() if deadline is not None]
+        timeout = None
+        if len(deadlines) > 0:
+            timeout = max(min(deadlines) - time.perf_counter(), 0.0)
+
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        now = time.perf_counter()
+        for future in list(running):
+            i, executor, start, deadline = running[future]
+            if future not in done:
+                if deadline is None or now < deadline:
+                    continue
+
+                running.pop(future)
+                _kill(executor)
+                results[i] = _killed(scenarios[i], now - start)
+            else:
+                running.pop(future)
+                executor.shutdown()
+
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    results[i] = _failed(scenarios[i], "worker process died")
+
+            if progress is not None:
+                progress(results[i])
+
+
+def sweep(scenarios: list[dict], workers: int = None, progress: callable = None) -> list[dict]:
+    """
+    runs scenarios in worker processes, returns their results in order,
+    scenarios with a timeout run in processes of their own, so they can be killed
+    """
+    results = [None] * len(scenarios)
+
+    timed = [i for i, scenario in enumerate(scenarios) if scenario["timeout"] is not None]
+
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_scenario, scenario): i
+                   for i, scenario in enumerate(scenarios) if scenario["timeout"] is None}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                broken.append(i)
+                continue
+
+            if progress is not None:
+                progress(results[i])
+
+    # a dying worker fails every scenario of the pool, they run again in own processes
+    _run_isolated(scenarios, sorted(broken) + timed, results, workers, progress)
+
+    return results
+
+
+def check_reproducible(scenarios: list[dict],
+                       workers: int = None,
+                       progress: callable = None) -> list[str]:
+    """
+    runs every scenario twice in processes of their own,
+    returns the names of the scenarios whose summaries differ between the runs
+    """
+    twice = [scenario for scenario in scenarios for _ in range(2)]
+    results = [None] * len(twice)
+    _run_isolated(twice, range(len(twice)), results, workers, progress)
+
+    differing = []
+    for first, second in zip(results[::2], results[1::2]):
+        # timed out runs stop at different days
+        if first["timed_out"] is True or second["timed_out"] is True:
+            continue
+        if first.get("summary", None) != second.get("summary", None):
+            differing.append(first["scenario"]["name"])
+
+    return differing
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    command line, returns 1 if a scenario failed or is not reproducible
+    """
+    parser = argparse.ArgumentParser(description="Village Skylines scenario sweeps")
+    parser.add_argument("spec", help="json file with grid and/or scenarios")
+    parser.add_argument("--output", default="sweep.json", help="results file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, all cores by default")
+    parser.add_argument("--check", action="store_true",
+                        help="runs every scenario twice and checks that the summaries are equal")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, encoding="utf-8") as file:
+        scenarios = expand_scenarios(json.load(file))
+
+    def progress(result: dict) -> None:
+        if result["error"] is not None:
+            state = "failed"
+        elif result["timed_out"] is True:
+            state = "timed out"
+        else:
+            state = f"population {result['summary']['population']}"
+        print(f"{result['scenario']['name']}: {state} in {result['seconds']:.2f} s",
+              file=sys.stderr)
+
+    if args.check is True:
+        differing = check_reproducible(scenarios, args.workers, progress)
+        for name in differing:
+            print(f"{name}: runs with the same seed differ", file=sys.stderr)
+        print(f"{len(scenarios) - len(differing)} of {len(scenarios)} scenarios reproducible",
+              file=sys.stderr)
+        return 1 if len(differing) > 0 else 0
+
+    start = time.perf_counter()
+    results = sweep(scenarios, args.workers, progress)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"meta": {"python": platform.python_version(),
+                            "scenarios": len(scenarios),
+                            "seconds": time.perf_counter() - start},
+                   "results": results}, file)
+
+    failed = sum(1 for result in results if result["error"] is not None)
+    print(f"{len(results) - failed} of {len(results)} scenarios done, results in {args.output}",
+          file=sys.stderr)
+    return 1 if failed > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Timers and counters of the phases of a tick
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import collections
+import json
+import math
+import time
+
+# samples kept per histogram
+DEFAULT_WINDOW = 1000
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    """
+    nearest rank percentile of sorted samples
+    """
+    return samples[max(math.ceil(percent / 100 * len(samples)), 1) - 1]
+
+
+class Histogram:
+    """
+    Rolling window of samples with percentiles, totals cover all samples
+    """
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        self._samples = collections.deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, value: float) -> None:
+        """
+        adds sample
+        """
+        self._samples.append(value)
+        self._count += 1
+        self._total += value
+
+    def percentile(self, percent: float) -> float:
+        """
+        nearest rank percentile of the window
+        """
+        if len(self._samples) <= 0:
+            return 0.0
+
+        return _percentile(sorted(self._samples), percent)
+
+    def stats(self) -> dict:
+        """
+        count and total of all samples, percentiles of the window
+        """
+        if len(self._samples) <= 0:
+            return {"count": self._count, "total": self._total}
+
+        samples = sorted(self._samples)
+        return {"count": self._count,
+                "total": self._total,
+                "mean": sum(samples) / len(samples),
+                "p50": _percentile(samples, 50),
+                "p95": _percentile(samples, 95),
+                "p99": _percentile(samples, 99),
+                "max": samples[-1]}
+
+
+class TickProfiler:
+    """
+    Seconds per phase and counts per tick of the village, a village without profiler
+    skips all measuring
+    """
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        self._window = window
+        self._timers = {}
+        self._counters = {}
+
+    def time(self, phase: str, seconds: float) -> None:
+        """
+        adds seconds of a phase
+        """
+        timer = self._timers.get(phase, None)
+        if timer is None:
+            timer = self._timers[phase] = Histogram(self._window)
+        timer.add(seconds)
+
+    def count(self, counter: str, value: int) -> None:
+        """
+        adds count of one tick
+        """
+        histogram = self._counters.get(counter, None)
+        if histogram is None:
+            histogram = self._counters[counter] = Histogram(self._window)
+        histogram.add(value)
+
+    def measure(self, phase: str, function: callable, *args, counter: str = None):
+        """
+        calls function and times it as phase,
+        its result is added to counter, returns the result
+        """
+        start = time.perf_counter()
+        result = function(*args)
+        self.time(phase, time.perf_counter() - start)
+
+        if counter is not None:
+            self.count(counter, result)
+        return result
+
+    def timer(self, phase: str) -> Histogram:
+        """
+        histogram of the seconds of a phase, None if it was not measured
+        """
+        return self._timers.get(phase, None)
+
+    def counter(self, counter: str) -> Histogram:
+        """
+        histogram of the counts of a counter, None if it was not counted
+        """
+        return self._counters.get(counter, None)
+
+    def stats(self) -> dict:
+        """
+        stats of all timers and counters
+        """
+        return {"timers": {phase: timer.stats() for phase, timer in self._timers.items()},
+                "counters": {counter: histogram.stats()
+                             for counter, histogram in self._counters.items()}}
+
+    def dump(self, path: str) -> None:
+        """
+        writes stats as json
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.stats(), file, indent=2)
+
+    def reset(self) -> None:
+        """
+        removes all samples
+        """
+        self._timers.clear()
+        self._counters.clear()
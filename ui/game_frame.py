@@ -8,7 +8,11 @@ from tkinter import ttk
 from typing import TYPE_CHECKING
 
 from ui.frame_base import FrameBase
+from ui.list_model import ListModel
+from ui.virtual_list import VirtualList
 from buildings import Building, House, Business
+from village_stats import BuildingStats
+from managers.commands import BuyBuilding, DestroyBuilding, succeeded
 
 # includes only needed for typing
 if TYPE_CHECKING:
@@ -23,6 +27,12 @@ class GameFrame(FrameBase):
     def __init__(self, parent, main_manager: "MainManager", village: "Village"):
         FrameBase.__init__(self, parent, main_manager, village)
 
+        # shown values, widgets are only reconfigured when they change
+        self._shown_texts = {}
+        self._shown_state = None
+        self._shown_building = None
+        self._shown_shop = None
+
         resources_frame = tk.Frame(self, relief=tk.RIDGE, borderwidth=1, padx=10, pady=2)
 
         # name label
@@ -109,34 +119,18 @@ class GameFrame(FrameBase):
                                   text="Village Buldings")
         buildings_lbl.pack(side=tk.TOP)
 
-        columns = ("name", "appeal")
-        buildings_scrollbar = ttk.Scrollbar(buildings_frame)
-        self._buildings_list = ttk.Treeview(buildings_frame,
-                                            yscrollcommand=buildings_scrollbar.set,
-                                            selectmode=tk.BROWSE,
-                                            show="headings",
-                                            columns=columns)
-        buildings_scrollbar.configure(command=self._buildings_list.yview)
-
-        self._buildings_list.bind("<<TreeviewSelect>>", self._display_building)
-
-        for i, text in enumerate(columns):
-            self._buildings_list.heading(i, text=text, command=lambda column=i:
-                                    self._treeview_sort_column(self._buildings_list, column, False))
-
-        for building in self._village._buildings.values():
-            values = (building.name, building.appeal)
-            self._buildings_list.insert("", tk.END, tags=(Building, building.id), values=values)
-
-        for house in self._village.houses.values():
-            values = (house.name, house.appeal)
-            self._buildings_list.insert("", tk.END, tags=(House, house.id), values=values)
-
-        for business in self._village.businesses.values():
-            values = (business.name, business.appeal)
-            self._buildings_list.insert("", tk.END, tags=(Business, business.id), values=values)
-
-        buildings_scrollbar.pack(side=tk.RIGHT, fill=tk.BOTH)
+        # rows keyed by type string and id, only the visible ones are treeview items
+        self._buildings_model = ListModel(("name", "appeal"))
+        self._buildings_model.extend(
+            ((str(building_type), building.id), (building.name, building.appeal))
+            for building_type, list_ in ((Building, self._village.buildings),
+                                         (House, self._village.houses),
+                                         (Business, self._village.businesses))
+            for building in list_.values())
+
+        self._buildings_list = VirtualList(buildings_frame,
+                                           self._buildings_model,
+                                           on_select=self._display_building)
         self._buildings_list.pack(fill=tk.BOTH, expand=True)
 
         horizontal_paned_window.add(buildings_frame, weight=30)
@@ -151,34 +145,19 @@ class GameFrame(FrameBase):
                              text="Shop")
         shop_lbl.pack(side=tk.TOP)
 
-        columns = ("name", "cost", "appeal", "jobs")
-        shop_scrollbar = ttk.Scrollbar(shop_frame)
-        self._shop_list = ttk.Treeview(shop_frame,
-                                       yscrollcommand=shop_scrollbar.set,
-                                       selectmode=tk.BROWSE,
-                                       show="headings",
-                                       columns=columns)
-        shop_scrollbar.configure(command=self._shop_list.yview)
-
-        self._shop_list.bind("<<TreeviewSelect>>", self._display_shop)
-
-        for i, text in enumerate(columns):
-            self._shop_list.heading(i, text=text, command=lambda column=i:
-                              self._treeview_sort_column(self._shop_list, column, False))
-
-        for building in Building.buildings:
-            values = (building.name, building.cost, building.appeal, 0)
-            self._shop_list.insert("", tk.END, tags=(Building, building.id), values=values)
-
-        for house in Building.houses:
-            values = (house.name, house.cost, house.appeal, 0)
-            self._shop_list.insert("", tk.END, tags=(House, house.id), values=values)
-
-        for business in Building.businesses:
-            values = (business.name, business.cost, business.appeal, business.open_job_count)
-            self._shop_list.insert("", tk.END, tags=(Business, business.id), values=values)
-
-        shop_scrollbar.pack(side=tk.RIGHT, fill=tk.BOTH)
+        self._shop_model = ListModel(("name", "cost", "appeal", "jobs"))
+        self._shop_model.extend(
+            ((str(Building), building.id), (building.name, building.cost, building.appeal, 0))
+            for building in Building.buildings)
+        self._shop_model.extend(
+            ((str(House), house.id), (house.name, house.cost, house.appeal, 0))
+            for house in Building.houses)
+        self._shop_model.extend(
+            ((str(Business), business.id),
+             (business.name, business.cost, business.appeal, business.open_job_count))
+            for business in Building.businesses)
+
+        self._shop_list = VirtualList(shop_frame, self._shop_model, on_select=self._display_shop)
         self._shop_list.pack(fill=tk.BOTH, expand=True)
 
         horizontal_paned_window.add(shop_frame, weight=30)
@@ -206,47 +185,74 @@ class GameFrame(FrameBase):
         """
         Update displayed data to labels like money_lbl and population_lbl
         """
-        self._name_lbl.configure(text=self._village.name)
+        stats = self._main_manager.village_stats
 
-        self._date_lbl.configure(text=self._village.get_date_str())
-        self._money_lbl.configure(text=format(self._village.money, '.2f'))
-        self._population_lbl.configure(text=str(self._village.population))
-        self._happiness_lbl.configure(text=format(self._village.mean_happiness, '.2f'))
-        self._appeal_lbl.configure(text=format(self._village.appeal, '.2f'))
+        # nothing changed since the last refresh
+        state = (stats.version,
+                 self._buildings_list.selection_version,
+                 self._shop_list.selection_version)
+        if state == self._shown_state:
+            return
+        self._shown_state = state
 
-        self._display_building(None)
-        self._display_shop(None)
+        self._set_text(self._name_lbl, stats.name)
+
+        self._set_text(self._date_lbl, stats.date)
+        self._set_text(self._money_lbl, format(stats.money, '.2f'))
+        self._set_text(self._population_lbl, str(stats.population))
+        self._set_text(self._happiness_lbl, format(stats.mean_happiness, '.2f'))
+        self._set_text(self._appeal_lbl, format(stats.appeal, '.2f'))
+
+        self._display_building(self._buildings_list.selected)
+        self._display_shop(self._shop_list.selected)
 
     def set_speed(self, speed: int) -> None:
         """
         sets current game speed to display
         """
-        self._speed_lbl.configure(text=f"{str(speed)}x")
+        self._set_text(self._speed_lbl, f"{str(speed)}x")
+
+    def _set_text(self, widget: ttk.Label, text: str) -> None:
+        """
+        configures text of a widget if it changed
+        """
+        if self._shown_texts.get(widget, None) == text:
+            return
+
+        self._shown_texts[widget] = text
+        widget.configure(text=text)
 
-    def _display_building(self, _event: tk.Event) -> None:
+    def _display_building(self, key: tuple) -> None:
         """
         displays information of a building
         """
-        if len(self._buildings_list.selection()) <= 0:
+        if key is None:
             return
 
-        building_type, building_id = self._buildings_list.item(
-            self._buildings_list.selection()[0], "tags")
-        building_id = int(building_id)
+        building_type, _ = key
+
+        building = self._main_manager.village_stats.buildings.get(key, None)
+        if building is None:
+            return
+
+        # same building and version as shown
+        if self._shown_building == (key, building.version):
+            return
+        self._shown_building = (key, building.version)
 
         self._destroy_btn.configure(state=tk.NORMAL, command=lambda:
-                                    self._destroy_building(self._buildings_list.selection()[0]))
+                                    self._destroy_building(self._buildings_list.selected))
 
         # checks kind of building
         match building_type:
             case "<class \'buildings.Building\'>":
-                self._display_building_building(self._village.buildings[building_id])
+                self._display_building_building(building)
             case "<class \'buildings.House\'>":
-                self._display_building_house(self._village.houses[building_id])
+                self._display_building_house(building)
             case "<class \'buildings.Business\'>":
-                self._display_building_business(self._village.businesses[building_id])
+                self._display_building_business(building)
 
-    def _display_building_building(self, building: Building) -> None:
+    def _display_building_building(self, building: BuildingStats) -> None:
         """
         display building type from village
         """
@@ -254,7 +260,7 @@ class GameFrame(FrameBase):
 Running Costs: {building.running_costs}
 Appeal: {building.appeal}""")
 
-    def _display_building_house(self, house: House) -> None:
+    def _display_building_house(self, house: BuildingStats) -> None:
         """
         display house type from village
         """
@@ -265,7 +271,7 @@ Capacity: {house.free_capacity}
 Inhabitants: {house.capacity - house.free_capacity}
 """)
 
-    def _display_building_business(self, business: Business) -> None:
+    def _display_building_business(self, business: BuildingStats) -> None:
         """
         display business type from village
         """
@@ -274,36 +280,47 @@ Running Costs: {business.running_costs}
 Income: {business.income}
 Total Income: {business.total_income}
 Appeal: {business.appeal}
-Open Jobs: {sum(business.open_jobs.values())}
-Employees: {len(business.employees)}
+Open Jobs: {business.open_jobs}
+Employees: {business.employees}
 """)
 
-    def _destroy_building(self, selection) -> None:
+    def _destroy_building(self, key: tuple) -> None:
         """
         destroy building
         """
-        building_type, building_id = self._buildings_list.item(selection)["tags"]
-        building_id = int(building_id)
+        if key is None:
+            return
+
+        building_type, building_id = key
 
-        self._village.destroy_building(building_type, building_id)
-        self._buildings_list.delete(selection)
+        # destroyed between two ticks by the game thread
+        self._destroy_btn.configure(state=tk.DISABLED, command=None)
+        destroyed = succeeded(lambda _: self._building_destroyed(key))
+        self._main_manager.submit(DestroyBuilding(building_type, building_id, callback=destroyed))
+
+    def _building_destroyed(self, key: tuple) -> None:
+        """
+        removes destroyed building
+        """
+        self._buildings_model.delete(key)
 
         # clear frame
+        self._shown_building = None
         self._destroy_btn.configure(state=tk.DISABLED, command=None)
         self._building_info.configure(text="")
 
-    def _display_shop(self, _event: tk.Event) -> None:
+    def _display_shop(self, key: tuple) -> None:
         """
         display building from shop
         """
-        if len(self._shop_list.selection()) <= 0:
+        if key is None or key == self._shown_shop:
             return
+        self._shown_shop = key
 
-        building_type, building_id = self._shop_list.item(self._shop_list.selection()[0], "tags")
-        building_id = int(building_id)
+        building_type, building_id = key
 
         self._buy_btn.configure(state=tk.NORMAL, command=lambda:
-                                self._buy_building(self._shop_list.selection()[0]))
+                                self._buy_building(self._shop_list.selected))
 
         # checks type of building
         match building_type:
@@ -344,12 +361,14 @@ Appeal: {business.appeal}
 Income: {business.income}
 Jobs: {sum(business.open_jobs.values())}""")
 
-    def _buy_building(self, selection) -> None:
+    def _buy_building(self, key: tuple) -> None:
         """
         buying building
         """
-        building_type, building_id = self._shop_list.item(selection)["tags"]
-        building_id = int(building_id)
+        if key is None:
+            return
+
+        building_type, building_id = key
 
         # checks building
         match building_type:
@@ -363,11 +382,17 @@ Jobs: {sum(business.open_jobs.values())}""")
                 new_building_type = Business
                 building = Building.businesses[building_id]
 
-        if (building := self._village.buy_building(building)) is None:
+        # bought between two ticks by the game thread
+        self._main_manager.submit(BuyBuilding(building, callback=succeeded(lambda new_building:
+                                              self._building_bought(new_building_type,
+                                                                    new_building))))
+
+    def _building_bought(self, new_building_type: type, building: Building) -> None:
+        """
+        adds bought building
+        """
+        if building is None:
             return
 
-        values = (building.name, building.appeal)
-        self._buildings_list.insert("",
-                                    tk.END,
-                                    tags=(new_building_type, building.id),
-                                    values=values)
+        self._buildings_model.insert((str(new_building_type), building.id),
+                                     (building.name, building.appeal))
@@ -0,0 +1,218 @@
+"""
+Sortable list model for virtual lists
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import bisect
+import itertools
+
+
+class ListModel:
+    """
+    Rows of typed values keyed by a hashable key, kept in python instead of a tk widget,
+    sort orders are cached per column and updated on insert and delete
+    """
+    def __init__(self, columns: tuple) -> None:
+        self._columns = tuple(columns)
+
+        # key -> values, insertion order is the unsorted order
+        self._rows = {}
+
+        # key -> insertion number, breaks ties of equal values
+        self._sequence = {}
+        self._counter = itertools.count()
+
+        # column -> ascending list of (value, insertion number, key)
+        self._orders = {}
+        self._unsorted = None
+
+        self._sort_column = None
+        self._sort_reverse = False
+        self._listeners = []
+
+    @property
+    def columns(self) -> tuple:
+        """
+        columns getter
+        """
+        return self._columns
+
+    @property
+    def sort_column(self) -> int:
+        """
+        sort column getter, None if unsorted
+        """
+        return self._sort_column
+
+    @property
+    def sort_reverse(self) -> bool:
+        """
+        sort reverse getter
+        """
+        return self._sort_reverse
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def subscribe(self, listener: callable) -> None:
+        """
+        listener is called after every change of rows or order
+        """
+        self._listeners.append(listener)
+
+    def _changed(self) -> None:
+        """
+        notifies listeners
+        """
+        for listener in self._listeners:
+            listener()
+
+    def values(self, key) -> tuple:
+        """
+        values of a row
+        """
+        return self._rows[key]
+
+    def insert(self, key, values: tuple) -> None:
+        """
+        inserts row, replaces row with the same key
+        """
+        if key in self._rows:
+            self._remove(key)
+
+        values = tuple(values)
+        sequence = next(self._counter)
+        self._rows[key] = values
+        self._sequence[key] = sequence
+
+        for column, order in self._orders.items():
+            bisect.insort(order, (values[column], sequence, key))
+        if self._unsorted is not None:
+            self._unsorted.append(key)
+
+        self._changed()
+
+    def extend(self, rows) -> None:
+        """
+        inserts (key, values) pairs, notifies once
+        """
+        for key, values in rows:
+            if key in self._rows:
+                self._remove(key)
+            self._rows[key] = tuple(values)
+            self._sequence[key] = next(self._counter)
+
+        # cheaper to sort again than to insert one by one
+        self._orders.clear()
+        self._unsorted = None
+        self._changed()
+
+    def delete(self, key) -> bool:
+        """
+        deletes row, returns false if it does not exist
+        """
+        if key not in self._rows:
+            return False
+
+        self._remove(key)
+        self._changed()
+        return True
+
+    def _remove(self, key) -> None:
+        """
+        removes row from rows and cached orders
+        """
+        values = self._rows.pop(key)
+        sequence = self._sequence.pop(key)
+
+        for column, order in self._orders.items():
+            order.pop(bisect.bisect_left(order, (values[column], sequence, key)))
+        if self._unsorted is not None:
+            self._unsorted.remove(key)
+
+    def clear(self) -> None:
+        """
+        removes all rows
+        """
+        self._rows.clear()
+        self._sequence.clear()
+        self._orders.clear()
+        self._unsorted = None
+        self._changed()
+
+    def sort(self, column: int, reverse: bool = False) -> None:
+        """
+        sorts by column, None restores insertion order
+        """
+        self._sort_column = column
+        self._sort_reverse = reverse
+        self._changed()
+
+    def toggle_sort(self, column: int) -> None:
+        """
+        sorts by column, reverses if already sorted by it
+        """
+        if self._sort_column == column:
+            self.sort(column, not self._sort_reverse)
+        else:
+            self.sort(column, False)
+
+    def _order(self) -> list:
+        """
+        ascending order of the sort column
+        """
+        if self._sort_column is None:
+            if self._unsorted is None:
+                self._unsorted = list(self._rows)
+            return self._unsorted
+
+        order = self._orders.get(self._sort_column, None)
+        if order is None:
+            column = self._sort_column
+            order = sorted((values[column], self._sequence[key], key)
+                           for key, values in self._rows.items())
+            self._orders[column] = order
+        return order
+
+    def _key_at(self, order: list, index: int):
+        """
+        key at an index of an ascending order
+        """
+        if self._sort_column is None:
+            return order[index]
+        return order[index][2]
+
+    def keys(self, start: int = 0, stop: int = None) -> list:
+        """
+        keys of rows from start to stop in the current order
+        """
+        order = self._order()
+        count = len(order)
+        stop = count if stop is None else min(stop, count)
+        start = max(start, 0)
+
+        if self._sort_reverse is True:
+            indices = range(count - 1 - start, count - 1 - stop, -1)
+        else:
+            indices = range(start, stop)
+        return [self._key_at(order, index) for index in indices]
+
+    def index(self, key) -> int:
+        """
+        position of a row in the current order
+        """
+        order = self._order()
+        if self._sort_column is None:
+            index = order.index(key)
+        else:
+            values = self._rows[key]
+            index = bisect.bisect_left(order, (values[self._sort_column],
+                                               self._sequence[key],
+                                               key))
+
+        if self._sort_reverse is True:
+            return len(order) - 1 - index
+        return index
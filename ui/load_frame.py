@@ -3,8 +3,7 @@ Tkinter Load Frame
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
-import os
-import struct
+import queue
 import tkinter as tk
 from datetime import datetime
 from tkinter import ttk
@@ -12,12 +11,16 @@ from typing import TYPE_CHECKING
 
 from ui.frame_base import FrameBase
 from managers.states import State
+from preview_index import PreviewIndex
 
 # includes only needed for typing
 if TYPE_CHECKING:
     from managers.main_manager import MainManager
     from village import Village
 
+# milliseconds between checks for new previews
+POLL_INTERVAL = 50
+
 
 class LoadFrame(FrameBase):
     """
@@ -28,6 +31,12 @@ class LoadFrame(FrameBase):
 
         self.configure(padding=(10, 10))
 
+        # cached previews of the save games
+        self._previews = PreviewIndex()
+        self._results = queue.SimpleQueue()
+        self._scan_id = 0
+        self._scan = None
+
         # initialize variables
         tree_frame = ttk.Frame(self)
         columns = ("Name", "last played", "money", "population", "happiness", "appeal", "data")
@@ -78,38 +87,44 @@ class LoadFrame(FrameBase):
 
         self._treeview.delete(*self._treeview.get_children())
 
-        # saves
-        for path in os.listdir("saves"):
-            path = "saves/" + path
-            if path[-4:] != ".vss":
-                continue
+        # previews arrive from the scan thread and are inserted on the tk thread
+        self._scan_id += 1
+        scan_id = self._scan_id
+        self._scan = self._previews.scan(lambda path, preview, mtime:
+                                         self._results.put((scan_id, path, preview, mtime)))
+        self._poll_previews()
 
-            # load save game preview
-            with open(path, "rb") as file:
-                # name
-                [temp_length] = struct.unpack(">B", file.read(1))
-                name = file.read(temp_length).decode()
+    def disable(self) -> None:
+        """
+        disable frame and stop waiting for previews
+        """
+        super().disable()
 
-                # money
-                [money] = struct.unpack(">d", file.read(8))
+        self._scan_id += 1
 
-                # date
-                [day, month, year] = struct.unpack(">BBI", file.read(6))
+    def _poll_previews(self) -> None:
+        """
+        inserts previews that arrived since the last poll
+        """
+        while self._results.empty() is False:
+            scan_id, path, preview, mtime = self._results.get()
+            if scan_id != self._scan_id:
+                continue
 
-                # preview stats
-                [population, happiness, appeal] = struct.unpack(">iff", file.read(12))
+            # last played
+            last_played = datetime.fromtimestamp(mtime)
 
-                # last played
-                last_played = datetime.fromtimestamp(os.path.getmtime(path))
+            values = (preview["name"],
+                      last_played.strftime("%d.%m.%Y %H:%M"),
+                      format(preview["money"], '.2f'),
+                      str(preview["population"]),
+                      str(format(preview["happiness"], '.2f')),
+                      str(format(preview["appeal"], '.2f')),
+                      f"{preview['day']}.{preview['month']}.{preview['year']}")
+            self._treeview.insert("", tk.END, text=path, values=values)
 
-                values = (name,
-                          last_played.strftime("%d.%m.%Y %H:%M"),
-                          format(money, '.2f'),
-                          str(population),
-                          str(format(happiness, '.2f')),
-                          str(format(appeal, '.2f')),
-                          f"{day}.{month}.{year}")
-                self._treeview.insert("", tk.END, text=path, values=values)
+        if self._scan.is_alive() or self._results.empty() is False:
+            self.after(POLL_INTERVAL, self._poll_previews)
 
     def _load_game(self, _event: tk.Event) -> None:
         """
@@ -130,5 +145,6 @@ class LoadFrame(FrameBase):
 
         path = self._treeview.item(self._treeview.selection()[0], "text")
         self._main_manager.delete_game(path)
+        self._previews.invalidate(path)
 
         self._treeview.delete(self._treeview.selection())
@@ -0,0 +1,213 @@
+"""
+Tkinter virtual list
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import tkinter as tk
+from tkinter import ttk
+
+from ui.list_model import ListModel
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualList(ttk.Frame):
+    """
+    Treeview that shows a list model, only the visible rows exist as treeview items,
+    scrolling refills them from the model
+    """
+    def __init__(self, parent, model: ListModel, on_select: callable = None) -> None:
+        ttk.Frame.__init__(self, parent)
+        self._model = model
+        self._on_select = on_select
+
+        # first shown row and number of shown rows
+        self._offset = 0
+        self._rows = 1
+
+        # treeview items and their shown keys
+        self._items = []
+        self._shown = {}
+        self._selected = None
+        self._selection_version = 0
+
+        self._scrollbar = ttk.Scrollbar(self, command=self._scroll)
+        self._treeview = ttk.Treeview(self,
+                                      selectmode=tk.BROWSE,
+                                      show="headings",
+                                      columns=model.columns)
+
+        for i, text in enumerate(model.columns):
+            self._treeview.heading(i, text=text, command=lambda column=i:
+                                   self._model.toggle_sort(column))
+
+        self._treeview.bind("<<TreeviewSelect>>", self._select)
+        self._treeview.bind("<Configure>", self._resize)
+        self._treeview.bind("<MouseWheel>", self._wheel)
+        self._treeview.bind("<Button-4>", lambda _: self.scroll_rows(-1))
+        self._treeview.bind("<Button-5>", lambda _: self.scroll_rows(1))
+        self._treeview.bind("<Up>", lambda _: self._step(-1))
+        self._treeview.bind("<Down>", lambda _: self._step(1))
+
+        self._scrollbar.pack(side=tk.RIGHT, fill=tk.BOTH)
+        self._treeview.pack(fill=tk.BOTH, expand=True)
+
+        model.subscribe(self.refresh)
+
+    @property
+    def model(self) -> ListModel:
+        """
+        model getter
+        """
+        return self._model
+
+    @property
+    def selected(self):
+        """
+        key of the selected row, None if nothing is selected
+        """
+        return self._selected
+
+    @property
+    def selection_version(self) -> int:
+        """
+        selection version getter, changes when another row is selected
+        """
+        return self._selection_version
+
+    def _set_selected(self, key) -> None:
+        """
+        sets key of the selected row
+        """
+        if key != self._selected:
+            self._selected = key
+            self._selection_version += 1
+
+    def _row_height(self) -> int:
+        """
+        height of a treeview row in pixels
+        """
+        height = ttk.Style().lookup("Treeview", "rowheight")
+        try:
+            return max(int(height), 1)
+        except (TypeError, ValueError):
+            return DEFAULT_ROW_HEIGHT
+
+    def _resize(self, event: tk.Event) -> None:
+        """
+        adjusts number of treeview items to the height
+        """
+        # the heading takes about one row
+        rows = max(event.height // self._row_height() - 1, 1)
+        if rows == self._rows:
+            return
+
+        self._rows = rows
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        fills treeview items with the rows at the offset
+        """
+        count = len(self._model)
+        if self._selected is not None and self._selected not in self._model:
+            self._set_selected(None)
+
+        self._offset = max(min(self._offset, count - self._rows), 0)
+        keys = self._model.keys(self._offset, self._offset + self._rows)
+
+        # only the needed items exist
+        while len(self._items) < len(keys):
+            self._items.append(self._treeview.insert("", tk.END))
+        while len(self._items) > len(keys):
+            self._treeview.delete(self._items.pop())
+
+        self._shown = {}
+        selection = ()
+        for item, key in zip(self._items, keys):
+            self._treeview.item(item, values=self._model.values(key))
+            self._shown[item] = key
+            if key == self._selected:
+                selection = (item,)
+
+        # keeps selection of the key, not of the item
+        self._treeview.selection_set(selection)
+
+        if count <= 0:
+            self._scrollbar.set(0.0, 1.0)
+        else:
+            self._scrollbar.set(self._offset / count, (self._offset + len(keys)) / count)
+
+    def _select(self, _event: tk.Event) -> None:
+        """
+        remembers key of the selected item
+        """
+        selection = self._treeview.selection()
+        if len(selection) <= 0:
+            return
+
+        # ignores the selection restored by refresh
+        key = self._shown.get(selection[0], None)
+        if key is None or key == self._selected:
+            return
+
+        self._set_selected(key)
+        if self._on_select is not None:
+            self._on_select(key)
+
+    def select(self, key) -> None:
+        """
+        selects row and scrolls to it
+        """
+        if key not in self._model:
+            return
+
+        self._set_selected(key)
+        index = self._model.index(key)
+        if index < self._offset:
+            self._offset = index
+        elif index >= self._offset + self._rows:
+            self._offset = index - self._rows + 1
+        self.refresh()
+
+        if self._on_select is not None:
+            self._on_select(key)
+
+    def _step(self, rows: int) -> str:
+        """
+        moves selection with the arrow keys, also beyond the shown rows
+        """
+        count = len(self._model)
+        if count <= 0:
+            return "break"
+
+        if self._selected is None:
+            index = self._offset
+        else:
+            index = max(min(self._model.index(self._selected) + rows, count - 1), 0)
+        self.select(self._model.keys(index, index + 1)[0])
+        return "break"
+
+    def scroll_rows(self, rows: int) -> None:
+        """
+        scrolls by a number of rows
+        """
+        self._offset += rows
+        self.refresh()
+
+    def _wheel(self, event: tk.Event) -> None:
+        """
+        scrolls with the mouse wheel
+        """
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _scroll(self, *args) -> None:
+        """
+        scrollbar command
+        """
+        if args[0] == tk.MOVETO:
+            self._offset = int(float(args[1]) * len(self._model))
+        elif args[0] == tk.SCROLL:
+            step = self._rows if args[2] == tk.PAGES else 1
+            self._offset += int(args[1]) * step
+        self.refresh()
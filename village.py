@@ -3,15 +3,28 @@ Village class
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
+import math
 import random
 import io
-import struct
+import itertools
+import time
 import copy
+from collections.abc import KeysView
 
 import constants
+import savegame
 from family import Family
 from villagers import Villager, Child, Adult, Senior
 from buildings import Building, House, Business
+from change_log import ChangeLog
+from population import Engine, Population, PopulationFamily, PopulationSnapshot
+from sharding import ShardedPopulation
+from housing import FitPolicy, HouseIndex
+from labor_market import LaborMarket
+from migration import MigrationBatch
+from scheduler import EventScheduler
+from save_reader import SaveReader
+from tick_profiler import TickProfiler
 
 CALLENDER = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
@@ -20,6 +33,9 @@ class Village:
     """
     Village class
     """
+    # versions are unique over all villages
+    _versions = itertools.count(1)
+
     def __init__(self,
                  name: str,
                  start_money: float,
@@ -28,19 +44,77 @@ class Village:
                  day: int = 1,
                  month: int = 1,
                  year: int = 2024,
-                 seed: int = 1337) -> None:
+                 seed: int = 1337,
+                 engine: Engine = Engine.OBJECTS,
+                 debug: bool = False,
+                 house_policy: FitPolicy = FitPolicy.FIRST_FIT,
+                 balance: constants.Constants = None,
+                 shards: int = None) -> None:
         random.seed(seed)
 
+        # balance constants of this village
+        self._balance = constants.Constants() if balance is None else balance
+
         self._name = name
         self._money = start_money
+        self._version = next(Village._versions)
+
+        # measures the phases of ticks, None while disabled
+        self._profiler = None
+
+        # collects families that leave for a neighbour village, None while they just vanish
+        self._emigrants = None
+
+        # changes of the families for a journal, None while no journal follows the village
+        self._change_log = None
+
+        # villagers are either stored as objects or as arrays
+        self._engine = engine
+        self._population = None
+        if engine == Engine.ARRAYS:
+            self._population = Population(seed=seed)
+        elif engine == Engine.SHARDED:
+            self._population = ShardedPopulation(shards, seed=seed)
+
+        self._labor_market = LaborMarket()
+        if self._population is not None:
+            self._population.labor_market = self._labor_market
+
+        # clock in days since start and timed events like growing up
+        self._scheduler = EventScheduler()
 
-        self._families = families
+        # running totals, kept up to date by the families
+        self._debug = debug
+        self._population_count = 0
+        self._happiness_total = 0.0
+
+        # families in the order they joined, so the same seed gives the same village
+        self._families = {}
+        for family in families:
+            self._add_family(family)
+
+        # reader of a lazily opened save game
+        self._pending = None
+        self._pending_family_count = 0
 
         self._buildings = {b.id: b for b in buildings if isinstance(b, House) is False
                            and isinstance(b, Business) is False}
         self._houses = {b.id: b for b in buildings if isinstance(b, House)}
         self._businesses = {b.id: b for b in buildings if isinstance(b, Business)}
 
+        # ids are not reused while a building lives, loaded villages go on after the highest id
+        self._next_ids = {savegame.BUILDING: max(self._buildings, default=-1) + 1,
+                          savegame.HOUSE: max(self._houses, default=-1) + 1,
+                          savegame.BUSINESS: max(self._businesses, default=-1) + 1}
+
+        self._house_index = HouseIndex(house_policy)
+        for house in self._houses.values():
+            self._house_index.add(house)
+
+        for business in self._businesses.values():
+            business.set_tax_portion(self._balance.income_tax_portion)
+            self._labor_market.add_business(business)
+
         self._day = day
         self._month = month
         self._year = year
@@ -54,13 +128,20 @@ class Village:
             self._appeal += business.appeal
 
     @classmethod
-    def create_village(cls, name: str, population_count: int = 10) -> "Village":
+    def create_village(cls,
+                       name: str,
+                       population_count: int = 10,
+                       engine: Engine = Engine.OBJECTS,
+                       seed: int = 1337,
+                       balance: constants.Constants = None,
+                       shards: int = None) -> "Village":
         """
         creates standard village
         """
         Building.load_buildings()
 
-        village = cls(name, 10_000, set(), set(), day=27)
+        village = cls(name, 10_000, set(), set(), day=27, seed=seed, engine=engine,
+                      balance=balance, shards=shards)
 
         # create houses
         for _ in range(20):
@@ -86,6 +167,75 @@ class Village:
         """
         return self._name
 
+    @property
+    def version(self) -> int:
+        """
+        version getter, changes with every tick, bought and destroyed building
+        """
+        return self._version
+
+    def _changed(self) -> None:
+        """
+        new version after a change
+        """
+        self._version = next(Village._versions)
+
+    @property
+    def balance(self) -> constants.Constants:
+        """
+        balance constants getter
+        """
+        return self._balance
+
+    @property
+    def profiler(self) -> TickProfiler:
+        """
+        profiler getter, None while profiling is disabled
+        """
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, value: TickProfiler) -> None:
+        """
+        profiler setter, None disables profiling
+        """
+        self._profiler = value
+
+    @property
+    def emigrants(self) -> MigrationBatch:
+        """
+        emigrants getter, families that left since the batch was set
+        """
+        return self._emigrants
+
+    @emigrants.setter
+    def emigrants(self, value: MigrationBatch) -> None:
+        """
+        emigrants setter, None lets leaving families vanish
+        """
+        self._emigrants = value
+
+    @property
+    def change_log(self) -> ChangeLog:
+        """
+        change log getter, None while changes are not logged
+        """
+        return self._change_log
+
+    @change_log.setter
+    def change_log(self, value: ChangeLog) -> None:
+        """
+        change log setter, None stops logging
+        """
+        self._change_log = value
+
+    def family_changed(self, family: Family) -> None:
+        """
+        logs change of members, jobs or house of a family
+        """
+        if self._change_log is not None:
+            self._change_log.changed(family)
+
     @property
     def money(self) -> float:
         """
@@ -98,7 +248,7 @@ class Village:
         """
         population getter
         """
-        return sum(len(family) for family in self._families)
+        return self._population_count
 
     @property
     def mean_happiness(self) -> float:
@@ -106,10 +256,40 @@ class Village:
         total happiness getter
         calculates the mean happiness from all villager
         """
-        if len(self._families) <= 0:
+        family_count = len(self._families) + self._pending_family_count
+        if family_count <= 0:
             return 0.0
 
-        return sum(family.mean_happiness for family in self._families) / len(self._families)
+        return self._happiness_total / family_count
+
+    @property
+    def families(self) -> KeysView[Family]:
+        """
+        families getter, in the order they joined
+        """
+        self._load_pending()
+        return self._families.keys()
+
+    @property
+    def labor_market(self) -> LaborMarket:
+        """
+        labor market getter
+        """
+        return self._labor_market
+
+    @property
+    def scheduler(self) -> EventScheduler:
+        """
+        scheduler getter
+        """
+        return self._scheduler
+
+    @property
+    def engine(self) -> Engine:
+        """
+        population engine getter
+        """
+        return self._engine
 
     @property
     def appeal(self) -> float:
@@ -139,6 +319,54 @@ class Village:
         """
         return self._businesses
 
+    @property
+    def all_buildings(self) -> list[Building]:
+        """
+        buildings, houses and businesses in the order they are saved
+        """
+        return [*self._buildings.values(), *self._houses.values(), *self._businesses.values()]
+
+    def update_aggregates(self, population_delta: int, happiness_delta: float) -> None:
+        """
+        updates running totals when a family changed
+        """
+        self._population_count += population_delta
+        self._happiness_total += happiness_delta
+
+    def check_aggregates(self) -> None:
+        """
+        compares running totals against a full recompute
+        """
+        self._load_pending()
+
+        population = 0
+        happiness_total = 0.0
+        for family in self._families:
+            villagers = family.villagers
+            if len(villagers) != len(family):
+                raise RuntimeError(f"family size {len(family)} != {len(villagers)} villagers")
+
+            if len(villagers) > 0:
+                mean_happiness = sum(v.happiness for v in villagers) / len(villagers)
+                if math.isclose(mean_happiness, family.mean_happiness, abs_tol=1e-6) is False:
+                    raise RuntimeError(f"family mean happiness {family.mean_happiness} "
+                                       f"!= {mean_happiness}")
+
+            population += len(family)
+            happiness_total += family.mean_happiness
+
+        if population != self._population_count:
+            raise RuntimeError(f"population {self._population_count} != {population}")
+        if math.isclose(happiness_total, self._happiness_total, abs_tol=1e-6) is False:
+            raise RuntimeError(f"happiness total {self._happiness_total} != {happiness_total}")
+
+    @property
+    def days_to_next_month(self) -> int:
+        """
+        ticks until the next month tick
+        """
+        return max(CALLENDER[self._month - 1] - self._day + 1, 1)
+
     def get_date_str(self) -> str:
         """
         returns the current date as a string
@@ -151,56 +379,241 @@ class Village:
         """
         return money * 0.14
 
-    def save(self, file: io.BufferedWriter) -> None:
+    def close(self) -> None:
         """
-        save village to file
+        stops the processes of a sharded population and closes a lazily opened save game,
+        the village can not tick afterwards
         """
-        # name
-        file.write(struct.pack(">B", len(self._name)) + bytes(self._name, "utf-8"))
+        if self._pending is not None:
+            self._pending.close()
+            self._pending = None
 
-        # money
-        file.write(struct.pack(">d", self._money))
+        if self._population is not None:
+            self._population.close()
 
-        # date
-        file.write(struct.pack(">BBI", self._day, self._month, self._year))
+    def save(self, file: io.BufferedWriter, families: list[Family] = None) -> None:
+        """
+        save village to file, section by section, followed by an index of the sections,
+        families can be given to fix the order they are saved in
+        """
+        self.snapshot(families).write(file)
 
-        # preview stats
-        file.write(struct.pack(">Iff", self.population, self.mean_happiness, self.appeal))
+    def snapshot(self, families: list[Family] = None) -> savegame.Snapshot:
+        """
+        takes snapshot of everything saved, to be written later,
+        only consistent between two ticks
+        """
+        self._load_pending()
 
-        # families
-        file.write(struct.pack(">I", len(self._families)))
-        for family in self._families:
-            family.save(file)
+        state = io.BytesIO()
+        index = self.save_state(state)
+
+        if families is None:
+            families = list(self._families)
+
+        # the array engine only copies its columns, records are built when written
+        if self._population is not None:
+            blocks = PopulationSnapshot(self._population, families).blocks(savegame.BLOCK_SIZE)
+        else:
+            blocks = []
+            for i in range(0, len(families), savegame.BLOCK_SIZE):
+                strings = savegame.StringTable()
+                family_records = []
+                villager_records = []
+                for family in families[i:i + savegame.BLOCK_SIZE]:
+                    family_records.append(family.record())
+                    villager_records.extend(family.villager_records(strings))
+                blocks.append((strings, family_records, villager_records))
+
+        return savegame.Snapshot(state.getvalue(), index, families, blocks)
+
+    def save_state(self, file: io.BufferedWriter) -> list[tuple]:
+        """
+        save header, random state and buildings to file, without the families,
+        returns the index entries of the sections
+        """
+        index = self.save_header(file)
+
+        # buildings
+        buildings = self.all_buildings
+        index.append((savegame.BUILDINGS_SECTION, file.tell(), len(buildings)))
+        savegame.write_section(file, savegame.BUILDINGS_SECTION, len(buildings))
+        for building in buildings:
+            building.save(file)
+
+        return index
+
+    def save_header(self, file: io.BufferedWriter) -> list[tuple]:
+        """
+        save header and random state to file, returns the index entry of the random state
+        """
+        savegame.write_header(file,
+                              self._name,
+                              self._money,
+                              (self._day, self._month, self._year),
+                              (self.population, self.mean_happiness, self.appeal),
+                              self._engine.value,
+                              self._scheduler.today,
+                              self._happiness_total,
+                              self._balance)
 
-        # TODO: save random state
+        # random state
+        index = [(savegame.RANDOM_SECTION, file.tell(), 1)]
+        savegame.write_section(file, savegame.RANDOM_SECTION, 1)
+        savegame.write_random_state(file, savegame.get_random_state(
+            None if self._population is None else self._population.random_state()))
+
+        return index
 
     @classmethod
     def load(cls, file: io.BufferedReader) -> "Village":
         """
-        load Village from file
+        load Village from file in one pass
+        """
+        header = savegame.read_header(file)
+
+        # random state is restored after everything is build
+        savegame.read_section(file, savegame.RANDOM_SECTION)
+        random_state = savegame.read_random_state(file)
+
+        # buildings
+        buildings = [Building.load(file)
+                     for _ in range(savegame.read_section(file, savegame.BUILDINGS_SECTION))]
+
+        village = cls._from_header(header, buildings, ShardedPopulation.shards_of(random_state[1]))
+
+        # families, in blocks
+        family_count = savegame.read_section(file, savegame.FAMILIES_SECTION)
+        while family_count > 0:
+            strings, family_records, villager_records = savegame.read_family_block(file)
+            family_count -= len(family_records)
+
+            village._add_family_block(strings, family_records, villager_records)
+
+        savegame.read_section(file, savegame.END_SECTION)
+
+        savegame.set_random_state(random_state, village._population)
+
+        return village
+
+    @classmethod
+    def open(cls, path: str) -> "Village":
+        """
+        open save game through a memory map, families are only loaded when first needed
         """
-        # name
-        [temp_length] = struct.unpack(">B", file.read(1))
-        name = file.read(temp_length).decode()
+        reader = SaveReader(path)
+        header = reader.header
+        random_state = reader.random_state
+
+        village = cls._from_header(header, reader.buildings,
+                                   ShardedPopulation.shards_of(random_state[1]))
+
+        # families are loaded later, until then the totals of the header are used
+        village._pending = reader
+        village._pending_family_count = reader.family_count
+        village._population_count = header["population"]
+        village._happiness_total = header["happiness_total"]
 
-        # money
-        [money] = struct.unpack(">d", file.read(8))
+        savegame.set_random_state(random_state, village._population)
 
-        # date
-        [day, month, year] = struct.unpack(">BBI", file.read(6))
+        return village
 
-        # skip preview stats
-        file.read(12)
+    @classmethod
+    def restore(cls,
+                header: dict,
+                random_state: (tuple, dict),
+                buildings: list[Building],
+                blocks: list[tuple]) -> ("Village", list[Family]):
+        """
+        builds village from loaded sections, blocks are tuples of strings,
+        family records and villager records, returns village and families in block order
+        """
+        village = cls._from_header(header, buildings, ShardedPopulation.shards_of(random_state[1]))
 
-        # families
-        villagers = []
+        families = []
+        for strings, family_records, villager_records in blocks:
+            families.extend(village._add_family_block(strings, family_records, villager_records))
 
-        return cls(name, money, villagers, [], day, month, year)
+        savegame.set_random_state(random_state, village._population)
+
+        return (village, families)
+
+    @classmethod
+    def _from_header(cls, header: dict, buildings: list[Building],
+                     shards: int = None) -> "Village":
+        """
+        creates village without families from a loaded header,
+        a sharded village gets the number of shards it was saved with
+        """
+        village = cls(header["name"],
+                      header["money"],
+                      set(),
+                      buildings,
+                      header["day"],
+                      header["month"],
+                      header["year"],
+                      engine=Engine(header["engine"]),
+                      balance=constants.Constants(*header["balance"]),
+                      shards=shards)
+        village.scheduler.today = header["today"]
+
+        return village
+
+    def _add_family_block(self,
+                          strings: list[str],
+                          family_records: list[tuple],
+                          villager_records: list[tuple]) -> list[Family]:
+        """
+        adds families of a loaded block, returns them in block order
+        """
+        families = []
+        start = 0
+        for record in family_records:
+            mean_happiness, house_id, child_count, adult_count, senior_count = record
+            end = start + child_count + adult_count + senior_count
+
+            villagers = Family.villagers_from_records(record,
+                                                      villager_records[start:end],
+                                                      strings,
+                                                      self._businesses)
+            start = end
+
+            family = self._new_family(villagers)
+            family.set_mean_happiness(mean_happiness)
+            if house_id >= 0:
+                family.restore_house(self._houses[house_id])
+
+            self._add_family(family)
+            families.append(family)
+
+        return families
+
+    def _load_pending(self) -> None:
+        """
+        loads the families of a lazily opened save game,
+        the next tick touches every family, so all blocks are decoded at once
+        """
+        if self._pending is None:
+            return
+
+        reader = self._pending
+        self._pending = None
+
+        self._pending_family_count = 0
+        self._population_count = 0
+        self._happiness_total = 0.0
+        for i in range(reader.block_count):
+            self._add_family_block(*reader.family_block(i))
+
+        reader.close()
 
     def tick(self) -> None:
         """
         tick
         """
+        self._load_pending()
+        self._changed()
+
         # one day
         self._tick_day()
 
@@ -216,57 +629,198 @@ class Village:
 
                 self._year += 1
 
+    def advance(self, days: int) -> None:
+        """
+        advances the simulation by a number of days,
+        days without any event are advanced at once
+        """
+        self._load_pending()
+
+        while days > 0:
+            batch = min(days, self._batchable_days())
+
+            if batch <= 1:
+                self.tick()
+                days -= 1
+                continue
+
+            if self._profiler is None:
+                self._advance_batch(batch)
+            else:
+                self._profiler.measure("batch", self._advance_batch, batch)
+                self._profiler.count("batched_days", batch)
+            days -= batch
+
+    def _batchable_days(self) -> int:
+        """
+        number of days until the next event, these days can be advanced at once
+        """
+        # month tick
+        days = CALLENDER[self._month - 1] - self._day
+        if days <= 0:
+            return 0
+
+        # stage transitions and other timed events
+        if self._scheduler.next_day is not None:
+            days = min(days, self._scheduler.next_day - self._scheduler.today - 1)
+
+        # deaths and families leaving
+        if self._population is not None:
+            days = min(days, self._population.batchable_days(self._balance.min_happiness))
+        else:
+            for family in self._families:
+                days = min(days, family.batchable_days(self._balance.min_happiness))
+                if days <= 0:
+                    return 0
+
+        # homeless families finding a home
+        for family in self._families:
+            if family.house is None and self._find_house(len(family)) is not None:
+                return 0
+
+        # new families, happiness rises by at most 0.035 per day
+        if self.appeal > 0 and self.population > 0:
+            days = min(days, math.ceil((self.population / self.appeal - self.mean_happiness)
+                                       / 0.035) - 1)
+
+        return max(days, 0)
+
+    def _advance_batch(self, days: int) -> None:
+        """
+        advances several days without events at once
+        """
+        self._changed()
+        self._day += days
+        self._scheduler.today += days
+
+        # update families
+        if self._population is not None:
+            self._population.advance(days)
+
+            families_to_remove = self._population.families_to_remove(self._balance.min_happiness)
+        else:
+            for family in self._families:
+                family.advance(days)
+
+            families_to_remove = [family for family in self._families \
+                                  if family.mean_happiness <= self._balance.min_happiness \
+                                  or len(family) <= 0]
+
+        # remove families
+        for family in families_to_remove:
+            self._remove_family(family)
+
+        # update businesses, each fails with 1% per day
+        for business in self._businesses.values():
+            if random.random() > 0.99 ** days:
+                business.active = False
+
+        if self._debug is True:
+            self.check_aggregates()
+
     def _tick_day(self) -> None:
         """
         day tick
         """
         self._day += 1
+        self._scheduler.today += 1
+
+        profiler = self._profiler
+        if profiler is None:
+            self._tick_families()
+            self._remove_unhappy_families()
+            self._tick_businesses()
+            self._house_homeless()
+            self._gain_new_families()
+        else:
+            start = time.perf_counter()
+            profiler.measure("families", self._tick_families, counter="families_processed")
+            profiler.measure("removals", self._remove_unhappy_families,
+                             counter="families_removed")
+            profiler.measure("businesses", self._tick_businesses, counter="businesses_failed")
+            profiler.measure("housing", self._house_homeless, counter="homeless_searched")
+            profiler.measure("new_families", self._gain_new_families, counter="families_gained")
+            profiler.time("day", time.perf_counter() - start)
 
-        # update families
-        list(map(lambda family: family.tick(), self._families))
+        if self._debug is True:
+            self.check_aggregates()
+
+    def _tick_families(self) -> int:
+        """
+        ticks families, returns their number
+        """
+        if self._population is not None:
+            self._population.tick()
+        else:
+            list(map(lambda family: family.tick(), self._families))
+
+            # grow up and retire
+            self._scheduler.run_due()
+
+        return len(self._families)
+
+    def _remove_unhappy_families(self) -> int:
+        """
+        removes unhappy and empty families, returns their number
+        """
+        if self._population is not None:
+            families_to_remove = self._population.families_to_remove(self._balance.min_happiness)
+        else:
+            families_to_remove = [family for family in self._families \
+                                  if family.mean_happiness <= self._balance.min_happiness \
+                                  or len(family) <= 0]
 
-        # remove families
-        families_to_remove = {family for family in self._families \
-                              if family.mean_happiness <= constants.MIN_HAPPINESS \
-                              or len(family) <= 0}
-        self._families -= families_to_remove
         for family in families_to_remove:
-            family.leave()
+            self._remove_family(family)
+
+        return len(families_to_remove)
 
-        # update businesses
+    def _tick_businesses(self) -> int:
+        """
+        each business fails with 1%, returns number of failures
+        """
+        failed = 0
         for business in self._businesses.values():
             if random.random() > 0.99:
                 business.active = False
+                failed += 1
 
-        # find new home
+        return failed
+
+    def _house_homeless(self) -> int:
+        """
+        homeless families find a new home, returns number of families that searched
+        """
+        searched = 0
         for family in self._families:
             if family.house is None:
                 house = self._find_house(len(family))
+                searched += 1
 
                 if house is not None:
                     family.set_house(house)
 
-        # gain new families
-        self._gain_new_families()
+        return searched
 
     def _find_house(self, capacity: int) -> House:
         """
         find house with enough capacity for family else return None
         """
-        for house in self._houses.values():
-            if house.free_capacity >= capacity:
-                return house
-        return None
+        return self._house_index.find(capacity)
 
-    def _gain_new_families(self, person_count: int = None) -> None:
+    def _gain_new_families(self, person_count: int = None) -> int:
         """
-        gain new family
+        gain new family, returns number of new families
         """
         if person_count is None:
             if self.population <= 0:
-                return
+                return 0
             person_count = (self.appeal / self.population) * self.mean_happiness
 
+        # names are loaded once, not by every villager
+        Villager.load_names()
+
+        gained = 0
         while True:
             child_count = int(random.triangular(0, 5, 2))
             adult_count = int(random.triangular(1, 5, 1.8))
@@ -283,24 +837,93 @@ class Village:
 
             last_name = random.choice(Villager.last_names)
 
-            villagers = set()
-            villagers.update({Child(f"{random.choice(Villager.first_names)} \
-                                    {last_name}", \
+            villagers = []
+            villagers.extend([Child(f"{random.choice(Villager.first_names)} {last_name}", \
                                     random.triangular(0, 17 * 365, 10 * 365), \
-                                    random.triangular(0, 100, 80)) for i in range(child_count)})
-            villagers.update({Adult(f"{random.choice(Villager.first_names)} \
-                                    {last_name}", \
+                                    random.triangular(0, 100, 80)) for i in range(child_count)])
+            villagers.extend([Adult(f"{random.choice(Villager.first_names)} {last_name}", \
                                     random.triangular(18 * 365, 75 * 365, 32 * 365), \
-                                    random.triangular(0, 100, 80)) for i in range(adult_count)})
-            villagers.update({Senior(f"{random.choice(Villager.first_names)} \
-                                    {last_name}", \
+                                    random.triangular(0, 100, 80)) for i in range(adult_count)])
+            villagers.extend([Senior(f"{random.choice(Villager.first_names)} {last_name}", \
                                     random.triangular(80 * 365, 119 * 365, 100 * 365), \
-                                    random.triangular(0, 100, 80)) for i in range(senior_count)})
+                                    random.triangular(0, 100, 80)) for i in range(senior_count)])
 
-            family = Family(villagers)
+            family = self._new_family(villagers)
             family.set_house(house)
 
-            self._families.add(family)
+            self._add_family(family)
+            gained += 1
+
+        return gained
+
+    def immigrate(self, data: bytes) -> int:
+        """
+        families of an encoded migration batch move in, returns their number
+        """
+        self._load_pending()
+        self._changed()
+
+        strings, family_records, villager_records = MigrationBatch.decode(data)
+
+        start = 0
+        for record in family_records:
+            _, _, child_count, adult_count, senior_count = record
+            end = start + child_count + adult_count + senior_count
+
+            villagers = Family.villagers_from_records(record, villager_records[start:end],
+                                                      strings, None)
+            start = end
+
+            # they came for a better life
+            for villager in villagers:
+                villager.happiness = max(villager.happiness, self._balance.migrant_happiness)
+
+            family = self._new_family(villagers)
+            family.set_house(self._find_house(len(family)))
+
+            self._add_family(family)
+
+        return len(family_records)
+
+    def _new_family(self, villagers: list[Villager]) -> Family:
+        """
+        creates family with the population engine of the village
+        """
+        if self._population is not None:
+            return PopulationFamily(self._population, villagers)
+        return Family(villagers)
+
+    def _add_family(self, family: Family) -> None:
+        """
+        family moves into the village
+        """
+        self._families[family] = None
+        family.set_village(self)
+        self.family_changed(family)
+
+        for adult in family.unemployed_adults:
+            self._labor_market.add_unemployed(adult)
+
+        self.update_aggregates(len(family), family.mean_happiness)
+
+    def _remove_family(self, family: Family) -> None:
+        """
+        family leaves the village
+        """
+        if self._emigrants is not None and len(family) > 0:
+            self._emigrants.add(family)
+        if self._change_log is not None:
+            self._change_log.left(family)
+
+        del self._families[family]
+        family.set_village(None)
+
+        self.update_aggregates(-len(family), -family.mean_happiness)
+
+        for adult in family.unemployed_adults:
+            self._labor_market.remove_unemployed(adult)
+
+        family.leave()
 
     def _tick_month(self) -> None:
         """
@@ -308,22 +931,32 @@ class Village:
         """
         self._month += 1
 
-        # updates money
+        profiler = self._profiler
+        if profiler is None:
+            self._pay_month()
+
+            # adults find job
+            self._labor_market.hire()
+        else:
+            start = time.perf_counter()
+            profiler.measure("money", self._pay_month)
+            profiler.measure("hiring", self._labor_market.hire, counter="hires")
+            profiler.time("month", time.perf_counter() - start)
+
+    def _pay_month(self) -> None:
+        """
+        pays running costs and gets income
+        """
         self._money -= sum(building.running_costs for building in self._buildings.values())
         self._money -= sum(house.running_costs for house in self._houses.values())
         self._money += sum(business.total_income for business in self._businesses.values())
 
-        # adults find job
-        for family in self._families:
-            for adult in family.unemployed_adults:
-                for business in self._businesses.values():
-                    if business.try_acquire_job(adult) is True:
-                        break
-
     def destroy_building(self, building_type: str, building_id: int) -> None:
         """
         destroy building
         """
+        self._load_pending()
+
         match building_type:
             case "<class \'buildings.Building\'>":
                 list_ = self._buildings
@@ -332,12 +965,20 @@ class Village:
             case "<class \'buildings.Business\'>":
                 list_ = self._businesses
 
-        building = list_.pop(building_id)
+        # destroyed twice before the ui noticed
+        building = list_.pop(building_id, None)
+        if building is None:
+            return
 
         if isinstance(building, Business):
             building.destroy()
+        elif isinstance(building, House):
+            # inhabitants become homeless and look for another house
+            self._house_index.remove(building)
+            building.destroy()
 
         self._appeal -= building.appeal
+        self._changed()
 
     def buy_building(self, building: Building, init: bool = False) -> Building:
         """
@@ -351,18 +992,21 @@ class Village:
             self._money -= building.cost
 
         new_building = copy.copy(building)
+        new_building.id = self._next_ids[new_building.kind]
+        self._next_ids[new_building.kind] += 1
 
         # looks what building has to be build
         if isinstance(new_building, House):
-            new_building.id = len(self._houses)
             self._houses[new_building.id] = new_building
+            self._house_index.add(new_building)
         elif isinstance(new_building,  Business):
-            new_building.id = len(self._businesses)
             self._businesses[new_building.id] = new_building
+            new_building.set_tax_portion(self._balance.income_tax_portion)
+            self._labor_market.add_business(new_building)
         else:
-            new_building.id = len(self._buildings)
             self._buildings[new_building.id] = new_building
 
         self._appeal += new_building.appeal
+        self._changed()
 
         return new_building
@@ -0,0 +1,108 @@
+"""
+Immutable stats of a village for the ui
+"""
+__author__ = "8293677, Schoenbrodt, 8288950, Haas"
+
+import types
+from typing import NamedTuple, TYPE_CHECKING
+
+from buildings import Building, House, Business
+
+# includes only needed for typing
+if TYPE_CHECKING:
+    from village import Village
+
+
+class BuildingStats(NamedTuple):
+    """
+    Stats of one building of the village
+    """
+    name: str
+    running_costs: float
+    appeal: float
+    capacity: int = 0
+    free_capacity: int = 0
+    income: float = 0.0
+    total_income: float = 0.0
+    open_jobs: int = 0
+    employees: int = 0
+
+    # version of the building the stats were taken from
+    version: int = 0
+
+    @staticmethod
+    def of(building: Building) -> "BuildingStats":
+        """
+        stats of a building
+        """
+        if isinstance(building, House):
+            return BuildingStats(building.name,
+                                 building.running_costs,
+                                 building.appeal,
+                                 capacity=building.capacity,
+                                 free_capacity=building.free_capacity,
+                                 version=building.version)
+
+        if isinstance(building, Business):
+            return BuildingStats(building.name,
+                                 building.running_costs,
+                                 building.appeal,
+                                 income=building.income,
+                                 total_income=building.total_income,
+                                 open_jobs=sum(building.open_jobs.values()),
+                                 employees=len(building.employees),
+                                 version=building.version)
+
+        return BuildingStats(building.name,
+                             building.running_costs,
+                             building.appeal,
+                             version=building.version)
+
+
+class VillageStats(NamedTuple):
+    """
+    Stats of a village, published by the game thread after ticks,
+    read by the ui without touching the village
+    """
+    name: str
+    date: str
+    today: int
+    money: float
+    population: int
+    mean_happiness: float
+    appeal: float
+
+    # buildings by type string, as in the keys of the ui lists, and id
+    buildings: types.MappingProxyType
+
+    # version of the village the stats were taken from
+    version: int = 0
+
+    @staticmethod
+    def of(village: "Village", previous: "VillageStats" = None) -> "VillageStats":
+        """
+        stats of a village, must be taken between two ticks,
+        stats of unchanged buildings are taken from the previous stats
+        """
+        previous_buildings = {} if previous is None else previous.buildings
+
+        buildings = {}
+        for building_type, list_ in ((str(Building), village.buildings),
+                                     (str(House), village.houses),
+                                     (str(Business), village.businesses)):
+            for building in list_.values():
+                key = (building_type, building.id)
+                stats = previous_buildings.get(key, None)
+                if stats is None or stats.version != building.version:
+                    stats = BuildingStats.of(building)
+                buildings[key] = stats
+
+        return VillageStats(village.name,
+                            village.get_date_str(),
+                            village.scheduler.today,
+                            village.money,
+                            village.population,
+                            village.mean_happiness,
+                            village.appeal,
+                            types.MappingProxyType(buildings),
+                            village.version)
@@ -3,8 +3,6 @@ Villager related data classes
 """
 __author__ = "8293677, Schoenbrodt, 8288950, Haas"
 
-import io
-import struct
 from typing import TYPE_CHECKING
 
 from jobs import Job
@@ -13,12 +11,18 @@ import constants
 # includes only needed for typing
 if TYPE_CHECKING:
     from buildings import Business
+    from scheduler import EventScheduler
+    from savegame import StringTable
 
 
 class Villager:
     """
     Villager base class
     """
+    # every stage has the same slots, so growing up and retiring change the class in place
+    __slots__ = ("_name", "happiness", "_clock", "_birth_day", "_transition", "_family",
+                 "_job_id", "_workplace", "_income")
+
     _initialized = False
     first_names = ["Firstname"]
     last_names = ["Lastname"]
@@ -28,10 +32,16 @@ class Villager:
                  age: int,
                  happines: float) -> None:
         self._name = name
-        self.age = age
         self.happiness = happines
 
-        Villager.load_names()
+        # age is stored as day of birth on the clock of the village
+        self._clock = None
+        self._birth_day = -age
+
+        # pending grow up or retire event on the clock
+        self._transition = None
+
+        self._family = None
 
     @property
     def name(self) -> str:
@@ -40,42 +50,80 @@ class Villager:
         """
         return self._name
 
-    def save(self, file: io.BufferedWriter) -> None:
+    @property
+    def age(self) -> float:
         """
-        saves Villager to file
+        age getter
         """
-        # name
-        file.write(struct.pack(">B", len(self._name)) + bytes(self._name, "utf-8"))
+        if self._clock is None:
+            return -self._birth_day
+        return self._clock.today - self._birth_day
 
-        # age
-        file.write(struct.pack(">H", self.age))
+    @age.setter
+    def age(self, value: float) -> None:
+        """
+        age setter
+        """
+        if self._clock is None:
+            self._birth_day = -value
+        else:
+            self._birth_day = self._clock.today - value
 
-        # happiness
-        file.write(struct.pack(">f", self.happiness))
+    @property
+    def birth_day(self) -> float:
+        """
+        birth day getter
+        """
+        return self._birth_day
 
-    @classmethod
-    def load(cls, file: io.BufferedReader) -> "Villager":
+    @property
+    def clock(self) -> "EventScheduler":
         """
-        load Villager from file
+        clock getter
         """
-        return cls(*Villager._load_data(file))
+        return self._clock
 
-    @staticmethod
-    def _load_data(file: io.BufferedReader) -> (str, int, float):
+    @property
+    def transition(self) -> list:
         """
-        load villager data from file
+        transition getter, event of growing up or retiring, None if none is pending
         """
-        # name
-        [temp_length] = struct.unpack(">B", file.read(1))
-        name = file.read(temp_length).decode()
+        return self._transition
 
-        # age
-        [age] = struct.unpack(">H", file.read(2))
+    @transition.setter
+    def transition(self, value: list) -> None:
+        """
+        transition setter
+        """
+        self._transition = value
 
-        # happiness
-        [happiness] = struct.unpack(">f", file.read(4))
+    def set_family(self, family) -> None:
+        """
+        family setter, the family is told about changes of the job
+        """
+        self._family = family
 
-        return (name, age, happiness)
+    def set_clock(self, clock: "EventScheduler") -> None:
+        """
+        moves villager onto the clock of a village, keeping its age
+        """
+        age = self.age
+        self._clock = clock
+        self.age = age
+
+    def record(self, strings: "StringTable") -> tuple:
+        """
+        villager record for saving
+        """
+        return (strings.add(self._name), self.age, self.happiness, -1, -1)
+
+    @classmethod
+    def from_record(cls, record: tuple, strings: list[str]) -> "Villager":
+        """
+        load Villager from record
+        """
+        name, age, happiness, _, _ = record
+        return cls(strings[name], age, happiness)
 
     @staticmethod
     def load_names() -> None:
@@ -95,18 +143,25 @@ class Child(Villager):
     """
     Child class
     """
-    @classmethod
-    def load(cls, file: io.BufferedReader) -> "Child":
+    __slots__ = ()
+
+    def grow_up(self) -> "Adult":
         """
-        load Child from file
+        turns child into an unemployed adult in place, returns it
         """
-        return cls(*Villager._load_data(file))
+        self.__class__ = Adult
+        self._job_id = None
+        self._workplace = None
+        self._income = 0.0
+        return self
 
 
 class Adult(Villager):
     """
     Adult class
     """
+    __slots__ = ()
+
     def __init__(self,
                  name: str,
                  age: int,
@@ -115,8 +170,6 @@ class Adult(Villager):
                  workplace: "Business" = None) -> None:
         super(Adult, self).__init__(name, age, happiness)
 
-        Job.load_jobs()
-
         self._job_id = job_id
         self._workplace = workplace
 
@@ -124,7 +177,7 @@ class Adult(Villager):
         if self._job_id is None:
             self._income = 0.0
         else:
-            self._income = Job.jobs[self._job_id].income * constants.INCOME_TAX_PORTION
+            self._income = Job.jobs[self._job_id].income * Adult._tax_portion(workplace)
 
     @property
     def job_id(self) -> Job:
@@ -133,6 +186,22 @@ class Adult(Villager):
         """
         return self._job_id
 
+    @property
+    def workplace(self) -> "Business":
+        """
+        workplace getter
+        """
+        return self._workplace
+
+    @staticmethod
+    def _tax_portion(workplace: "Business") -> float:
+        """
+        tax portion of the village of the workplace
+        """
+        if workplace is None:
+            return constants.INCOME_TAX_PORTION
+        return workplace.tax_portion
+
     @property
     def income_from_tax(self) -> float:
         """
@@ -153,32 +222,54 @@ class Adult(Villager):
             if destroyed_workplace is False and self._workplace is not None:
                 self._workplace.loose_job(self)
         else:
-            self._income = Job.jobs[job_id].income * constants.INCOME_TAX_PORTION
+            self._income = Job.jobs[job_id].income * Adult._tax_portion(workplace)
 
         self._job_id = job_id
         self._workplace = workplace
 
-    def save(self, file: io.BufferedWriter) -> None:
+        if self._family is not None:
+            self._family.changed()
+
+    def record(self, strings: "StringTable") -> tuple:
+        """
+        adult record for saving, with job and id of workplace
+        """
+        return (strings.add(self._name),
+                self.age,
+                self.happiness,
+                -1 if self._job_id is None else strings.index(self._job_id),
+                -1 if self._workplace is None else self._workplace.id)
+
+    def retire(self) -> "Senior":
         """
-        save Adult to file
+        turns adult into a senior in place, returns it, the job has to be lost before
         """
-        super().save(file)
+        self.__class__ = Senior
+        self._workplace = None
+        return self
 
     @classmethod
-    def load(cls, file: io.BufferedReader) -> "Adult":
+    def from_record(cls,
+                    record: tuple,
+                    strings: list[str],
+                    businesses: dict = None) -> "Adult":
         """
-        load Adult from file
+        load Adult from record and employ it at its workplace
         """
-        return cls(*Villager._load_data(file), None)
+        name, age, happiness, job, workplace_id = record
+
+        if job < 0 or businesses is None or workplace_id not in businesses:
+            return cls(strings[name], age, happiness, None)
+
+        workplace = businesses[workplace_id]
+        adult = cls(strings[name], age, happiness, strings[job], workplace)
+        workplace.employees[adult] = None
+
+        return adult
 
 
 class Senior(Villager):
     """
     Senior class
     """
-    @classmethod
-    def load(cls, file: io.BufferedReader) -> "Senior":
-        """
-        load Senior from file
-        """
-        return cls(*Villager._load_data(file))
+    __slots__ = ()